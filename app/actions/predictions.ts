@@ -10,8 +10,25 @@ export interface PredictionWithUpload {
     sound_classification: string;
     yamnet_top_classes: Array<{ class: string; score: number }>;
     yamnet_confidence: number;
-    emotion: string;
-    emotion_score: number;
+    // null when the speech gate skipped emotion detection (emotion_skipped)
+    emotion: string | null;
+    emotion_score: number | null;
+    emotion_skipped?: boolean;
+    speech?: {
+      speech_seconds: number;
+      segments: Array<[number, number]>;
+    };
+    cache_hit?: boolean;
+    vad?: Record<
+      string,
+      {
+        mode: string;
+        segments: Array<[number, number]>;
+        kept_seconds: number;
+        original_seconds: number;
+      }
+    >;
+    timings?: Record<string, number>;
   };
   created_at: string;
   upload: {
@@ -54,12 +54,23 @@ export default function PredictionCard({ prediction }: PredictionCardProps) {
       <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mb-4">
         <div>
           <div className="text-sm text-[#9CA3AF] mb-1">Emotion</div>
-          <div className={`text-2xl font-bold capitalize ${getEmotionColor(scores.emotion)}`}>
-            {scores.emotion}
-          </div>
-          <div className="text-sm text-[#6B7280]">
-            Confidence: {(scores.emotion_score * 100).toFixed(1)}%
-          </div>
+          {scores.emotion !== null && scores.emotion_score !== null ? (
+            <>
+              <div className={`text-2xl font-bold capitalize ${getEmotionColor(scores.emotion)}`}>
+                {scores.emotion}
+              </div>
+              <div className="text-sm text-[#6B7280]">
+                Confidence: {(scores.emotion_score * 100).toFixed(1)}%
+              </div>
+            </>
+          ) : (
+            <>
+              <div className="text-2xl font-bold text-[#6B7280]">No speech detected</div>
+              <div className="text-sm text-[#6B7280]">
+                Emotion is only analyzed for clips with speech
+              </div>
+            </>
+          )}
         </div>
         <div>
           <div className="text-sm text-[#9CA3AF] mb-1">Sound Type</div>
@@ -2,7 +2,7 @@
 
 -- ## Database Schema
 
--- The application uses three main tables:
+-- The application uses three main tables (plus the worker-only prediction_cache):
 
 -- ### uploads
 -- - `id` (UUID) - Primary key
@@ -15,10 +15,15 @@
 -- - `id` (UUID) - Primary key
 -- - `upload_id` (UUID) - Foreign key to uploads table
 -- - `user_id_sha256` (TEXT) - SHA256 hash of user ID
--- - `status` (TEXT) - Job status: 'queued', 'processing', 'completed', 'failed'
+-- - `status` (TEXT) - Job status: 'queued', 'processing', 'completed', 'failed', 'dead_letter'
+--   ('failed' for permanent errors, 'dead_letter' once transient errors used up every attempt)
 -- - `error` (TEXT) - Error message if job failed
 -- - `started_at` (TIMESTAMP) - Job start time
 -- - `finished_at` (TIMESTAMP) - Job completion time
+-- - `attempts` (INTEGER) - Number of times the job has been claimed
+-- - `next_attempt_at` (TIMESTAMP) - Earliest time a retried job may be claimed again
+-- - `lease_owner` (TEXT) - Id of the worker processing the job
+-- - `lease_expires_at` (TIMESTAMP) - When the job is requeued unless the worker renews its lease
 -- - `created_at` (TIMESTAMP) - Job creation timestamp
 
 -- ### predictions
@@ -27,7 +32,7 @@
 -- - `upload_id` (UUID) - Foreign key to uploads table
 -- - `scores` (JSONB) - ML pipeline output (mood, emotion, energy_level, confidence)
 -- - `model_version` (TEXT) - Version of the ML model used
--- - `inference_time` (FLOAT) - Time taken for inference
+-- - `inference_time` (FLOAT) - Seconds spent in the models (YAMNet + HuBERT)
 -- - `model_name` (TEXT) - Name of the ML model
 -- - `created_at` (TIMESTAMP) - Prediction timestamp
 
@@ -55,13 +60,28 @@ CREATE TABLE IF NOT EXISTS jobs (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     upload_id UUID NOT NULL REFERENCES uploads(id) ON DELETE CASCADE,
     user_id_sha256 TEXT NOT NULL,
-    status TEXT NOT NULL CHECK (status IN ('queued', 'processing', 'completed', 'failed')),
+    status TEXT NOT NULL CHECK (status IN ('queued', 'processing', 'completed', 'failed', 'dead_letter')),
     error TEXT,
     started_at TIMESTAMP WITH TIME ZONE,
     finished_at TIMESTAMP WITH TIME ZONE,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP WITH TIME ZONE,
+    lease_owner TEXT,
+    lease_expires_at TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Lease columns for databases created before they were added
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;
+
+-- Retry columns and the dead_letter status for databases created before them
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE jobs DROP CONSTRAINT IF EXISTS jobs_status_check;
+ALTER TABLE jobs ADD CONSTRAINT jobs_status_check
+    CHECK (status IN ('queued', 'processing', 'completed', 'failed', 'dead_letter'));
+
 -- Create indexes on jobs table
 CREATE INDEX IF NOT EXISTS idx_jobs_upload_id ON jobs(upload_id);
 CREATE INDEX IF NOT EXISTS idx_jobs_user_id ON jobs(user_id_sha256);
@@ -92,9 +112,58 @@ CREATE INDEX IF NOT EXISTS idx_predictions_model_name ON predictions(model_name)
 --   "mood": "calm",
 --   "emotion": "content",
 --   "energy_level": "low",
---   "confidence": 0.91
+--   "confidence": 0.91,
+--   "timings": {
+--     "job_fetch": 0.012, "signed_url": 0.004, "download": 0.081, "decode": 0.035,
+--     "yamnet": 0.142, "hubert": 0.611, "total": 0.885
+--   }
 -- }
 
+-- Prediction cache table
+-- Model outputs keyed by audio content, so a clip that was already analysed
+-- by the same model version is not run through the models again. Keys are
+-- 'sha256:<hex>' (encoded bytes) or 'pcm-sha256:<hex>' (decoded waveform).
+-- Written and read only by the worker (service role), so RLS has no policies.
+CREATE TABLE IF NOT EXISTS prediction_cache (
+    content_hash TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    scores JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (content_hash, model_version)
+);
+
+ALTER TABLE prediction_cache ENABLE ROW LEVEL SECURITY;
+
+-- Lets prune_prediction_cache find old entries without a full scan
+CREATE INDEX IF NOT EXISTS idx_prediction_cache_created_at ON prediction_cache(created_at);
+
+-- Deletes cache entries older than p_max_age. With p_model_version set, also
+-- deletes every entry written by another model version: the worker stores
+-- entries under '<MODEL_VERSION>' or '<MODEL_VERSION>+<analysis settings>',
+-- so entries from a previous model can never be hit again. Returns how many
+-- rows were deleted. Schedule it with pg_cron, e.g.
+--   SELECT cron.schedule('prune-prediction-cache', '0 4 * * *',
+--                        $$SELECT prune_prediction_cache(INTERVAL '30 days', '1.0.0')$$);
+CREATE OR REPLACE FUNCTION prune_prediction_cache(
+    p_max_age INTERVAL DEFAULT INTERVAL '30 days',
+    p_model_version TEXT DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH pruned AS (
+        DELETE FROM prediction_cache
+        WHERE created_at < NOW() - p_max_age
+           OR (p_model_version IS NOT NULL
+               AND model_version <> p_model_version
+               AND model_version NOT LIKE p_model_version || '+%')
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM pruned;
+$$;
+
+REVOKE EXECUTE ON FUNCTION prune_prediction_cache(INTERVAL, TEXT) FROM PUBLIC, anon, authenticated;
+
 -- Playlists table
 -- Stores Spotify playlist recommendations associated with audio uploads
 CREATE TABLE IF NOT EXISTS playlists (
@@ -133,3 +202,276 @@ CREATE INDEX IF NOT EXISTS idx_playlists_created_at ON playlists(created_at);
 --   }
 -- ]
 
+
+-- Worker queue functions
+-- Called by model/services/worker.py through supabase.rpc()
+
+-- Partial index so claiming only scans the queued backlog
+CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs(created_at) WHERE status = 'queued';
+
+-- Atomically claims up to p_limit queued jobs for the calling worker.
+-- FOR UPDATE SKIP LOCKED lets any number of workers claim concurrently without
+-- two of them ever receiving the same job. Claimed jobs are flipped to
+-- 'processing' and returned with their upload row nested under "uploads",
+-- matching the shape of select("*, uploads(*)").
+-- Each claimed job is leased to p_worker_id for p_lease_seconds; the worker
+-- renews the lease with extend_leases while it works on the job.
+-- Jobs requeued for a retry are skipped until their next_attempt_at, and
+-- every claim increments attempts.
+DROP FUNCTION IF EXISTS claim_jobs(INTEGER);
+CREATE OR REPLACE FUNCTION claim_jobs(
+    p_limit INTEGER DEFAULT 1,
+    p_worker_id TEXT DEFAULT NULL,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS TABLE (job JSONB)
+LANGUAGE sql
+AS $$
+    WITH claimable AS (
+        SELECT id
+        FROM jobs
+        WHERE status = 'queued'
+          AND (next_attempt_at IS NULL OR next_attempt_at <= NOW())
+        ORDER BY created_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ), claimed AS (
+        UPDATE jobs
+        SET status = 'processing',
+            started_at = NOW(),
+            attempts = jobs.attempts + 1,
+            lease_owner = p_worker_id,
+            lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+        FROM claimable
+        WHERE jobs.id = claimable.id
+        RETURNING jobs.*
+    )
+    SELECT to_jsonb(claimed) || jsonb_build_object('uploads', to_jsonb(uploads))
+    FROM claimed
+    JOIN uploads ON uploads.id = claimed.upload_id
+    ORDER BY claimed.created_at;
+$$;
+
+-- Only the worker (service role) may claim jobs
+REVOKE EXECUTE ON FUNCTION claim_jobs(INTEGER, TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- Notifies listening workers (channel 'jobs_queued') whenever a job becomes
+-- claimable, so they can claim it immediately instead of waiting for their
+-- next poll. The payload is the job id; workers treat it only as a wake-up.
+-- Retries scheduled for later don't notify; polling picks them up when due.
+CREATE OR REPLACE FUNCTION notify_job_queued()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('jobs_queued', NEW.id::text);
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_jobs_notify_queued ON jobs;
+CREATE TRIGGER trg_jobs_notify_queued
+    AFTER INSERT OR UPDATE OF status ON jobs
+    FOR EACH ROW
+    WHEN (NEW.status = 'queued' AND (NEW.next_attempt_at IS NULL OR NEW.next_attempt_at <= NOW()))
+    EXECUTE FUNCTION notify_job_queued();
+
+-- Claims one specific job regardless of its status (used to re-run a job by
+-- id) and returns it in the same shape as claim_jobs, leased like claim_jobs
+DROP FUNCTION IF EXISTS claim_job(UUID);
+CREATE OR REPLACE FUNCTION claim_job(
+    p_job_id UUID,
+    p_worker_id TEXT DEFAULT NULL,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS TABLE (job JSONB)
+LANGUAGE sql
+AS $$
+    WITH claimed AS (
+        UPDATE jobs
+        SET status = 'processing',
+            started_at = NOW(),
+            attempts = jobs.attempts + 1,
+            lease_owner = p_worker_id,
+            lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+        WHERE id = p_job_id
+        RETURNING jobs.*
+    )
+    SELECT to_jsonb(claimed) || jsonb_build_object('uploads', to_jsonb(uploads))
+    FROM claimed
+    JOIN uploads ON uploads.id = claimed.upload_id;
+$$;
+
+-- Stores a job's prediction and marks the job completed in one transaction,
+-- so completing a job is a single round trip and a job is never 'completed'
+-- without its prediction. p_prediction has the predictions columns as keys.
+-- Only the worker still holding the job's lease (p_worker_id) may complete
+-- it: if the lease expired and the job was reaped or re-claimed, nothing is
+-- written and NULL is returned. Otherwise returns the new prediction id.
+DROP FUNCTION IF EXISTS complete_job(UUID, JSONB);
+CREATE OR REPLACE FUNCTION complete_job(p_job_id UUID, p_prediction JSONB, p_worker_id TEXT DEFAULT NULL)
+RETURNS UUID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_prediction_id UUID;
+BEGIN
+    UPDATE jobs
+    SET status = 'completed', error = NULL, finished_at = NOW(), lease_owner = NULL, lease_expires_at = NULL
+    WHERE id = p_job_id
+      AND status = 'processing'
+      AND lease_owner IS NOT DISTINCT FROM p_worker_id;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO predictions (user_id_sha256, upload_id, scores, model_version, inference_time, model_name)
+    VALUES (
+        p_prediction->>'user_id_sha256',
+        (p_prediction->>'upload_id')::UUID,
+        p_prediction->'scores',
+        p_prediction->>'model_version',
+        (p_prediction->>'inference_time')::FLOAT,
+        p_prediction->>'model_name'
+    )
+    RETURNING id INTO v_prediction_id;
+
+    RETURN v_prediction_id;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION claim_job(UUID, TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION complete_job(UUID, JSONB, TEXT) FROM PUBLIC, anon, authenticated;
+
+-- Bulk version of complete_job used by the worker's write-behind buffer:
+-- marks jobs completed and inserts their predictions, then applies the
+-- p_failed status updates, all in one transaction. Like complete_job, only
+-- jobs still processing under p_worker_id's lease are touched; the rest are
+-- skipped. Returns the ids of the jobs it completed.
+--   p_completed: [{"job_id": ..., "prediction": {<predictions columns>}}, ...]
+--   p_failed:    [{"job_id": ..., "error": "...", "status": "failed" | "dead_letter" | "queued",
+--                  "next_attempt_at": ... (retries only)}, ...]
+DROP FUNCTION IF EXISTS finish_jobs(JSONB, JSONB);
+CREATE OR REPLACE FUNCTION finish_jobs(
+    p_completed JSONB DEFAULT '[]',
+    p_failed JSONB DEFAULT '[]',
+    p_worker_id TEXT DEFAULT NULL
+)
+RETURNS TABLE (completed_job_id UUID)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE jobs
+    SET status = COALESCE(r.status, 'failed'),
+        error = r.error,
+        next_attempt_at = r.next_attempt_at,
+        started_at = CASE WHEN r.status = 'queued' THEN NULL ELSE jobs.started_at END,
+        finished_at = CASE WHEN r.status = 'queued' THEN NULL ELSE NOW() END,
+        lease_owner = NULL,
+        lease_expires_at = NULL
+    FROM jsonb_to_recordset(p_failed) AS r(job_id UUID, error TEXT, status TEXT, next_attempt_at TIMESTAMPTZ)
+    WHERE jobs.id = r.job_id
+      AND jobs.status = 'processing'
+      AND jobs.lease_owner IS NOT DISTINCT FROM p_worker_id;
+
+    RETURN QUERY
+    WITH owned AS (
+        UPDATE jobs
+        SET status = 'completed', error = NULL, finished_at = NOW(), lease_owner = NULL, lease_expires_at = NULL
+        FROM jsonb_to_recordset(p_completed) AS r(job_id UUID, prediction JSONB)
+        WHERE jobs.id = r.job_id
+          AND jobs.status = 'processing'
+          AND jobs.lease_owner IS NOT DISTINCT FROM p_worker_id
+        RETURNING jobs.id, r.prediction
+    ), inserted AS (
+        INSERT INTO predictions (user_id_sha256, upload_id, scores, model_version, inference_time, model_name)
+        SELECT
+            owned.prediction->>'user_id_sha256',
+            (owned.prediction->>'upload_id')::UUID,
+            owned.prediction->'scores',
+            owned.prediction->>'model_version',
+            (owned.prediction->>'inference_time')::FLOAT,
+            owned.prediction->>'model_name'
+        FROM owned
+    )
+    SELECT owned.id FROM owned;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION finish_jobs(JSONB, JSONB, TEXT) FROM PUBLIC, anon, authenticated;
+
+-- Finds processing jobs whose leases have run out (their worker died or
+-- stalled) without scanning finished jobs
+CREATE INDEX IF NOT EXISTS idx_jobs_lease_expires_at ON jobs(lease_expires_at) WHERE status = 'processing';
+
+DROP FUNCTION IF EXISTS reap_expired_leases();
+
+-- Heartbeat: renews the leases p_worker_id still holds on p_job_ids and
+-- returns the ids it renewed. A missing id means the job's lease was lost
+-- (reaped and possibly re-claimed by another worker).
+CREATE OR REPLACE FUNCTION extend_leases(p_worker_id TEXT, p_job_ids UUID[], p_lease_seconds INTEGER DEFAULT 300)
+RETURNS TABLE (job_id UUID)
+LANGUAGE sql
+AS $$
+    UPDATE jobs
+    SET lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    WHERE id = ANY(p_job_ids)
+      AND status = 'processing'
+      AND lease_owner = p_worker_id
+    RETURNING id;
+$$;
+
+-- Puts processing jobs with expired leases back in the queue and returns how
+-- many were reaped. Requeuing fires trg_jobs_notify_queued, so idle
+-- workers pick the jobs up right away. A job that has already been claimed
+-- p_max_attempts times (e.g. it keeps crashing its worker) is dead-lettered
+-- instead. Workers call this periodically; it can also be scheduled with
+-- pg_cron.
+CREATE OR REPLACE FUNCTION reap_expired_leases(p_max_attempts INTEGER DEFAULT 5)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH reaped AS (
+        UPDATE jobs
+        SET status = CASE WHEN attempts >= p_max_attempts THEN 'dead_letter' ELSE 'queued' END,
+            error = CASE WHEN attempts >= p_max_attempts
+                         THEN 'Lease expired on all ' || attempts || ' attempts'
+                         ELSE error END,
+            started_at = CASE WHEN attempts >= p_max_attempts THEN started_at ELSE NULL END,
+            finished_at = CASE WHEN attempts >= p_max_attempts THEN NOW() ELSE NULL END,
+            next_attempt_at = NULL,
+            lease_owner = NULL,
+            lease_expires_at = NULL
+        WHERE status = 'processing'
+          AND lease_expires_at < NOW()
+        RETURNING id
+    )
+    SELECT COUNT(*)::INTEGER FROM reaped;
+$$;
+
+-- Hands jobs p_worker_id claimed but never started back to the queue, for a
+-- worker shutting down with prefetched jobs. The claim's attempt is given
+-- back, since the job never ran. Returns how many jobs were requeued.
+CREATE OR REPLACE FUNCTION release_jobs(p_worker_id TEXT, p_job_ids UUID[])
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH released AS (
+        UPDATE jobs
+        SET status = 'queued',
+            attempts = GREATEST(attempts - 1, 0),
+            started_at = NULL,
+            lease_owner = NULL,
+            lease_expires_at = NULL
+        WHERE id = ANY(p_job_ids)
+          AND status = 'processing'
+          AND lease_owner = p_worker_id
+        RETURNING id
+    )
+    SELECT COUNT(*)::INTEGER FROM released;
+$$;
+
+REVOKE EXECUTE ON FUNCTION extend_leases(TEXT, UUID[], INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION reap_expired_leases(INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION release_jobs(TEXT, UUID[]) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1 @@
+# Model benchmarks package
@@ -0,0 +1,96 @@
+"""
+Microbenchmark for audio decoding.
+
+Compares the old path (temp file -> librosa.load with its default resampler)
+with decode_audio (soundfile + soxr, or an ffmpeg pipe) for each
+upload format at 16, 44.1 and 48 kHz. Clips are 45 s of stereo noise so the
+30 s analysis window is always truncated, as with real uploads. Formats
+ffmpeg cannot encode on this machine are skipped.
+
+Usage (from the model/ directory):
+    python -m benchmarks.bench_decode
+"""
+
+import io
+import os
+import subprocess
+import tempfile
+import timeit
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from services.audio_io import MAX_DURATION_SECONDS, TARGET_SAMPLE_RATE, decode_audio, ffmpeg_available
+
+SAMPLE_RATES = [16000, 44100, 48000]
+CLIP_SECONDS = 45
+CHANNELS = 2
+REPEATS = 5
+
+SOUNDFILE_ENCODINGS = {"wav": ("WAV", "PCM_16"), "flac": ("FLAC", "PCM_16"), "ogg": ("OGG", "VORBIS")}
+FFMPEG_ENCODINGS = {
+    "mp3": ["-f", "mp3"],
+    "webm": ["-c:a", "libopus", "-f", "webm"],
+    # Fragmented MP4, since ffmpeg cannot seek back into a pipe to write the moov atom
+    "m4a": ["-c:a", "aac", "-movflags", "frag_keyframe+empty_moov", "-f", "ipod"],
+}
+
+
+def legacy_decode(data: bytes, file_ext: str):
+    """Decoding as the worker used to do it: write a temp file and librosa.load it."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_ext}") as tmp_file:
+        tmp_file.write(data)
+        tmp_path = tmp_file.name
+    try:
+        return librosa.load(tmp_path, sr=TARGET_SAMPLE_RATE, duration=MAX_DURATION_SECONDS)
+    finally:
+        os.unlink(tmp_path)
+
+
+def encode(audio: np.ndarray, sample_rate: int, file_ext: str):
+    """Encode a (frames, channels) waveform in the given format, or None if unsupported."""
+    if file_ext in SOUNDFILE_ENCODINGS:
+        container, subtype = SOUNDFILE_ENCODINGS[file_ext]
+        buffer = io.BytesIO()
+        sf.write(buffer, audio, sample_rate, format=container, subtype=subtype)
+        return buffer.getvalue()
+
+    if not ffmpeg_available():
+        return None
+    wav = encode(audio, sample_rate, "wav")
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0", *FFMPEG_ENCODINGS[file_ext], "pipe:1"],
+        input=wav, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    return result.stdout if result.returncode == 0 and result.stdout else None
+
+
+def main():
+    rng = np.random.default_rng(0)
+
+    print(f"{'format':>6} | {'rate':>6} | {'legacy (ms)':>12} | {'fast (ms)':>10} | {'speedup':>8} | {'len diff':>8}")
+    print("-" * 66)
+
+    for file_ext in [*SOUNDFILE_ENCODINGS, *FFMPEG_ENCODINGS]:
+        for sample_rate in SAMPLE_RATES:
+            audio = (rng.standard_normal((CLIP_SECONDS * sample_rate, CHANNELS)) * 0.1).astype(np.float32)
+            data = encode(audio, sample_rate, file_ext)
+            if data is None:
+                print(f"{file_ext:>6} | {sample_rate:>6} | skipped (encoder unavailable)")
+                continue
+
+            legacy, _ = legacy_decode(data, file_ext)
+            fast, _ = decode_audio(memoryview(data), file_ext)
+
+            legacy_ms = min(timeit.repeat(lambda: legacy_decode(data, file_ext), number=1, repeat=REPEATS)) * 1000
+            fast_ms = min(timeit.repeat(lambda: decode_audio(memoryview(data), file_ext), number=1, repeat=REPEATS)) * 1000
+
+            print(
+                f"{file_ext:>6} | {sample_rate:>6} | {legacy_ms:>12.2f} | {fast_ms:>10.2f} | "
+                f"{legacy_ms / fast_ms:>7.1f}x | {len(fast) - len(legacy):>+8d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Microbenchmark for HuBERT input preprocessing.
+
+Compares the old path (waveform -> Python list -> feature extractor) with
+prepare_audio_inputs (float32 array -> preallocated matrix -> torch.from_numpy)
+for 5 s, 15 s and 30 s clips at 16 kHz.
+
+Usage (from the model/ directory):
+    python -m benchmarks.bench_preprocess
+"""
+
+import timeit
+
+import numpy as np
+from transformers import Wav2Vec2FeatureExtractor
+
+from services.emotion_classifier import prepare_audio_inputs
+
+SAMPLE_RATE = 16000
+CLIP_SECONDS = [5, 15, 30]
+REPEATS = 20
+
+
+def legacy_preprocess(feature_extractor, audio: np.ndarray):
+    """Preprocessing as CustomEmotionClassifier.__call__ used to do it."""
+    return feature_extractor(audio.tolist(), sampling_rate=SAMPLE_RATE, return_tensors="pt", padding=True)
+
+
+def main():
+    feature_extractor = Wav2Vec2FeatureExtractor(sampling_rate=SAMPLE_RATE, do_normalize=True)
+    rng = np.random.default_rng(0)
+
+    print(f"{'clip':>6} | {'legacy (ms)':>12} | {'zero-copy (ms)':>15} | {'speedup':>8} | {'max abs diff':>12}")
+    print("-" * 66)
+
+    for seconds in CLIP_SECONDS:
+        audio = (rng.standard_normal(seconds * SAMPLE_RATE) * 0.1).astype(np.float32)
+
+        legacy = legacy_preprocess(feature_extractor, audio)["input_values"].numpy()
+        fast = prepare_audio_inputs([audio], feature_extractor, SAMPLE_RATE)["input_values"].numpy()
+        max_diff = float(np.max(np.abs(legacy - fast)))
+
+        legacy_ms = min(timeit.repeat(lambda: legacy_preprocess(feature_extractor, audio), number=1, repeat=REPEATS)) * 1000
+        fast_ms = min(timeit.repeat(lambda: prepare_audio_inputs([audio], feature_extractor, SAMPLE_RATE), number=1, repeat=REPEATS)) * 1000
+
+        print(f"{seconds:>5}s | {legacy_ms:>12.2f} | {fast_ms:>15.2f} | {legacy_ms / fast_ms:>7.1f}x | {max_diff:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
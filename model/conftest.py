@@ -0,0 +1,4 @@
+"""
+pytest configuration: makes the services package importable when the suite
+is run from the model/ directory (python -m pytest tests).
+"""
@@ -0,0 +1,368 @@
+"""
+asyncio variant of the worker: every job's database and storage I/O runs
+concurrently on one event loop, while inference stays serialized on a
+single executor thread.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from supabase import AsyncClient, acreate_client
+
+from .audio_io import DOWNLOAD_CHUNK_SIZE, audio_format_from_path
+from .job_notify import AdaptiveBackoff, JobNotifier
+from .retry_policy import PermanentJobError, is_client_error
+from .timing import StageTimer
+from .wav_range import WavRangePlanner, format_range
+
+
+class AsyncAudioMoodWorker:
+    """
+    Runs jobs as asyncio tasks around an AudioMoodWorker's models.
+
+    Claiming, signing, downloads and DB writes use an async Supabase client
+    and httpx, so hundreds of jobs can be waiting on the network at once.
+    Decoding runs on a small thread pool. Inference requests go through one
+    queue to a single executor thread, which batches whatever is waiting, so
+    the models never run concurrently.
+    """
+
+    def __init__(self, worker, max_in_flight: int = 200, batch_size: int = 1, decode_threads: int = 2,
+                 http_pool_size: int = 100):
+        """
+        Args:
+            worker: Initialized AudioMoodWorker providing models, caches and metrics
+            max_in_flight: Maximum jobs being processed at once
+            batch_size: Maximum clips per inference batch
+            decode_threads: Threads for audio decoding
+            http_pool_size: Maximum concurrent storage connections
+        """
+        self.worker = worker
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.http_pool_size = http_pool_size
+
+        self.supabase: Optional[AsyncClient] = None
+        self.http: Optional[httpx.AsyncClient] = None
+        self._decode_executor = ThreadPoolExecutor(max_workers=decode_threads, thread_name_prefix="async-decode")
+        self._inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-infer")
+        self._inference_queue: Optional[asyncio.Queue] = None
+        self._tasks: set = set()
+
+    async def _connect(self):
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+        if not supabase_url or not supabase_key:
+            raise ValueError(
+                "SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set"
+            )
+
+        self.supabase = await acreate_client(supabase_url, supabase_key)
+        self.http = httpx.AsyncClient(
+            timeout=30,
+            limits=httpx.Limits(max_connections=self.http_pool_size, max_keepalive_connections=self.http_pool_size)
+        )
+
+    async def run(self, poll_interval: float = 5, min_poll_interval: float = 0.25,
+                  notifier: Optional[JobNotifier] = None):
+        """
+        Claim and process jobs until interrupted.
+
+        Args:
+            poll_interval: Maximum seconds between polls when the queue is empty
+            min_poll_interval: First backoff delay after the queue drains
+            notifier: Source of new-job wake-ups (defaults to polling only)
+        """
+        if notifier is None:
+            notifier = JobNotifier()
+        backoff = AdaptiveBackoff(min_interval=min(min_poll_interval, poll_interval), max_interval=poll_interval)
+
+        await self._connect()
+        self._inference_queue = asyncio.Queue()
+        inference_task = asyncio.create_task(self._inference_loop())
+
+        print(
+            f"Async worker started (max_in_flight={self.max_in_flight}, batch_size={self.batch_size}). "
+            "Polling for queued jobs..."
+        )
+
+        try:
+            while True:
+                try:
+                    free_slots = self.max_in_flight - len(self._tasks)
+                    if free_slots <= 0:
+                        await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                        continue
+
+                    claim_start = time.perf_counter()
+                    jobs = await self._claim_jobs(free_slots)
+                    claim_time = time.perf_counter() - claim_start
+
+                    if jobs:
+                        backoff.reset()
+                        await self._start_jobs(jobs, claim_time)
+                    elif await asyncio.to_thread(notifier.wait, backoff.next_delay()):
+                        backoff.reset()
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Error in async worker loop: {str(e)}")
+                    await asyncio.sleep(backoff.next_delay())
+        finally:
+            notifier.close()
+            if self._tasks:
+                print(f"Waiting for {len(self._tasks)} in-flight job(s)...")
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            inference_task.cancel()
+            await self.http.aclose()
+            self._decode_executor.shutdown(wait=True)
+            self._inference_executor.shutdown(wait=True)
+
+    async def _claim_jobs(self, limit: int) -> List[Dict[str, Any]]:
+        poll_start = time.perf_counter()
+        response = await self.supabase.rpc("claim_jobs", {
+            "p_limit": limit,
+            "p_worker_id": self.worker.worker_id,
+            "p_lease_seconds": self.worker.lease_seconds
+        }).execute()
+        self.worker.metrics.queue_poll_seconds.observe(time.perf_counter() - poll_start)
+
+        jobs = [row["job"] for row in (response.data or [])]
+        self.worker.metrics.jobs_claimed.inc(len(jobs))
+        self.worker.leases.track(job["id"] for job in jobs)
+        return jobs
+
+    async def _start_jobs(self, jobs: List[Dict[str, Any]], claim_time: float):
+        """Sign a claimed batch in one request and start a task per job."""
+        presign_start = time.perf_counter()
+        file_paths = {}
+        for job in jobs:
+            try:
+                file_paths[job["id"]] = self.worker._storage_path(job)
+            except Exception:
+                pass
+        try:
+            await self._sign_storage_paths(list(file_paths.values()))
+        except Exception as e:
+            print(f"Error generating signed URLs for batch: {str(e)}")
+        presign_time = time.perf_counter() - presign_start
+
+        for job in jobs:
+            timer = StageTimer()
+            timer.add("job_fetch", claim_time / len(jobs))
+            timer.add("signed_url", presign_time / len(jobs))
+            task = asyncio.create_task(self._process_job(job, timer))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _sign_storage_paths(self, file_paths: List[str]) -> Dict[str, str]:
+        signed, missing = self.worker.signed_urls.lookup(file_paths)
+
+        if not missing:
+            return signed
+
+        signed_at = time.monotonic()
+        signed_urls_response = await self.supabase.storage.from_("audio_files").create_signed_urls(
+            missing, expires_in=self.worker.signed_urls.expires_in
+        )
+        signed.update(self.worker._cache_signed_urls(missing, signed_urls_response, signed_at))
+        return signed
+
+    async def _process_job(self, job: Dict[str, Any], timer: StageTimer):
+        job_id = job["id"]
+        try:
+            loop = asyncio.get_running_loop()
+            audio_data, sample_rate = await self._load_job_audio(job, timer)
+            # Prediction cache queries are blocking DB calls; keep them off the loop and the inference thread
+            await loop.run_in_executor(
+                self._decode_executor, self.worker._lookup_cached_analysis, job, audio_data, sample_rate, timer
+            )
+            mood_analysis = await self._infer(job, audio_data, sample_rate, timer)
+            await loop.run_in_executor(self._decode_executor, self.worker._cache_analysis, job)
+            result = await self._store_prediction(job, mood_analysis, timer)
+            if result.get("queued"):
+                print(f"✓ Job {job_id} processed, result queued for writing")
+            elif result["success"]:
+                print(f"✓ Job {job_id} completed successfully")
+        except Exception as e:
+            print(f"✗ Job {job_id} failed: {str(e)}")
+            if self.worker._lease_lost(job_id):
+                self.worker._discard_result(job)
+                return
+            update = self.worker._job_failure_update(job, e)
+            try:
+                query = self.worker._failed_job_write(self.supabase, job_id, update)
+                if query is not None:
+                    await query.execute()
+            except Exception as update_error:
+                print(f"Error updating failed job {job_id}: {str(update_error)}")
+            self.worker._release_lease(job_id)
+
+    async def _load_job_audio(self, job: Dict[str, Any], timer: StageTimer) -> Tuple[np.ndarray, int]:
+        file_path = self.worker._storage_path(job)
+        audio_bytes, etag = await self._download_audio_bytes(
+            file_path, timer, if_none_match=self.worker._cached_etag(file_path)
+        )
+
+        if audio_bytes is None:
+            cached = self.worker._load_cached_audio(file_path, etag)
+            if cached is not None:
+                return cached
+            audio_bytes, etag = await self._download_audio_bytes(file_path, timer)
+
+        self.worker._record_content_hash(job, audio_bytes)
+
+        loop = asyncio.get_running_loop()
+        with timer.stage("decode"):
+            audio_data, sample_rate = await loop.run_in_executor(
+                self._decode_executor, self.worker._decode_audio, audio_bytes, audio_format_from_path(file_path)
+            )
+
+        await loop.run_in_executor(self._decode_executor, self.worker._cache_decoded_audio, file_path, etag, audio_data)
+        return audio_data, sample_rate
+
+    async def _download_audio_bytes(self, file_path: str, timer: StageTimer,
+                                    if_none_match: Optional[str] = None) -> Tuple[Optional[bytearray], Optional[str]]:
+        """Async counterpart of AudioMoodWorker._download_audio_bytes: returns (bytes or None on a 304, ETag)."""
+        while True:
+            with timer.stage("signed_url"):
+                cached_url = self.worker.signed_urls.get(file_path)
+                signed_url = cached_url or (await self._sign_storage_paths([file_path])).get(file_path)
+
+            if not signed_url:
+                raise PermanentJobError(f"Failed to generate signed URL for: {file_path}")
+
+            try:
+                with timer.stage("download"):
+                    return await self._download_signed_url(file_path, signed_url, if_none_match)
+            except Exception as e:
+                # A rejected cached URL is re-signed once before the error counts
+                if cached_url is None or not is_client_error(e):
+                    raise
+                print(f"Cached signed URL for {file_path} rejected ({str(e)}), re-signing")
+                self.worker.signed_urls.invalidate(file_path, cached_url)
+
+    async def _download_signed_url(self, file_path: str, signed_url: str,
+                                   if_none_match: Optional[str] = None) -> Tuple[Optional[bytearray], Optional[str]]:
+        """Async counterpart of AudioMoodWorker._download_signed_url."""
+        if self.worker.ranged_downloads and audio_format_from_path(file_path) == "wav":
+            return await self._download_wav_prefix(signed_url, if_none_match)
+
+        headers = {"If-None-Match": if_none_match} if if_none_match else None
+
+        async with self.http.stream("GET", signed_url, headers=headers) as response:
+            if response.status_code == 304:
+                return None, if_none_match
+            response.raise_for_status()
+            audio_bytes = bytearray()
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                audio_bytes.extend(chunk)
+
+        self.worker.metrics.download_bytes.inc(len(audio_bytes), mode="full")
+        return audio_bytes, response.headers.get("ETag")
+
+    async def _download_wav_prefix(self, signed_url: str,
+                                   if_none_match: Optional[str] = None) -> Tuple[Optional[bytearray], Optional[str]]:
+        """Async counterpart of AudioMoodWorker._download_wav_prefix."""
+        planner = WavRangePlanner()
+        headers = {"If-None-Match": if_none_match} if if_none_match else {}
+        byte_range = planner.first_range()
+        audio_bytes = bytearray()
+        etag = None
+
+        while byte_range is not None:
+            headers["Range"] = format_range(byte_range)
+            async with self.http.stream("GET", signed_url, headers=headers) as response:
+                if response.status_code == 304:
+                    return None, if_none_match
+                response.raise_for_status()
+
+                if response.status_code != 206:
+                    # Range ignored, or the object changed since the first range
+                    audio_bytes = bytearray()
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        audio_bytes.extend(chunk)
+                    self.worker.metrics.download_bytes.inc(len(audio_bytes), mode="full")
+                    return audio_bytes, response.headers.get("ETag")
+
+                etag = etag or response.headers.get("ETag")
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    audio_bytes.extend(chunk)
+                planner.received(response.headers.get("Content-Range"), len(audio_bytes))
+
+            headers = {"If-Range": etag} if etag else {}
+            byte_range = planner.next_range(audio_bytes)
+
+        for offset, patch in planner.header_patches(len(audio_bytes)):
+            audio_bytes[offset:offset + len(patch)] = patch
+
+        self.worker.metrics.download_bytes.inc(len(audio_bytes), mode="ranged")
+        return audio_bytes, etag
+
+    async def _infer(self, job: Dict[str, Any], audio_data: np.ndarray, sample_rate: int,
+                     timer: StageTimer) -> Dict[str, Any]:
+        """Queue a clip for the inference thread and wait for its mood analysis."""
+        future = asyncio.get_running_loop().create_future()
+        await self._inference_queue.put((job, audio_data, sample_rate, timer, future))
+        return await future
+
+    async def _inference_loop(self):
+        """Serially run batches of queued clips through the models on the inference thread."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._inference_queue.get()]
+            while len(batch) < self.batch_size and not self._inference_queue.empty():
+                batch.append(self._inference_queue.get_nowait())
+
+            self.worker.metrics.batch_size.observe(len(batch))
+            loaded = [(job, audio_data, sample_rate) for job, audio_data, sample_rate, _, _ in batch]
+            timers = {job["id"]: timer for job, _, _, timer, _ in batch}
+
+            busy_start = time.perf_counter()
+            try:
+                analyses = await loop.run_in_executor(self._inference_executor, self.worker._run_models, loaded, timers)
+                for (_, _, _, _, future), analysis in zip(batch, analyses):
+                    future.set_result(analysis)
+            except Exception as e:
+                for _, _, _, _, future in batch:
+                    future.set_exception(e)
+            finally:
+                self.worker.metrics.inference_busy_seconds.inc(time.perf_counter() - busy_start)
+
+    async def _store_prediction(self, job: Dict[str, Any], mood_analysis: Dict[str, Any],
+                                timer: StageTimer) -> Dict[str, Any]:
+        """
+        Store a job's prediction and mark it completed, unless the job's lease was lost.
+
+        Returns:
+            Processing results as from AudioMoodWorker._store_prediction ('queued'
+            if handed to the worker's result writer)
+        """
+        if self.worker._lease_lost(job["id"]):
+            return self.worker._discard_result(job)
+
+        prediction_data = self.worker._prediction_row(job, mood_analysis, timer)
+
+        if self.worker.result_writer is not None:
+            self.worker.result_writer.add_completed(job["id"], prediction_data, (job, mood_analysis, timer))
+            return {"success": True, "queued": True, "job_id": job["id"]}
+
+        with timer.stage("db_write"):
+            response = await self.supabase.rpc("complete_job", {
+                "p_job_id": job["id"],
+                "p_prediction": prediction_data,
+                "p_worker_id": self.worker.worker_id
+            }).execute()
+
+        if response.data is None:
+            return self.worker._discard_result(job)
+
+        return self.worker._record_completion(job, mood_analysis, timer)
@@ -0,0 +1,208 @@
+"""
+On-disk LRU cache of decoded audio, so reprocessing a storage object that
+has not changed skips both the download and the decode.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+from .audio_io import TARGET_SAMPLE_RATE
+
+# ETags are stored hex-encoded in file names; longer ones are not cached
+MAX_ETAG_LENGTH = 96
+
+
+class _CacheEntry(NamedTuple):
+    etag: str
+    file_name: str
+    size: int
+
+
+class DecodedAudioCache:
+    """
+    Decoded float32 waveforms stored as .npy files, keyed by storage path + ETag.
+
+    The worker sends the cached ETag as If-None-Match when downloading an
+    object. A 304 response means the cached waveform is still current, and
+    load() maps it with np.load(mmap_mode='r'): nothing is copied until the
+    models read it. Files are evicted least recently used first once their
+    total size exceeds max_bytes.
+
+    The index lives in memory and is rebuilt from the directory at startup,
+    so the cache survives restarts. Several processes may share a directory;
+    each enforces the byte budget on the files it knows about, and a file
+    deleted by another process is simply a miss.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 ** 3, sample_rate: int = TARGET_SAMPLE_RATE):
+        """
+        Args:
+            directory: Cache directory (created if missing)
+            max_bytes: Disk budget for cached waveforms
+            sample_rate: Sample rate of the cached waveforms; part of every key
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def total_bytes(self) -> int:
+        """Bytes of cached waveforms this process knows about."""
+        with self._lock:
+            return self._total_bytes
+
+    def etag(self, path: str) -> Optional[str]:
+        """
+        ETag of the cached waveform for a storage path, to send as If-None-Match.
+
+        Args:
+            path: Storage path inside the bucket
+
+        Returns:
+            Cached ETag, or None if the path is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(self._path_key(path))
+            return entry.etag if entry is not None else None
+
+    def load(self, path: str, etag: str) -> Optional[np.ndarray]:
+        """
+        Map a cached waveform read-only.
+
+        Args:
+            path: Storage path inside the bucket
+            etag: ETag the cached waveform must have
+
+        Returns:
+            Read-only memory-mapped waveform, or None on a miss
+        """
+        key = self._path_key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.etag != etag:
+                return None
+            self._entries.move_to_end(key)
+
+        file_path = os.path.join(self.directory, entry.file_name)
+        try:
+            audio = np.load(file_path, mmap_mode="r")
+            # mtime orders the LRU when the index is rebuilt
+            os.utime(file_path)
+            return audio
+        except (OSError, ValueError) as e:
+            print(f"Audio cache entry unreadable, dropping it: {str(e)}")
+            self._remove(key, entry)
+            return None
+
+    def store(self, path: str, etag: Optional[str], audio_data: np.ndarray):
+        """
+        Cache a decoded waveform, replacing any older version of the path.
+
+        Args:
+            path: Storage path inside the bucket
+            etag: ETag of the downloaded object (nothing is cached without one)
+            audio_data: Waveform decoded at sample_rate
+        """
+        if not etag or len(etag) > MAX_ETAG_LENGTH:
+            return
+
+        key = self._path_key(path)
+        file_name = f"{key}.{etag.encode('utf-8').hex()}.{self.sample_rate}.npy"
+        file_path = os.path.join(self.directory, file_name)
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.asarray(audio_data, dtype=np.float32))
+            # Atomic, so readers in other processes never see a partial file
+            os.replace(tmp_path, file_path)
+            size = os.path.getsize(file_path)
+        except OSError as e:
+            print(f"Could not write audio cache entry: {str(e)}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old.size
+            self._entries[key] = _CacheEntry(etag, file_name, size)
+            self._total_bytes += size
+            evicted = self._evict_locked()
+
+        if old is not None and old.file_name != file_name:
+            evicted.append(old.file_name)
+        for name in evicted:
+            self._unlink(name)
+
+    def _path_key(self, path: str) -> str:
+        return hashlib.sha256(path.encode("utf-8")).hexdigest()[:40]
+
+    def _evict_locked(self) -> list:
+        evicted = []
+        while self._total_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size
+            evicted.append(entry.file_name)
+        return evicted
+
+    def _remove(self, key: str, entry: _CacheEntry):
+        with self._lock:
+            if self._entries.get(key) == entry:
+                del self._entries[key]
+                self._total_bytes -= entry.size
+        self._unlink(entry.file_name)
+
+    def _unlink(self, file_name: str):
+        try:
+            os.unlink(os.path.join(self.directory, file_name))
+        except OSError:
+            pass
+
+    def _load_index(self):
+        """Rebuild the index from cache files, oldest access first."""
+        found: Dict[str, tuple] = {}
+        superseded = []
+        suffix = f".{self.sample_rate}.npy"
+
+        for name in os.listdir(self.directory):
+            if not name.endswith(suffix):
+                continue
+            key, _, etag_hex = name[:-len(suffix)].partition(".")
+            try:
+                etag = bytes.fromhex(etag_hex).decode("utf-8")
+                stat = os.stat(os.path.join(self.directory, name))
+            except (ValueError, OSError):
+                continue
+            entry = (stat.st_mtime, _CacheEntry(etag, name, stat.st_size))
+            # Keep only the newest version of each path
+            if key in found and found[key][0] >= stat.st_mtime:
+                superseded.append(name)
+                continue
+            if key in found:
+                superseded.append(found[key][1].file_name)
+            found[key] = entry
+
+        for key, (_, entry) in sorted(found.items(), key=lambda item: item[1][0]):
+            self._entries[key] = entry
+            self._total_bytes += entry.size
+
+        for name in superseded + self._evict_locked():
+            self._unlink(name)
+
+        if self._entries:
+            print(f"Audio cache: {len(self._entries)} waveform(s), {self._total_bytes / 1024 ** 2:.1f} MB in {self.directory}")
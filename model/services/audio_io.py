@@ -0,0 +1,329 @@
+"""
+In-memory audio download buffers and decoding helpers for the worker.
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import numpy as np
+import librosa
+import soundfile as sf
+import soxr
+from typing import Iterable, Optional, Tuple
+
+# Sample rate and analysis window every clip is decoded to
+TARGET_SAMPLE_RATE = 16000
+MAX_DURATION_SECONDS = 30
+
+SUPPORTED_FORMATS = ['wav', 'mp3', 'm4a', 'ogg', 'webm', 'flac']
+
+# Formats libsndfile can decode from a file-like object. Anything else (WebM,
+# M4A) goes through audioread, which needs a real path to hand to its decoder.
+IN_MEMORY_FORMATS = {'wav', 'flac', 'ogg', 'mp3'}
+
+# Fast decode backend per format: libsndfile in-process, or an ffmpeg pipe for
+# compressed containers. Formats without one use the librosa path.
+SOUNDFILE_FORMATS = {'wav', 'flac', 'ogg'}
+FFMPEG_FORMATS = {'webm', 'm4a', 'mp3'}
+
+FFMPEG_TIMEOUT_SECONDS = 60
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class AudioDecodeError(Exception):
+    """Downloaded bytes could not be decoded as audio."""
+
+
+class DownloadBuffer:
+    """
+    Growable byte buffer reused across downloads.
+
+    Keeps its allocation between jobs so steady-state downloads stream into
+    memory that is already there instead of building a fresh bytes object.
+    A bytearray cannot be resized while a view of it is alive, so growing
+    the buffer while a caller still holds one (e.g. the previous range's)
+    moves the contents to a new allocation instead of raising BufferError.
+    Not thread-safe: use one buffer per thread.
+    """
+
+    def __init__(self, initial_size: int = 1024 * 1024):
+        self._data = bytearray(initial_size)
+        self.size = 0
+
+    def fill(self, chunks: Iterable[bytes]) -> memoryview:
+        """
+        Replace the buffer contents with the given chunks.
+
+        Args:
+            chunks: Byte chunks, e.g. response.iter_content()
+
+        Returns:
+            Read-only view of the filled bytes
+        """
+        self.size = 0
+        return self.extend(chunks)
+
+    def extend(self, chunks: Iterable[bytes]) -> memoryview:
+        """
+        Append chunks after the current contents, e.g. the next byte range.
+
+        Returns:
+            Read-only view of all the bytes in the buffer
+        """
+        for chunk in chunks:
+            end = self.size + len(chunk)
+            if end > len(self._data):
+                self._grow(end)
+            self._data[self.size:end] = chunk
+            self.size = end
+        return self.view()
+
+    def _grow(self, size: int):
+        """Make room for at least size bytes, at least doubling the allocation."""
+        new_size = max(size, 2 * len(self._data))
+        try:
+            self._data.extend(bytes(new_size - len(self._data)))
+        except BufferError:
+            # A view of the current allocation is still alive; leave it intact
+            data = bytearray(new_size)
+            data[:self.size] = memoryview(self._data)[:self.size]
+            self._data = data
+
+    def write_at(self, offset: int, data: bytes):
+        """Overwrite bytes inside the current contents, e.g. to patch a header."""
+        if offset < 0 or offset + len(data) > self.size:
+            raise ValueError("write_at outside the buffered bytes")
+        self._data[offset:offset + len(data)] = data
+
+    def view(self) -> memoryview:
+        """Return a read-only view of the current contents."""
+        return memoryview(self._data)[:self.size].toreadonly()
+
+    def reader(self) -> "MemoryReader":
+        """Return a seekable file-like reader over the current contents."""
+        return MemoryReader(self.view())
+
+
+class MemoryReader(io.RawIOBase):
+    """Seekable, read-only file object over a memoryview, without copying it."""
+
+    def __init__(self, data: memoryview):
+        self._data = data
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = min(len(buffer), len(self._data) - self._pos)
+        if count <= 0:
+            return 0
+        buffer[:count] = self._data[self._pos:self._pos + count]
+        self._pos += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._pos + offset
+        elif whence == io.SEEK_END:
+            position = len(self._data) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        self._pos = max(0, position)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def audio_format_from_path(file_path: str) -> str:
+    """
+    Guess the audio container format from a storage path.
+
+    Args:
+        file_path: Storage path or file name
+
+    Returns:
+        Lowercase extension from SUPPORTED_FORMATS (defaults to 'wav')
+    """
+    file_ext = file_path.split('.')[-1].lower() if '.' in file_path else 'wav'
+    if file_ext not in SUPPORTED_FORMATS:
+        file_ext = 'wav'
+    return file_ext
+
+
+def decode_audio(data: memoryview, file_ext: str, sample_rate: int = TARGET_SAMPLE_RATE,
+                 duration: Optional[float] = MAX_DURATION_SECONDS, ffmpeg_pool=None) -> Tuple[np.ndarray, int]:
+    """
+    Decode downloaded audio bytes to a mono float32 waveform.
+
+    WAV, FLAC and OGG are decoded in-process by libsndfile and resampled
+    with soxr; WebM, M4A and MP3 are piped through ffmpeg,
+    which decodes, downmixes and resamples in one pass. If the fast backend
+    fails (or ffmpeg is not installed), librosa.load is used as before.
+
+    Args:
+        data: Encoded audio bytes
+        file_ext: Container format, e.g. from audio_format_from_path()
+        sample_rate: Sample rate to resample to
+        duration: Maximum seconds to decode (None for the whole file)
+        ffmpeg_pool: Optional FfmpegDecoderPool of warm ffmpeg processes to decode with
+
+    Returns:
+        Tuple of (audio waveform, sample rate)
+
+    Raises:
+        AudioDecodeError: If no decoder could read the data
+    """
+    try:
+        if file_ext in SOUNDFILE_FORMATS:
+            return decode_with_soundfile(data, sample_rate, duration), sample_rate
+        if file_ext in FFMPEG_FORMATS and ffmpeg_pool is not None and ffmpeg_pool.serves(sample_rate, duration):
+            return ffmpeg_pool.decode(data), sample_rate
+        if file_ext in FFMPEG_FORMATS and ffmpeg_available():
+            return decode_with_ffmpeg(data, sample_rate, duration), sample_rate
+    except Exception as e:
+        print(f"Fast decode failed for .{file_ext}, falling back to librosa: {str(e)}")
+
+    return decode_audio_librosa(data, file_ext, sample_rate, duration)
+
+
+def decode_audio_librosa(data: memoryview, file_ext: str, sample_rate: int = TARGET_SAMPLE_RATE,
+                         duration: Optional[float] = MAX_DURATION_SECONDS) -> Tuple[np.ndarray, int]:
+    """
+    Decode audio bytes with librosa.load (the original decode path).
+
+    Formats libsndfile understands are decoded straight from memory. Other
+    containers, or in-memory decodes that fail, fall back to a temporary file.
+
+    Raises:
+        AudioDecodeError: If no decoder could read the data
+    """
+    if file_ext in IN_MEMORY_FORMATS:
+        try:
+            return librosa.load(MemoryReader(data), sr=sample_rate, duration=duration)
+        except Exception as e:
+            print(f"In-memory decode failed for .{file_ext}, falling back to temp file: {str(e)}")
+
+    try:
+        return _decode_via_temp_file(data, file_ext, sample_rate, duration)
+    except Exception as e:
+        raise AudioDecodeError(f"Could not decode .{file_ext} audio: {str(e)}") from e
+
+
+def decode_with_soundfile(data: memoryview, sample_rate: int = TARGET_SAMPLE_RATE,
+                          duration: Optional[float] = MAX_DURATION_SECONDS) -> np.ndarray:
+    """
+    Decode WAV/FLAC/OGG bytes with libsndfile, reading only the first duration seconds.
+
+    Args:
+        data: Encoded audio bytes
+        sample_rate: Sample rate to resample to
+        duration: Maximum seconds to decode (None for the whole file)
+
+    Returns:
+        Mono float32 waveform at sample_rate
+    """
+    with sf.SoundFile(MemoryReader(data)) as f:
+        frames = -1 if duration is None else int(duration * f.samplerate)
+        audio = f.read(frames, dtype='float32', always_2d=True)
+        native_rate = f.samplerate
+
+    # Average the channels, as librosa.to_mono does
+    audio = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1, dtype=np.float32)
+    return resample(audio, native_rate, sample_rate)
+
+
+def decode_with_ffmpeg(data: memoryview, sample_rate: int = TARGET_SAMPLE_RATE,
+                       duration: Optional[float] = MAX_DURATION_SECONDS) -> np.ndarray:
+    """
+    Decode any container ffmpeg understands by piping the bytes through it.
+
+    ffmpeg reads the upload on stdin and writes mono float32 PCM at
+    sample_rate to stdout, so nothing touches the disk.
+
+    Args:
+        data: Encoded audio bytes
+        sample_rate: Sample rate to resample to
+        duration: Maximum seconds to decode (None for the whole file)
+
+    Returns:
+        Mono float32 waveform at sample_rate
+    """
+    result = subprocess.run(
+        ffmpeg_command(sample_rate, duration),
+        input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        timeout=FFMPEG_TIMEOUT_SECONDS, check=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with {result.returncode}: {result.stderr.decode(errors='replace').strip()}")
+    return pcm_to_waveform(result.stdout)
+
+
+def ffmpeg_command(sample_rate: int, duration: Optional[float]) -> list:
+    """ffmpeg arguments that decode stdin to mono float32 PCM on stdout."""
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0"]
+    if duration is not None:
+        command += ["-t", str(duration)]
+    return command + ["-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "pipe:1"]
+
+
+def pcm_to_waveform(pcm: bytes) -> np.ndarray:
+    """Wrap raw little-endian float32 PCM from ffmpeg as a waveform."""
+    if not pcm:
+        raise ValueError("ffmpeg produced no audio")
+    # Drop a trailing partial sample if the stream was cut mid-write
+    usable = len(pcm) - len(pcm) % 4
+    return np.frombuffer(pcm, dtype='<f4', count=usable // 4).astype(np.float32, copy=False)
+
+
+_ffmpeg_available: Optional[bool] = None
+
+
+def ffmpeg_available() -> bool:
+    """Whether an ffmpeg binary is on PATH (checked once per process)."""
+    global _ffmpeg_available
+    if _ffmpeg_available is None:
+        _ffmpeg_available = shutil.which("ffmpeg") is not None
+        if not _ffmpeg_available:
+            print("ffmpeg not found on PATH; WebM/M4A/MP3 will be decoded with librosa")
+    return _ffmpeg_available
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    Resample with soxr at 'HQ' quality, librosa's default resampler (soxr_hq).
+
+    Args:
+        audio: Mono waveform
+        orig_sr: Sample rate of audio
+        target_sr: Sample rate to convert to
+
+    Returns:
+        float32 waveform at target_sr
+    """
+    if orig_sr == target_sr:
+        return np.ascontiguousarray(audio, dtype=np.float32)
+    resampled = soxr.resample(np.asarray(audio, dtype=np.float32), orig_sr, target_sr, quality="HQ")
+    return np.ascontiguousarray(resampled, dtype=np.float32)
+
+
+def _decode_via_temp_file(data: memoryview, file_ext: str, sample_rate: int,
+                          duration: Optional[float]) -> Tuple[np.ndarray, int]:
+    """Decode audio bytes by writing them to a temporary file for audioread."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_ext}') as tmp_file:
+        tmp_file.write(data)
+        tmp_path = tmp_file.name
+
+    try:
+        return librosa.load(tmp_path, sr=sample_rate, duration=duration)
+    finally:
+        os.unlink(tmp_path)
@@ -0,0 +1,209 @@
+"""
+Write-behind buffer for job results: finished jobs are stored in bulk
+through the finish_jobs RPC instead of one round trip per job.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# (job id, predictions row, caller context)
+CompletedEntry = Tuple[str, Dict[str, Any], Any]
+# (job id, jobs column updates with at least 'status' and 'error')
+FailedEntry = Tuple[str, Dict[str, Any]]
+
+
+class BulkResultWriter:
+    """
+    Buffers completed and failed jobs and writes them with one finish_jobs
+    call per flush.
+
+    A flush happens once flush_rows jobs are waiting, once the oldest has
+    waited flush_interval seconds, and on close(). finish_jobs inserts the
+    predictions and updates the job statuses in one transaction, so a job is
+    never marked completed before its prediction is stored, and on_completed
+    only runs after that transaction has committed.
+
+    finish_jobs only writes jobs still leased to worker_id. A completion whose
+    lease was lost in the meantime (the job was reaped and may be running
+    elsewhere) is not stored and goes to on_discarded instead.
+
+    If a bulk write fails, its jobs are retried one at a time so a single bad
+    row cannot fail the rest; a completion that still cannot be written is
+    passed to on_failed.
+    """
+
+    def __init__(self, supabase, flush_rows: int = 100, flush_interval: float = 0.5,
+                 worker_id: Optional[str] = None,
+                 on_completed: Optional[Callable[[Any, float], None]] = None,
+                 on_failed: Optional[Callable[[str, Exception, Any], None]] = None,
+                 on_discarded: Optional[Callable[[Any], None]] = None,
+                 on_flushed: Optional[Callable[[int], None]] = None):
+        """
+        Args:
+            supabase: Supabase client used for the finish_jobs RPC
+            flush_rows: Buffered jobs that trigger a flush
+            flush_interval: Maximum seconds a job waits in the buffer
+            worker_id: Lease owner the buffered jobs were claimed under
+            on_completed: Called with (context, write seconds share) once a prediction is stored
+            on_failed: Called with (job id, error, context) when a prediction could not be stored
+            on_discarded: Called with the context of a completion dropped because its lease was lost
+            on_flushed: Called with the number of jobs in each successful bulk write
+        """
+        if flush_rows < 1 or flush_interval <= 0:
+            raise ValueError("Require flush_rows >= 1 and flush_interval > 0")
+
+        self.supabase = supabase
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.worker_id = worker_id
+        self.on_completed = on_completed
+        self.on_failed = on_failed
+        self.on_discarded = on_discarded
+        self.on_flushed = on_flushed
+
+        self._completed: List[CompletedEntry] = []
+        self._failed: List[FailedEntry] = []
+        self._oldest: Optional[float] = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._flush_loop, name="bulk-writer", daemon=True)
+        self._thread.start()
+
+    def pending(self) -> int:
+        """Number of jobs waiting to be written."""
+        with self._cond:
+            return len(self._completed) + len(self._failed)
+
+    def add_completed(self, job_id: str, prediction: Dict[str, Any], context: Any = None):
+        """
+        Buffer a prediction row; its job is marked completed in the same write.
+
+        Args:
+            job_id: UUID of the finished job
+            prediction: Row to insert into predictions
+            context: Passed back to on_completed/on_failed
+        """
+        entry = (job_id, prediction, context)
+        if not self._buffer(self._completed, entry):
+            self._write([entry], [])
+
+    def add_failed(self, job_id: str, update: Dict[str, Any]):
+        """
+        Buffer a failed job's status update (failed, dead-lettered or requeued for retry).
+
+        Args:
+            job_id: UUID of the failed job
+            update: Column updates with 'status', 'error' and, for retries, 'next_attempt_at'
+        """
+        entry = (job_id, update)
+        if not self._buffer(self._failed, entry):
+            self._write([], [entry])
+
+    def close(self):
+        """Stop the flush thread and write everything still buffered."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+        completed, failed = self._take()
+        if completed or failed:
+            print(f"Flushing {len(completed) + len(failed)} buffered job result(s)...")
+            self._write(completed, failed)
+
+    def _buffer(self, buffer: list, entry) -> bool:
+        """Append entry unless closed; returns False if the caller must write it directly."""
+        with self._cond:
+            if self._closed:
+                return False
+
+            buffer.append(entry)
+            if self._oldest is None:
+                # Start the flush thread's interval timer
+                self._oldest = time.monotonic()
+                self._cond.notify()
+            elif len(self._completed) + len(self._failed) >= self.flush_rows:
+                self._cond.notify()
+            return True
+
+    def _take(self) -> Tuple[List[CompletedEntry], List[FailedEntry]]:
+        with self._cond:
+            completed, failed = self._completed, self._failed
+            self._completed, self._failed = [], []
+            self._oldest = None
+            return completed, failed
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    size = len(self._completed) + len(self._failed)
+                    if size >= self.flush_rows:
+                        break
+                    if not size:
+                        self._cond.wait()
+                        continue
+                    remaining = self._oldest + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                if self._closed:
+                    # close() flushes whatever is left
+                    return
+
+            completed, failed = self._take()
+            self._write(completed, failed)
+
+    def _write(self, completed: List[CompletedEntry], failed: List[FailedEntry]):
+        write_start = time.perf_counter()
+        try:
+            written = self._finish_jobs(completed, failed)
+        except Exception as e:
+            if len(completed) + len(failed) == 1:
+                self._report_failure(completed, failed, e)
+            else:
+                print(f"Bulk write of {len(completed) + len(failed)} job(s) failed, writing one at a time: {str(e)}")
+                self._write_individually(completed, failed)
+            return
+
+        if self.on_flushed is not None:
+            self.on_flushed(len(completed) + len(failed))
+
+        # Every job in the write waited on the same round trip; charge each an equal share
+        write_time = (time.perf_counter() - write_start) / (len(completed) + len(failed))
+        for job_id, _, context in completed:
+            if job_id in written:
+                self._callback(self.on_completed, context, write_time)
+            else:
+                self._callback(self.on_discarded, context)
+
+    def _write_individually(self, completed: List[CompletedEntry], failed: List[FailedEntry]):
+        for entry in completed:
+            self._write([entry], [])
+        for entry in failed:
+            self._write([], [entry])
+
+    def _report_failure(self, completed: List[CompletedEntry], failed: List[FailedEntry], error: Exception):
+        for job_id, _, context in completed:
+            self._callback(self.on_failed, job_id, error, context)
+        for job_id, _ in failed:
+            print(f"Error updating failed job {job_id}: {str(error)}")
+
+    def _finish_jobs(self, completed: List[CompletedEntry], failed: List[FailedEntry]) -> Set[str]:
+        """Write one batch; returns the ids of the completions that were stored."""
+        response = self.supabase.rpc("finish_jobs", {
+            "p_completed": [{"job_id": job_id, "prediction": prediction} for job_id, prediction, _ in completed],
+            "p_failed": [{**update, "job_id": job_id} for job_id, update in failed],
+            "p_worker_id": self.worker_id
+        }).execute()
+        return {row["completed_job_id"] for row in response.data or []}
+
+    def _callback(self, callback: Optional[Callable], *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Error in bulk writer callback: {str(e)}")
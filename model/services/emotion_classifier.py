@@ -6,11 +6,66 @@ import os
 import torch
 import torch.nn as nn
 from transformers import (AutoModelForAudioClassification, AutoFeatureExtractor, AutoConfig)
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import numpy as np
 from huggingface_hub import login
 
 
+def prepare_audio_inputs(audio_batch: List[np.ndarray], feature_extractor: Any, sample_rate: int,
+                         device: str = "cpu", return_attention_mask: Optional[bool] = None) -> Dict[str, torch.Tensor]:
+    """
+    Build padded, normalized model inputs directly from float32 waveforms.
+    
+    Equivalent to calling a Wav2Vec2-style feature extractor with padding=True,
+    but keeps the audio in NumPy the whole way: each clip is normalized into
+    one preallocated float32 matrix and handed to torch with torch.from_numpy,
+    instead of being boxed into a Python list.
+    
+    Args:
+        audio_batch: List of audio waveforms (numpy arrays or sequences of floats)
+        feature_extractor: The model's feature extractor (supplies sampling_rate,
+            do_normalize, padding_value and return_attention_mask)
+        sample_rate: Sample rate shared by all clips
+        device: Device to move the tensors to
+        return_attention_mask: Whether to build an attention mask (None follows
+            the feature extractor; checkpoints with group-norm feature extractors
+            are trained without one)
+        
+    Returns:
+        Dictionary with 'input_values' and, if requested, 'attention_mask' tensors
+    """
+    expected_rate = getattr(feature_extractor, "sampling_rate", sample_rate)
+    if sample_rate != expected_rate:
+        raise ValueError(f"Audio must be sampled at {expected_rate} Hz, got {sample_rate} Hz")
+    
+    do_normalize = getattr(feature_extractor, "do_normalize", True)
+    if return_attention_mask is None:
+        return_attention_mask = getattr(feature_extractor, "return_attention_mask", True)
+    padding_value = getattr(feature_extractor, "padding_value", 0.0)
+    
+    clips = [np.ascontiguousarray(audio, dtype=np.float32).reshape(-1) for audio in audio_batch]
+    max_length = max(len(clip) for clip in clips)
+    
+    input_values = np.full((len(clips), max_length), padding_value, dtype=np.float32)
+    attention_mask = np.zeros((len(clips), max_length), dtype=np.int64)
+    
+    for row, clip in enumerate(clips):
+        length = len(clip)
+        target = input_values[row, :length]
+        if do_normalize:
+            # Same zero-mean/unit-variance normalization as the feature extractor
+            np.subtract(clip, clip.mean(), out=target)
+            target *= 1.0 / np.sqrt(clip.var() + 1e-7)
+        else:
+            target[:] = clip
+        attention_mask[row, :length] = 1
+    
+    inputs = {"input_values": torch.from_numpy(input_values).to(device)}
+    if return_attention_mask:
+        inputs["attention_mask"] = torch.from_numpy(attention_mask).to(device)
+    return inputs
+
+
 class CustomEmotionClassifier:
     """
     Custom emotion classifier using fine-tuned HuBERT model from Hugging Face.
@@ -142,52 +197,14 @@ class CustomEmotionClassifier:
             if raw_audio is None:
                 raise ValueError("Audio input must contain 'raw' key with audio data")
             
-            if isinstance(raw_audio, np.ndarray):
-                audio_array = raw_audio.tolist()
-            else:
-                audio_array = raw_audio
-            
-            inputs = self.feature_extractor(audio_array, sampling_rate=sampling_rate, return_tensors="pt", padding=True).to(self.device)
+            inputs = prepare_audio_inputs([raw_audio], self.feature_extractor, sampling_rate, self.device)
             
             with torch.no_grad():
                 outputs = self.model(**inputs)
             
-            if hasattr(outputs, 'logits'):
-                logits = outputs.logits
-            elif isinstance(outputs, tuple):
-                logits = outputs[0]
-            else:
-                logits = outputs
-            
-            probs = torch.nn.functional.softmax(logits, dim=-1)
-            
-            probs = probs.cpu().numpy().flatten()
-            
-            # Map model outputs to emotion indices
-            # Model outputs are 0-indexed (0-7), but model labels are 1-8
-            # So probs[0] corresponds to model label 1, probs[1] to model label 2, etc.
-            mapped_probs = np.zeros(8)
-            for model_output_idx in range(len(probs)):
-                # model_output_idx is 0-7, model label is model_output_idx + 1 (1-8)
-                model_label = model_output_idx + 1
-                if model_label in self.EMOTION_MAPPING:
-                    emotion_idx = self.EMOTION_MAPPING[model_label]
-                    mapped_probs[emotion_idx] = probs[model_output_idx]
-            
-            # Get top 5 emotions by probability
-            top_indices = np.argsort(mapped_probs)[::-1][:5]
-            
-            results = []
-            for emotion_idx in top_indices:
-                # Get emotion name from mapped index
-                emotion = self.INDEX_TO_EMOTION.get(int(emotion_idx), f"emotion_{emotion_idx}")
-                score = float(mapped_probs[emotion_idx])
-                results.append({
-                    "label": emotion,
-                    "score": score
-                })
-            
-            return results
+            probs = self._logits_to_probs(outputs)
+            
+            return self._rank_emotions(probs[0])
             
         except Exception as e:
             print(f"Error during emotion classification: {e}")
@@ -209,6 +226,167 @@ class CustomEmotionClassifier:
             "sampling_rate": sample_rate
         })
         
+        return self._top_prediction(results)
+    
+    def predict_batch(self, audio_batch: List[np.ndarray], sample_rate: int,
+                      max_padding_ratio: float = 1.25, max_bucket_size: int = 8) -> List[Dict[str, Any]]:
+        """
+        Predict emotion for several clips using length-bucketed forward passes.
+        
+        Clips are sorted by length and grouped so that within a bucket the
+        longest clip is at most max_padding_ratio times the shortest. Each
+        bucket is padded only to its own longest clip, with an attention mask,
+        which keeps HuBERT's attention cost from being spent on padding when
+        clip lengths vary widely.
+        
+        Padding is only safe when the model's convolutional feature extractor
+        uses layer norm. With group norm (hubert-base and its fine-tunes,
+        including the default model) the normalization statistics run over
+        the padded time axis, so a clip's scores would depend on the clips
+        batched with it. Those models only batch clips of equal length; any
+        other clip is classified on its own, exactly as predict() would.
+        
+        Args:
+            audio_batch: List of audio waveforms as numpy arrays
+            sample_rate: Sample rate shared by all clips
+            max_padding_ratio: Longest/shortest length ratio allowed in a bucket
+            max_bucket_size: Maximum number of clips per forward pass
+            
+        Returns:
+            List of dictionaries with 'emotion' and 'emotion_score' keys, in input order
+        """
+        results: List[Dict[str, Any]] = [None] * len(audio_batch)
+        
+        if not self.supports_padded_batches:
+            max_padding_ratio = 1.0
+        
+        for bucket in self._length_buckets(audio_batch, max_padding_ratio, max_bucket_size):
+            bucket_results = self._predict_bucket([audio_batch[i] for i in bucket], sample_rate)
+            for i, result in zip(bucket, bucket_results):
+                results[i] = result
+        
+        return results
+    
+    @property
+    def supports_padded_batches(self) -> bool:
+        """Whether clips of different lengths can share a padded forward pass without changing their scores."""
+        return getattr(self.config, "feat_extract_norm", "group") == "layer"
+    
+    def _length_buckets(self, audio_batch: List[np.ndarray], max_padding_ratio: float,
+                        max_bucket_size: int) -> List[List[int]]:
+        """
+        Group clip indices into buckets of similar length.
+        
+        Args:
+            audio_batch: List of audio waveforms
+            max_padding_ratio: Longest/shortest length ratio allowed in a bucket
+            max_bucket_size: Maximum number of clips per bucket
+            
+        Returns:
+            List of buckets, each a list of indices into audio_batch
+        """
+        order = sorted(range(len(audio_batch)), key=lambda i: len(audio_batch[i]))
+        
+        buckets = []
+        current = []
+        for i in order:
+            if current and (
+                len(current) >= max_bucket_size
+                or len(audio_batch[i]) > max(len(audio_batch[current[0]]), 1) * max_padding_ratio
+            ):
+                buckets.append(current)
+                current = []
+            current.append(i)
+        
+        if current:
+            buckets.append(current)
+        
+        return buckets
+    
+    def _predict_bucket(self, audio_batch: List[np.ndarray], sample_rate: int) -> List[Dict[str, Any]]:
+        """
+        Run one padded forward pass over a bucket of clips.
+        
+        Args:
+            audio_batch: List of audio waveforms sharing one sample rate
+            sample_rate: Sample rate of the audio
+            
+        Returns:
+            List of dictionaries with 'emotion' and 'emotion_score' keys, in input order
+        """
+        try:
+            inputs = prepare_audio_inputs(audio_batch, self.feature_extractor, sample_rate, self.device)
+            
+            with torch.no_grad():
+                outputs = self.model(**inputs)
+            
+            probs = self._logits_to_probs(outputs)
+            
+            return [self._top_prediction(self._rank_emotions(clip_probs)) for clip_probs in probs]
+            
+        except Exception as e:
+            print(f"Error during batched emotion classification: {e}")
+            raise
+    
+    def _logits_to_probs(self, outputs: Any) -> np.ndarray:
+        """
+        Convert model outputs to per-clip class probabilities.
+        
+        Args:
+            outputs: Model forward output (ModelOutput, tuple or logits tensor)
+            
+        Returns:
+            Array of shape (batch, num_labels)
+        """
+        if hasattr(outputs, 'logits'):
+            logits = outputs.logits
+        elif isinstance(outputs, tuple):
+            logits = outputs[0]
+        else:
+            logits = outputs
+        
+        probs = torch.nn.functional.softmax(logits, dim=-1)
+        
+        return probs.cpu().numpy().reshape(logits.shape[0], -1)
+    
+    def _rank_emotions(self, probs: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Map one clip's model probabilities to the top 5 emotions.
+        
+        Args:
+            probs: Probabilities for a single clip, indexed by model output
+            
+        Returns:
+            List of dictionaries with 'label' and 'score' keys, sorted by score descending
+        """
+        # Map model outputs to emotion indices
+        # Model outputs are 0-indexed (0-7), but model labels are 1-8
+        # So probs[0] corresponds to model label 1, probs[1] to model label 2, etc.
+        mapped_probs = np.zeros(8)
+        for model_output_idx in range(len(probs)):
+            # model_output_idx is 0-7, model label is model_output_idx + 1 (1-8)
+            model_label = model_output_idx + 1
+            if model_label in self.EMOTION_MAPPING:
+                emotion_idx = self.EMOTION_MAPPING[model_label]
+                mapped_probs[emotion_idx] = probs[model_output_idx]
+        
+        # Get top 5 emotions by probability
+        top_indices = np.argsort(mapped_probs)[::-1][:5]
+        
+        results = []
+        for emotion_idx in top_indices:
+            # Get emotion name from mapped index
+            emotion = self.INDEX_TO_EMOTION.get(int(emotion_idx), f"emotion_{emotion_idx}")
+            score = float(mapped_probs[emotion_idx])
+            results.append({
+                "label": emotion,
+                "score": score
+            })
+        
+        return results
+    
+    def _top_prediction(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Reduce ranked emotions to the top 'emotion' and 'emotion_score'."""
         if len(results) > 0:
             top_result = results[0]
             return {
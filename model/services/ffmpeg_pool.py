@@ -0,0 +1,133 @@
+"""
+Pool of pre-spawned ffmpeg decoders, so WebM/M4A/MP3 decodes do not wait
+for a process to start.
+"""
+
+import queue
+import subprocess
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+
+from .audio_io import (
+    FFMPEG_TIMEOUT_SECONDS, MAX_DURATION_SECONDS, TARGET_SAMPLE_RATE, ffmpeg_command, pcm_to_waveform
+)
+
+
+class FfmpegDecoderPool:
+    """
+    Keeps `size` ffmpeg processes started and waiting on stdin.
+
+    An ffmpeg process decodes exactly one input stream, so processes cannot
+    be reused across jobs. Instead, each decode takes an idle process that
+    has already been spawned and exec'd, and pipes the upload through it. A
+    background thread then starts a replacement. The pool saves only the
+    process spawn and exec cost: ffmpeg does not probe the input or open a
+    decoder until data arrives on stdin, so that work still happens per
+    decode.
+
+    If every warm process is in use, decode() starts one inline (a cold
+    start, reported through on_cold_start). Every process decodes to the
+    same sample_rate/duration; other settings go through
+    audio_io.decode_with_ffmpeg.
+    """
+
+    def __init__(self, size: int = 2, sample_rate: int = TARGET_SAMPLE_RATE,
+                 duration: Optional[float] = MAX_DURATION_SECONDS,
+                 on_cold_start: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            size: Idle processes to keep ready (roughly the number of concurrent decodes)
+            sample_rate: Output sample rate of every process
+            duration: Seconds each process decodes (None for the whole input)
+            on_cold_start: Called when a decode had to start its own process
+        """
+        if size < 1:
+            raise ValueError("Require size >= 1")
+
+        self.size = size
+        self.sample_rate = sample_rate
+        self.duration = duration
+        self.on_cold_start = on_cold_start
+
+        self._command = ffmpeg_command(sample_rate, duration)
+        self._ready: "queue.Queue[subprocess.Popen]" = queue.Queue()
+        self._spawn_requests: "queue.Queue[Optional[bool]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._spawn_loop, name="ffmpeg-pool", daemon=True)
+        self._thread.start()
+
+        for _ in range(size):
+            self._spawn_requests.put(True)
+
+    def serves(self, sample_rate: int, duration: Optional[float]) -> bool:
+        """Whether the pool's processes produce this output."""
+        return sample_rate == self.sample_rate and duration == self.duration
+
+    def decode(self, data) -> np.ndarray:
+        """
+        Decode encoded audio bytes through a warm ffmpeg process.
+
+        Args:
+            data: Encoded audio bytes
+
+        Returns:
+            Mono float32 waveform at sample_rate
+
+        Raises:
+            RuntimeError: If ffmpeg fails or times out
+        """
+        process = self._take()
+        try:
+            stdout, stderr = process.communicate(input=data, timeout=FFMPEG_TIMEOUT_SECONDS)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise RuntimeError(f"ffmpeg timed out after {FFMPEG_TIMEOUT_SECONDS}s")
+
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with {process.returncode}: {stderr.decode(errors='replace').strip()}")
+        return pcm_to_waveform(stdout)
+
+    def close(self):
+        """Stop replenishing and terminate the idle processes."""
+        self._spawn_requests.put(None)
+        self._thread.join()
+
+        while True:
+            try:
+                process = self._ready.get_nowait()
+            except queue.Empty:
+                return
+            process.kill()
+            process.communicate()
+
+    def _take(self) -> subprocess.Popen:
+        """An idle process, replaced in the background, or a fresh one if none is ready."""
+        while True:
+            try:
+                process = self._ready.get_nowait()
+            except queue.Empty:
+                break
+
+            self._spawn_requests.put(True)
+            if process.poll() is None:
+                return process
+            # Exited while idle (e.g. killed); its replacement is already on the way
+            process.communicate()
+
+        if self.on_cold_start is not None:
+            self.on_cold_start()
+        return self._spawn()
+
+    def _spawn(self) -> subprocess.Popen:
+        return subprocess.Popen(self._command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def _spawn_loop(self):
+        while True:
+            if self._spawn_requests.get() is None:
+                return
+            try:
+                self._ready.put(self._spawn())
+            except OSError as e:
+                print(f"Could not start a warm ffmpeg decoder: {str(e)}")
@@ -0,0 +1,120 @@
+"""
+Pooled HTTP session for storage downloads and metadata fetches.
+"""
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from typing import Dict
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class PoolStats:
+    """
+    Thread-safe connection pool hit/miss counters.
+
+    Every request checks a connection out of the pool; a miss is a checkout
+    that had to open a new TCP (and TLS) connection instead of reusing a
+    kept-alive one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        self._new_connections = 0
+
+    def record_checkout(self):
+        with self._lock:
+            self._checkouts += 1
+
+    def record_new_connection(self):
+        with self._lock:
+            self._new_connections += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Return the current counters.
+
+        Returns:
+            Dictionary with 'requests', 'hits' and 'misses'
+        """
+        with self._lock:
+            return {
+                "requests": self._checkouts,
+                "hits": self._checkouts - self._new_connections,
+                "misses": self._new_connections
+            }
+
+
+def _counting_pool_class(base: type, stats: PoolStats) -> type:
+    """Subclass a urllib3 connection pool so it reports checkouts and new connections."""
+
+    class CountingConnectionPool(base):
+        def _get_conn(self, timeout=None):
+            stats.record_checkout()
+            return super()._get_conn(timeout=timeout)
+
+        def _new_conn(self):
+            stats.record_new_connection()
+            return super()._new_conn()
+
+    return CountingConnectionPool
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools record hit/miss counters."""
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool_class(HTTPConnectionPool, self.stats),
+            "https": _counting_pool_class(HTTPSConnectionPool, self.stats)
+        }
+
+
+def create_http_session(pool_size: int = 10, max_retries: int = 3, backoff_factor: float = 0.5) -> requests.Session:
+    """
+    Create a keep-alive session with a shared, instrumented connection pool.
+
+    Idempotent requests (GET/HEAD) are retried on connection errors and on
+    RETRY_STATUS_CODES with exponential backoff. Pool counters are available
+    as session.pool_stats.
+
+    Args:
+        pool_size: Connections kept alive per host
+        max_retries: Maximum retries per request
+        backoff_factor: Base delay in seconds for exponential backoff between retries
+
+    Returns:
+        Configured requests.Session
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False
+    )
+
+    stats = PoolStats()
+    adapter = CountingHTTPAdapter(
+        stats,
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.pool_stats = stats
+
+    return session
@@ -0,0 +1,177 @@
+"""
+Wake-up signals for the worker loop: new-job notifications plus adaptive
+backoff polling as a fallback.
+"""
+
+import select
+import threading
+from typing import Optional
+
+
+class AdaptiveBackoff:
+    """
+    Exponential backoff for polling an empty queue.
+
+    Starts at min_interval after the queue drains and doubles (by factor) on
+    every empty poll up to max_interval, so a busy worker re-polls quickly
+    while an idle one settles at one poll per max_interval.
+    """
+
+    def __init__(self, min_interval: float = 0.25, max_interval: float = 5.0, factor: float = 2.0):
+        if min_interval <= 0 or max_interval < min_interval or factor < 1:
+            raise ValueError("Require 0 < min_interval <= max_interval and factor >= 1")
+
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self._next = min_interval
+
+    def next_delay(self) -> float:
+        """Return the delay before the next poll and grow it for the one after."""
+        delay = self._next
+        self._next = min(self._next * self.factor, self.max_interval)
+        return delay
+
+    def reset(self):
+        """Go back to the shortest delay, e.g. after jobs were found."""
+        self._next = self.min_interval
+
+
+class JobNotifier:
+    """
+    Blocks the worker until a new job may be available.
+
+    The base class never receives notifications, so wait() is a plain sleep
+    and the worker falls back to backoff polling.
+    """
+
+    def __init__(self):
+        self._closed = threading.Event()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Wait up to timeout seconds for a new-job notification.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if woken by a notification, False on timeout
+        """
+        self._closed.wait(timeout)
+        return False
+
+    def close(self):
+        self._closed.set()
+
+
+class LocalJobNotifier(JobNotifier):
+    """
+    In-process notifier driven by notify() calls.
+
+    Stand-in for database notifications in local runs and tests: whatever
+    enqueues a job calls notify() to wake the worker immediately.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._event = threading.Event()
+
+    def notify(self):
+        self._event.set()
+
+    def wait(self, timeout: float) -> bool:
+        notified = self._event.wait(timeout)
+        self._event.clear()
+        return notified
+
+    def close(self):
+        super().close()
+        self._event.set()
+
+
+class PostgresJobNotifier(JobNotifier):
+    """
+    Wakes the worker on Postgres NOTIFY messages from the jobs_queued trigger
+    in infra/schema.sql.
+
+    Requires the optional psycopg2 package and a direct (non-pooled) database
+    connection, since LISTEN does not work through a transaction pooler.
+    """
+
+    CHANNEL = "jobs_queued"
+
+    def __init__(self, database_url: str):
+        super().__init__()
+
+        import psycopg2
+        import psycopg2.extensions
+
+        self._psycopg2 = psycopg2
+        self.database_url = database_url
+        self._conn = None
+        self._connect()
+
+    def _connect(self):
+        self._conn = self._psycopg2.connect(self.database_url)
+        self._conn.set_isolation_level(self._psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with self._conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.CHANNEL};")
+        print(f"Listening for new jobs on Postgres channel '{self.CHANNEL}'")
+
+    def wait(self, timeout: float) -> bool:
+        try:
+            if self._conn is None or self._conn.closed:
+                self._connect()
+
+            readable, _, _ = select.select([self._conn], [], [], timeout)
+            if not readable:
+                return False
+
+            self._conn.poll()
+            notified = bool(self._conn.notifies)
+            # One wake-up is enough: the worker claims as many jobs as are queued
+            self._conn.notifies.clear()
+            return notified
+
+        except Exception as e:
+            print(f"Job notification listener error, reconnecting on next wait: {str(e)}")
+            self._close_connection()
+            # Behave like a timed poll so the worker keeps making progress
+            return super().wait(timeout)
+
+    def _close_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def close(self):
+        super().close()
+        self._close_connection()
+
+
+def create_job_notifier(database_url: Optional[str]) -> JobNotifier:
+    """
+    Create the best available notifier.
+
+    Args:
+        database_url: Direct Postgres connection string, or None
+
+    Returns:
+        PostgresJobNotifier if database_url is set and psycopg2 is installed,
+        otherwise a polling-only JobNotifier
+    """
+    if not database_url:
+        return JobNotifier()
+
+    try:
+        return PostgresJobNotifier(database_url)
+    except ImportError:
+        print("Warning: psycopg2 is not installed; falling back to polling for new jobs")
+    except Exception as e:
+        print(f"Warning: Could not listen for job notifications ({e}); falling back to polling")
+
+    return JobNotifier()
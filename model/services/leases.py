@@ -0,0 +1,160 @@
+"""
+Job leases: a heartbeat thread keeps the leases of a worker's in-flight
+jobs alive and periodically requeues jobs whose leases have expired.
+"""
+
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Set
+
+# Expired leases are reaped this often (seconds) by default
+DEFAULT_REAP_INTERVAL = 60.0
+
+
+class LeaseKeeper:
+    """
+    Extends the leases of this worker's claimed jobs until they finish.
+
+    claim_jobs gives each job a lease owned by worker_id that expires after
+    lease_seconds. Every heartbeat_interval the keeper renews the leases of
+    all tracked jobs in one extend_leases call. If the worker dies, its
+    leases run out and any worker's reaper (reap_expired_leases, every
+    reap_interval) puts those jobs back in the queue, or dead-letters them once
+    they have used up max_attempts (a job that keeps killing its worker).
+
+    A job whose lease could not be renewed (it was reaped, e.g. after a long
+    stall) is dropped from tracking and reported through on_lost.
+    """
+
+    def __init__(self, supabase, worker_id: str, lease_seconds: int = 300,
+                 heartbeat_interval: Optional[float] = None, reap_interval: float = DEFAULT_REAP_INTERVAL,
+                 max_attempts: int = 5,
+                 on_reaped: Optional[Callable[[int], None]] = None,
+                 on_lost: Optional[Callable[[List[str]], None]] = None):
+        """
+        Args:
+            supabase: Supabase client used for the lease RPCs
+            worker_id: Lease owner id, unique per worker process
+            lease_seconds: Lease length granted by claims and heartbeats
+            heartbeat_interval: Seconds between renewals (defaults to a third of the lease)
+            reap_interval: Seconds between expired-lease sweeps (0 disables reaping)
+            max_attempts: Attempts after which a reaped job is dead-lettered instead of requeued
+            on_reaped: Called with the number of jobs requeued by a sweep
+            on_lost: Called with the ids of jobs whose leases could not be renewed
+        """
+        if heartbeat_interval is None:
+            heartbeat_interval = lease_seconds / 3
+        if lease_seconds <= 0 or not 0 < heartbeat_interval < lease_seconds:
+            raise ValueError("Require lease_seconds > 0 and 0 < heartbeat_interval < lease_seconds")
+
+        self.supabase = supabase
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.reap_interval = reap_interval
+        self.max_attempts = max_attempts
+        self.on_reaped = on_reaped
+        self.on_lost = on_lost
+
+        self._job_ids: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat_loop, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+
+    def track(self, job_ids: Iterable[str]):
+        """Start renewing the leases of newly claimed jobs."""
+        with self._lock:
+            self._job_ids.update(job_ids)
+
+    def release(self, job_id: str):
+        """Stop renewing a job's lease once it is completed or failed."""
+        with self._lock:
+            self._job_ids.discard(job_id)
+
+    def requeue(self, job_ids: List[str]) -> int:
+        """
+        Hand claimed jobs that were never started back to the queue (release_jobs).
+
+        Args:
+            job_ids: Jobs this worker claimed and will not process
+
+        Returns:
+            Number of jobs requeued
+        """
+        with self._lock:
+            self._job_ids.difference_update(job_ids)
+
+        if not job_ids:
+            return 0
+
+        response = self.supabase.rpc("release_jobs", {"p_worker_id": self.worker_id, "p_job_ids": job_ids}).execute()
+        return response.data or 0
+
+    def in_flight(self) -> int:
+        """Number of jobs whose leases are being renewed."""
+        with self._lock:
+            return len(self._job_ids)
+
+    def close(self):
+        """Stop the heartbeat thread."""
+        self._stopped.set()
+        self._thread.join()
+
+    def _heartbeat_loop(self):
+        last_reap = None
+
+        while True:
+            try:
+                self._extend_leases()
+            except Exception as e:
+                print(f"Error extending job leases: {str(e)}")
+
+            # Reaping runs on the heartbeat's schedule, so at most one heartbeat late
+            if self.reap_interval > 0 and (last_reap is None or time.monotonic() - last_reap >= self.reap_interval):
+                last_reap = time.monotonic()
+                try:
+                    self._reap_expired_leases()
+                except Exception as e:
+                    print(f"Error reaping expired job leases: {str(e)}")
+
+            if self._stopped.wait(self.heartbeat_interval):
+                return
+
+    def _extend_leases(self):
+        with self._lock:
+            job_ids = list(self._job_ids)
+
+        if not job_ids:
+            return
+
+        response = self.supabase.rpc("extend_leases", {
+            "p_worker_id": self.worker_id,
+            "p_job_ids": job_ids,
+            "p_lease_seconds": self.lease_seconds
+        }).execute()
+
+        renewed = {row["job_id"] for row in (response.data or [])}
+        lost = [job_id for job_id in job_ids if job_id not in renewed]
+
+        if not lost:
+            return
+
+        with self._lock:
+            # Jobs that finished while the call was in flight are not lost
+            lost = [job_id for job_id in lost if job_id in self._job_ids]
+            self._job_ids.difference_update(lost)
+
+        if lost:
+            print(f"Warning: Lost the lease on {len(lost)} job(s): {', '.join(lost)}")
+            if self.on_lost is not None:
+                self.on_lost(lost)
+
+    def _reap_expired_leases(self):
+        response = self.supabase.rpc("reap_expired_leases", {"p_max_attempts": self.max_attempts}).execute()
+        reaped = response.data or 0
+
+        if reaped:
+            print(f"Reaped {reaped} job(s) with expired leases")
+            if self.on_reaped is not None:
+                self.on_reaped(reaped)
@@ -0,0 +1,442 @@
+"""
+Dependency-free Prometheus-style metrics and an embedded /metrics endpoint.
+
+Metrics render in the Prometheus text exposition format (0.0.4), so any
+Prometheus-compatible scraper works, and locally:
+
+    curl http://localhost:9100/metrics
+"""
+
+import os
+import resource
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache hits to long HuBERT passes
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: LabelValues, extra: Optional[Dict[str, str]] = None) -> str:
+    """Render a Prometheus label set, e.g. {stage="download",le="0.5"}."""
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.extend(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for labelled metrics."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count.
+
+    With a callback the count is kept elsewhere (e.g. by a connection pool)
+    and read at scrape time; it must never decrease.
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+        if callback is not None and self.labelnames:
+            raise ValueError("Callback counters cannot have labels")
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        """
+        Increase the counter.
+
+        Args:
+            amount: Non-negative increment
+            **labels: Value for every label name
+        """
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        if self._callback is not None:
+            raise ValueError(f"{self.name} is read from a callback")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = self._key(labels)
+        if self._callback is not None:
+            return float(self._callback())
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def samples(self) -> List[str]:
+        if self._callback is not None:
+            try:
+                values = [((), float(self._callback()))]
+            except Exception:
+                return []
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, optionally read from a callback at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+        if callback is not None:
+            self._functions[()] = callback
+        elif not self.labelnames:
+            self._values[()] = 0.0
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def set_function(self, callback: Callable[[], float], **labels: str):
+        """
+        Read the value for a label set from a callback at scrape time.
+
+        Args:
+            callback: Returns the current value, e.g. a queue's qsize
+            **labels: Value for every label name
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = callback
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        key = self._key(labels)
+        with self._lock:
+            callback = self._functions.get(key)
+            if callback is None:
+                return self._values.get(key, 0.0)
+        return float(callback())
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+
+        for key, callback in functions:
+            try:
+                values[key] = float(callback())
+            except Exception:
+                values.pop(key, None)
+
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed distribution with _bucket, _sum and _count series."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets)) + (float("inf"),)
+        # label values -> ([count per bucket], sum, count)
+        self._series: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str):
+        """
+        Record one observation.
+
+        Args:
+            value: Observed value (e.g. seconds)
+            **labels: Value for every label name
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._series.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    counts[i] += 1
+                    break
+            self._series[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+
+        lines = []
+        for key, counts, total, count in series:
+            cumulative = 0
+            for upper, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, {"le": _format_value(upper)})
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together for a scrape."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                callback: Optional[Callable[[], float]] = None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Each metric is snapshotted under its own lock, so a scrape never blocks
+        the worker for longer than a dictionary copy.
+
+        Returns:
+            Exposition text ending in a newline
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+def process_rss_bytes() -> float:
+    """
+    Resident set size of this process in bytes.
+
+    Reads /proc/self/statm on Linux and falls back to peak RSS from getrusage.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return float(resident_pages * os.sysconf("SC_PAGE_SIZE"))
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is kilobytes on Linux
+        return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+class WorkerMetrics:
+    """The worker's metrics, grouped on one registry."""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+
+        self.jobs_claimed = r.counter("mood_worker_jobs_claimed_total", "Jobs claimed from the queue")
+        self.jobs_completed = r.counter("mood_worker_jobs_completed_total", "Jobs completed with a stored prediction")
+        self.jobs_failed = r.counter("mood_worker_jobs_failed_total", "Jobs marked failed by a permanent error")
+        self.jobs_retried = r.counter(
+            "mood_worker_jobs_retried_total", "Failed attempts requeued for a retry after a transient error"
+        )
+        self.jobs_dead_lettered = r.counter(
+            "mood_worker_jobs_dead_lettered_total", "Jobs moved to dead_letter after using up their attempts"
+        )
+        self.jobs_reaped = r.counter(
+            "mood_worker_jobs_reaped_total", "Jobs with expired leases requeued by this worker's reaper"
+        )
+        self.leases_lost = r.counter(
+            "mood_worker_leases_lost_total", "In-flight jobs whose lease expired before they finished"
+        )
+        self.results_discarded = r.counter(
+            "mood_worker_results_discarded_total", "Job results dropped because the job's lease was lost"
+        )
+        self.jobs_in_flight = r.gauge("mood_worker_jobs_in_flight", "Claimed jobs this worker holds leases on")
+        self.stage_seconds = r.histogram(
+            "mood_worker_stage_seconds", "Per-job latency of each pipeline stage", ["stage"]
+        )
+        self.queue_poll_seconds = r.histogram(
+            "mood_worker_queue_poll_seconds", "Latency of one claim_jobs round trip"
+        )
+        self.batch_size = r.histogram(
+            "mood_worker_batch_size", "Jobs per inference batch", buckets=BATCH_SIZE_BUCKETS
+        )
+        self.prediction_cache_lookups = r.counter(
+            "mood_worker_prediction_cache_lookups_total",
+            "Clips looked up in the prediction cache, by result (memory_hit, db_hit, miss)", ["result"]
+        )
+        self.audio_cache_lookups = r.counter(
+            "mood_worker_audio_cache_lookups_total",
+            "Audio loads with the decoded audio cache enabled, by result (hit, miss)", ["result"]
+        )
+        self.audio_cache_bytes = r.gauge("mood_worker_audio_cache_bytes", "Disk used by the decoded audio cache")
+        self.ffmpeg_cold_starts = r.counter(
+            "mood_worker_ffmpeg_cold_starts_total",
+            "ffmpeg decodes that had to start a process because no warm one was ready"
+        )
+        self.download_bytes = r.counter(
+            "mood_worker_download_bytes_total",
+            "Audio bytes downloaded from storage, by mode (ranged WAV prefix or full object)", ["mode"]
+        )
+        self.audio_seconds = r.counter(
+            "mood_worker_audio_seconds_total",
+            "Seconds of audio run through the models; rate() gives audio seconds processed per second"
+        )
+        self.emotion_skipped = r.counter(
+            "mood_worker_emotion_skipped_total", "Clips the speech gate kept away from HuBERT"
+        )
+        self.vad_trimmed_seconds = r.counter(
+            "mood_worker_vad_trimmed_seconds_total",
+            "Seconds of silence removed before inference, by model (yamnet, hubert)", ["model"]
+        )
+        self.pipeline_queue_depth = r.gauge(
+            "mood_worker_pipeline_queue_depth", "Items waiting in each pipeline stage queue", ["queue"]
+        )
+        self.write_batch_size = r.histogram(
+            "mood_worker_write_batch_size", "Job results per bulk write", buckets=BATCH_SIZE_BUCKETS
+        )
+        self.inference_busy_seconds = r.counter(
+            "mood_worker_inference_busy_seconds_total",
+            "Seconds the inference stage spent running models; rate() gives its utilization"
+        )
+        self.process_rss = r.gauge(
+            "mood_worker_process_resident_memory_bytes", "Resident memory of the worker process",
+            callback=process_rss_bytes
+        )
+
+    def track_http_pool(self, stats: Callable[[], Dict[str, int]]):
+        """
+        Expose HTTP connection pool hit/miss counters read at scrape time.
+
+        Args:
+            stats: Callable returning a dict with 'hits' and 'misses'
+        """
+        self.registry.counter(
+            "mood_worker_http_pool_hits_total", "HTTP requests served on a kept-alive connection",
+            callback=lambda: stats()["hits"]
+        )
+        self.registry.counter(
+            "mood_worker_http_pool_misses_total", "HTTP requests that opened a new connection",
+            callback=lambda: stats()["misses"]
+        )
+
+    def observe_timings(self, timings: Dict[str, float]):
+        """
+        Record one job's stage timings.
+
+        Args:
+            timings: Stage name -> seconds, e.g. StageTimer.timings
+        """
+        for stage, seconds in timings.items():
+            self.stage_seconds.observe(seconds, stage=stage)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would otherwise flood the worker log
+        pass
+
+
+def start_metrics_server(registry: MetricsRegistry, port: int = 9100, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serve registry.render() at /metrics from a daemon thread.
+
+    Args:
+        registry: Registry to expose
+        port: TCP port to listen on (0 picks a free port)
+        host: Interface to bind
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+
+    print(f"Metrics endpoint listening on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,280 @@
+"""
+Pipelined worker loop: download, decode, inference and DB writes run as
+concurrent stages connected by bounded queues.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .audio_io import audio_format_from_path
+from .job_notify import AdaptiveBackoff, JobNotifier
+from .timing import StageTimer
+
+# Sentinel passed down the pipeline to stop each stage's threads
+_STOP = object()
+
+
+class PipelineItem:
+    """One job moving through the pipeline, with whatever its stages produced so far."""
+
+    __slots__ = ("job", "timer", "file_path", "file_ext", "etag", "audio_bytes", "audio_data", "sample_rate", "analysis")
+
+    def __init__(self, job: Dict[str, Any], timer: StageTimer):
+        self.job = job
+        self.timer = timer
+        self.file_path = None
+        self.file_ext = None
+        self.etag = None
+        self.audio_bytes = None
+        self.audio_data = None
+        self.sample_rate = None
+        self.analysis = None
+
+
+class PipelinedWorker:
+    """
+    Runs an AudioMoodWorker's stages concurrently:
+
+        claim -> fetch threads (sign + download) -> decode threads
+              -> inference thread (batched YAMNet + HuBERT) -> writer threads
+
+    Stages are connected by bounded queues. A full queue blocks the stage
+    feeding it, and claiming only takes as many jobs as the fetch queue has
+    room for, so backpressure reaches all the way back to the jobs table.
+    The network and database stages keep the single inference thread fed
+    while it runs the models. Prediction cache lookups happen once a clip is
+    decoded and new entries are stored by the writers, so the inference
+    thread never waits on the cache table.
+    """
+
+    def __init__(self, worker, batch_size: int = 1, fetch_threads: int = 4, decode_threads: int = 2,
+                 write_threads: int = 2, queue_size: int = 8):
+        """
+        Args:
+            worker: Initialized AudioMoodWorker providing models, clients and stage methods
+            batch_size: Maximum clips per inference batch
+            fetch_threads: Concurrent storage downloads
+            decode_threads: Concurrent audio decodes
+            write_threads: Concurrent prediction/job writes
+            queue_size: Capacity of each inter-stage queue
+        """
+        self.worker = worker
+        self.batch_size = batch_size
+        self.fetch_threads = fetch_threads
+        self.decode_threads = decode_threads
+        self.write_threads = write_threads
+
+        self.fetch_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.decode_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.infer_queue: "queue.Queue" = queue.Queue(maxsize=max(queue_size, batch_size))
+        self.write_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+
+        for name, stage_queue in (("fetch", self.fetch_queue), ("decode", self.decode_queue),
+                                  ("infer", self.infer_queue), ("write", self.write_queue)):
+            worker.metrics.pipeline_queue_depth.set_function(stage_queue.qsize, queue=name)
+
+        self._stages: List[List[threading.Thread]] = []
+
+    def run(self, poll_interval: float = 5, min_poll_interval: float = 0.25,
+            notifier: Optional[JobNotifier] = None):
+        """
+        Start the stage threads and claim jobs until interrupted.
+
+        On KeyboardInterrupt the worker stops claiming and drains every job
+        already in the pipeline before returning.
+
+        Args:
+            poll_interval: Maximum seconds between polls when the queue is empty
+            min_poll_interval: First backoff delay after the queue drains
+            notifier: Source of new-job wake-ups (defaults to polling only)
+        """
+        if notifier is None:
+            notifier = JobNotifier()
+        backoff = AdaptiveBackoff(min_interval=min(min_poll_interval, poll_interval), max_interval=poll_interval)
+
+        self._stages = [
+            self._start_threads("fetch", self.fetch_threads, self._fetch_loop),
+            self._start_threads("decode", self.decode_threads, self._decode_loop),
+            self._start_threads("infer", 1, self._infer_loop),
+            self._start_threads("write", self.write_threads, self._write_loop)
+        ]
+
+        print(
+            f"Pipelined worker started (fetch={self.fetch_threads}, decode={self.decode_threads}, "
+            f"write={self.write_threads}, batch_size={self.batch_size}). Polling for queued jobs..."
+        )
+
+        try:
+            while True:
+                try:
+                    free_slots = self.fetch_queue.maxsize - self.fetch_queue.qsize()
+                    if free_slots <= 0:
+                        # Downstream is saturated; let it drain before claiming more
+                        time.sleep(0.05)
+                        continue
+
+                    claim_start = time.perf_counter()
+                    jobs = self.worker._claim_jobs(min(free_slots, self.batch_size))
+                    claim_time = time.perf_counter() - claim_start
+
+                    if jobs:
+                        backoff.reset()
+                        self._enqueue(jobs, claim_time)
+                    elif notifier.wait(backoff.next_delay()):
+                        backoff.reset()
+
+                except KeyboardInterrupt:
+                    raise
+                except Exception as e:
+                    print(f"Error in pipeline claim loop: {str(e)}")
+                    time.sleep(backoff.next_delay())
+
+        except KeyboardInterrupt:
+            print("\nWorker stopped by user, draining pipeline...")
+            notifier.close()
+            self._shutdown()
+            print(f"HTTP pool stats: {self.worker.http_pool_stats()}")
+
+    def _enqueue(self, jobs: List[Dict[str, Any]], claim_time: float):
+        """Sign a claimed batch in one request and hand its jobs to the fetch stage."""
+        timers = self.worker._start_timers(jobs, claim_time)
+        for job in jobs:
+            self.fetch_queue.put(PipelineItem(job, timers[job["id"]]))
+
+    def _start_threads(self, name: str, count: int, target) -> List[threading.Thread]:
+        threads = []
+        for i in range(count):
+            thread = threading.Thread(target=target, name=f"pipeline-{name}-{i}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def _shutdown(self):
+        """Stop each stage in order once everything upstream of it has drained."""
+        stage_queues = [self.fetch_queue, self.decode_queue, self.infer_queue, self.write_queue]
+        for stage_queue, threads in zip(stage_queues, self._stages):
+            for _ in threads:
+                stage_queue.put(_STOP)
+            for thread in threads:
+                thread.join()
+
+    def _fetch_loop(self):
+        while True:
+            item = self.fetch_queue.get()
+            if item is _STOP:
+                return
+
+            try:
+                file_path = item.file_path = self.worker._storage_path(item.job)
+                item.file_ext = audio_format_from_path(file_path)
+                audio_bytes, item.etag = self.worker._download_audio_bytes(
+                    file_path, item.timer, if_none_match=self.worker._cached_etag(file_path)
+                )
+
+                if audio_bytes is None:
+                    cached = self.worker._load_cached_audio(file_path, item.etag)
+                    if cached is not None:
+                        # Unchanged since it was cached: skip the decode stage
+                        item.audio_data, item.sample_rate = cached
+                        self.worker._lookup_cached_analysis(item.job, item.audio_data, item.sample_rate, item.timer)
+                        self.infer_queue.put(item)
+                        continue
+                    audio_bytes, item.etag = self.worker._download_audio_bytes(file_path, item.timer)
+
+                # Copy out of the thread's reusable buffer before the next download
+                item.audio_bytes = bytes(audio_bytes)
+                self.worker._record_content_hash(item.job, item.audio_bytes)
+                self.decode_queue.put(item)
+            except Exception as e:
+                self._fail(item, e)
+
+    def _decode_loop(self):
+        while True:
+            item = self.decode_queue.get()
+            if item is _STOP:
+                return
+
+            try:
+                with item.timer.stage("decode"):
+                    item.audio_data, item.sample_rate = self.worker._decode_audio(item.audio_bytes, item.file_ext)
+                item.audio_bytes = None
+                self.worker._cache_decoded_audio(item.file_path, item.etag, item.audio_data)
+                self.worker._lookup_cached_analysis(item.job, item.audio_data, item.sample_rate, item.timer)
+                self.infer_queue.put(item)
+            except Exception as e:
+                self._fail(item, e)
+
+    def _infer_loop(self):
+        while True:
+            first = self.infer_queue.get()
+            if first is _STOP:
+                return
+
+            # Batch whatever else is already decoded, without waiting for more
+            batch = [first]
+            stop_after_batch = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.infer_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop_after_batch = True
+                    break
+                batch.append(item)
+
+            self.worker.metrics.batch_size.observe(len(batch))
+            loaded = [(item.job, item.audio_data, item.sample_rate) for item in batch]
+            timers = {item.job["id"]: item.timer for item in batch}
+
+            busy_start = time.perf_counter()
+            try:
+                analyses = self.worker._run_models(loaded, timers)
+            except Exception as e:
+                for item in batch:
+                    self._fail(item, e)
+                analyses = []
+            finally:
+                self.worker.metrics.inference_busy_seconds.inc(time.perf_counter() - busy_start)
+
+            for item, analysis in zip(batch, analyses):
+                item.audio_data = None
+                item.analysis = analysis
+                self.write_queue.put(item)
+
+            if stop_after_batch:
+                return
+
+    def _write_loop(self):
+        while True:
+            item = self.write_queue.get()
+            if item is _STOP:
+                return
+
+            try:
+                self.worker._cache_analysis(item.job)
+                result = self.worker._store_prediction(item.job, item.analysis, item.timer)
+                self.worker._report_results([item.job], [result])
+            except Exception as e:
+                result = self._fail(item, e)
+                if result is not None:
+                    self.worker._report_results([item.job], [result])
+
+    def _fail(self, item: "PipelineItem", error: Exception) -> Optional[Dict[str, Any]]:
+        """
+        Fail a job from a stage thread.
+
+        Never raises: if even the failure handling breaks, the error is logged
+        and the job left to the lease reaper, so one job cannot stop a stage
+        (which would back up the queues and stall claiming).
+
+        Returns:
+            The worker's failure result, or None if failing the job raised
+        """
+        try:
+            return self.worker._fail_job(item.job, error)
+        except Exception as e:
+            print(f"Error failing job {item.job['id']} ({str(error)}): {str(e)}")
+            return None
@@ -0,0 +1,152 @@
+"""
+Content-addressed cache of model outputs, so re-uploads of the same clip
+skip YAMNet and HuBERT.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+def content_hash(data) -> str:
+    """Cache key for encoded audio bytes (identical uploads)."""
+    return "sha256:" + hashlib.sha256(data).hexdigest()
+
+
+def waveform_fingerprint(audio_data: np.ndarray, sample_rate: int) -> str:
+    """
+    Cache key for a decoded waveform.
+
+    Matches the same audio re-uploaded in a different lossless container, and
+    keeps matching identical bytes if the encoded-bytes key is unavailable.
+    """
+    samples = np.ascontiguousarray(audio_data, dtype=np.float32)
+    digest = hashlib.sha256(str(sample_rate).encode("ascii"))
+    digest.update(memoryview(samples).cast("B"))
+    return "pcm-sha256:" + digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Two-tier cache of mood analyses keyed by (content key, model_version).
+
+    The first tier is an in-process LRU of up to max_entries analyses. The
+    second is the prediction_cache table in Postgres, shared by every worker
+    and surviving restarts; entries found there are promoted into the LRU.
+    A clip may be looked up under several keys (see content_hash() and
+    waveform_fingerprint()); a hit on any of them counts.
+
+    Cache errors are logged and treated as misses, so the cache can never
+    fail a job.
+    """
+
+    def __init__(self, supabase, model_version: str, max_entries: int = 1024, persistent: bool = True,
+                 on_lookup: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            supabase: Supabase client for the persistent tier
+            model_version: Version stored with every entry; other versions never match
+            max_entries: Size of the in-process LRU (0 disables it)
+            persistent: Whether to use the prediction_cache table
+            on_lookup: Called with 'memory_hit', 'db_hit' or 'miss' for every clip looked up
+        """
+        self.supabase = supabase
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self.on_lookup = on_lookup
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, clip_keys: List[List[str]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Find cached analyses for a batch of clips.
+
+        The persistent tier is queried once for every key the LRU missed.
+
+        Args:
+            clip_keys: Cache keys for each clip
+
+        Returns:
+            Cached analysis per clip, or None on a miss
+        """
+        results: List[Optional[Dict[str, Any]]] = [self._get_memory(keys) for keys in clip_keys]
+        outcomes = ["memory_hit" if result is not None else "miss" for result in results]
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing and self.persistent:
+            stored = self._get_persistent(key for i in missing for key in clip_keys[i])
+            for i in missing:
+                for key in clip_keys[i]:
+                    if key in stored:
+                        results[i] = stored[key]
+                        outcomes[i] = "db_hit"
+                        self._put_memory(clip_keys[i], stored[key])
+                        break
+
+        if self.on_lookup is not None:
+            for outcome in outcomes:
+                self.on_lookup(outcome)
+
+        return results
+
+    def store(self, keys: Iterable[str], analysis: Dict[str, Any]):
+        """
+        Cache a freshly computed analysis under all of a clip's keys.
+
+        Args:
+            keys: Cache keys for the clip
+            analysis: Combined model outputs
+        """
+        keys = list(keys)
+        self._put_memory(keys, analysis)
+
+        if not self.persistent:
+            return
+
+        try:
+            self.supabase.table("prediction_cache").upsert(
+                [{"content_hash": key, "model_version": self.model_version, "scores": analysis} for key in keys],
+                on_conflict="content_hash,model_version"
+            ).execute()
+        except Exception as e:
+            print(f"Error storing prediction cache entry: {str(e)}")
+
+    def _get_memory(self, keys: List[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for key in keys:
+                analysis = self._entries.get(key)
+                if analysis is not None:
+                    self._entries.move_to_end(key)
+                    return analysis
+        return None
+
+    def _put_memory(self, keys: List[str], analysis: Dict[str, Any]):
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            for key in keys:
+                self._entries[key] = analysis
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_persistent(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        try:
+            response = self.supabase.table("prediction_cache").select("content_hash, scores").eq(
+                "model_version", self.model_version
+            ).in_("content_hash", keys).execute()
+        except Exception as e:
+            print(f"Error reading prediction cache: {str(e)}")
+            return {}
+
+        return {row["content_hash"]: row["scores"] for row in (response.data or [])}
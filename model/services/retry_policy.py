@@ -0,0 +1,115 @@
+"""
+Retry policy for failed jobs: transient errors are requeued with
+exponential backoff, permanent ones fail the job straight away.
+"""
+
+import random
+from typing import Optional, Tuple
+
+from .audio_io import AudioDecodeError
+
+# 4xx statuses worth retrying (timeouts, rate limits); every 5xx is retried too
+TRANSIENT_HTTP_STATUSES = frozenset({408, 425, 429})
+
+
+class PermanentJobError(Exception):
+    """A job error that retrying cannot fix, e.g. a missing upload."""
+
+
+# Errors that fail a job on the first attempt
+PERMANENT_ERRORS = (PermanentJobError, AudioDecodeError)
+
+
+def _http_status(error: Exception) -> Optional[int]:
+    """Status code of a requests/httpx HTTP error, or None for other errors."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_client_error(error: Exception) -> bool:
+    """Whether an error is an HTTP 4xx response from requests or httpx."""
+    status = _http_status(error)
+    return status is not None and 400 <= status < 500
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Classify a job error as transient (worth retrying) or permanent.
+
+    HTTP 4xx responses other than timeouts and rate limits are permanent,
+    as are PERMANENT_ERRORS. Everything else, including network errors,
+    timeouts and unexpected exceptions, is treated as transient; a job that
+    keeps failing that way ends up dead-lettered after max_attempts.
+
+    Args:
+        error: Exception raised while processing a job
+
+    Returns:
+        True if the job should be retried
+    """
+    if isinstance(error, PERMANENT_ERRORS):
+        return False
+
+    status = _http_status(error)
+    if status is not None:
+        return status >= 500 or status in TRANSIENT_HTTP_STATUSES
+
+    return True
+
+
+class RetryPolicy:
+    """
+    Decides what happens to a job after an error.
+
+    Transient errors requeue the job after an exponentially growing delay
+    (base_delay * 2^(attempt - 1), capped at max_delay) with jitter, so
+    jobs that failed together do not all retry at the same moment. After
+    max_attempts the job moves to the terminal 'dead_letter' status instead.
+    Permanent errors mark the job 'failed' immediately.
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 30.0, max_delay: float = 3600.0):
+        """
+        Args:
+            max_attempts: Attempts (including the first) before a job is dead-lettered
+            base_delay: Seconds before the first retry
+            max_delay: Upper bound on the delay between retries
+        """
+        if max_attempts < 1 or base_delay <= 0 or max_delay < base_delay:
+            raise ValueError("Require max_attempts >= 1 and 0 < base_delay <= max_delay")
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def retry_delay(self, attempts: int) -> float:
+        """
+        Seconds to wait before the next attempt.
+
+        Uses "equal jitter": half the backoff is fixed and half is random,
+        so retries are spread out but never immediate.
+
+        Args:
+            attempts: Attempts made so far (1 after the first failure)
+        """
+        backoff = min(self.max_delay, self.base_delay * 2 ** (max(attempts, 1) - 1))
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+    def decide(self, error: Exception, attempts: int) -> Tuple[str, Optional[float]]:
+        """
+        Pick the job's next status after a failed attempt.
+
+        Args:
+            error: Exception raised by the attempt
+            attempts: Attempts made so far, including this one
+
+        Returns:
+            ('queued', delay seconds) to retry, or ('failed' | 'dead_letter', None)
+        """
+        if not is_transient_error(error):
+            return "failed", None
+
+        if attempts >= self.max_attempts:
+            return "dead_letter", None
+
+        return "queued", self.retry_delay(attempts)
@@ -0,0 +1,108 @@
+"""
+TTL cache for signed Supabase Storage URLs.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class SignedUrlCache:
+    """
+    Thread-safe cache of signed URLs keyed by storage path.
+
+    Entries are treated as expired refresh_margin seconds before the URL
+    itself expires, so a cached URL always has time left to finish a download.
+    The least recently signed entries are evicted beyond max_entries.
+    """
+
+    def __init__(self, expires_in: int = 3600, refresh_margin: int = 300, max_entries: int = 10000):
+        """
+        Args:
+            expires_in: Lifetime in seconds requested for each signed URL
+            refresh_margin: Seconds before expiry at which an entry is dropped
+            max_entries: Maximum number of cached URLs
+        """
+        if refresh_margin >= expires_in:
+            raise ValueError("refresh_margin must be shorter than expires_in")
+
+        self.expires_in = expires_in
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Optional[str]:
+        """
+        Return the cached URL for a path, or None if missing or about to expire.
+
+        Args:
+            path: Storage path inside the bucket
+
+        Returns:
+            Signed URL or None
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            url, valid_until = entry
+            if time.monotonic() >= valid_until:
+                del self._entries[path]
+                return None
+            return url
+
+    def put(self, path: str, url: str, signed_at: Optional[float] = None):
+        """
+        Cache a freshly signed URL.
+
+        Args:
+            path: Storage path inside the bucket
+            url: Signed URL
+            signed_at: time.monotonic() when the URL was requested (defaults to now)
+        """
+        if signed_at is None:
+            signed_at = time.monotonic()
+        valid_until = signed_at + self.expires_in - self.refresh_margin
+
+        with self._lock:
+            self._entries[path] = (url, valid_until)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path: str, url: str):
+        """
+        Drop a cached URL that storage rejected, so the next lookup re-signs.
+
+        Does nothing if the path has been re-signed since url was handed out.
+
+        Args:
+            path: Storage path inside the bucket
+            url: The rejected signed URL
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == url:
+                del self._entries[path]
+
+    def lookup(self, paths: Iterable[str]) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Split paths into cached URLs and paths that still need signing.
+
+        Args:
+            paths: Storage paths inside the bucket
+
+        Returns:
+            Tuple of (path -> cached URL, list of uncached paths)
+        """
+        cached = {}
+        missing = []
+        for path in dict.fromkeys(paths):
+            url = self.get(path)
+            if url is None:
+                missing.append(path)
+            else:
+                cached[path] = url
+        return cached, missing
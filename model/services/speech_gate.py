@@ -0,0 +1,121 @@
+"""
+Speech gate: runs the emotion model only on clips where YAMNet hears
+enough speech.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 'off': always run HuBERT; 'clip': skip clips without enough speech;
+# 'segments': also feed HuBERT only the frames YAMNet heard speech in
+GATE_MODES = ("off", "clip", "segments")
+
+# YAMNet classes that carry vocal emotion: Speech, Child speech, Conversation,
+# Narration/monologue, Shout, Yell, Whispering
+SPEECH_CLASS_INDICES = (0, 1, 2, 3, 6, 9, 12)
+
+# YAMNet scores 0.96 s windows every 0.48 s
+YAMNET_HOP_SECONDS = 0.48
+YAMNET_WINDOW_SECONDS = 0.96
+
+
+class GateDecision(NamedTuple):
+    run_emotion: bool
+    speech_seconds: float
+    # Speech regions of the YAMNet input, in seconds
+    segments: List[Tuple[float, float]]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Summary stored with the prediction."""
+        return {
+            "speech_seconds": round(self.speech_seconds, 3),
+            "segments": [[round(start, 3), round(end, 3)] for start, end in self.segments]
+        }
+
+
+class SpeechGate:
+    """
+    Decides from YAMNet's per-frame scores whether emotion detection is worth running.
+
+    A frame counts as speech when its highest score among speech_classes
+    reaches frame_threshold. Clips with less than min_speech_seconds of
+    speech frames skip HuBERT: its RAVDESS-trained output is meaningless on
+    music, noise or silence. If YAMNet produced no scores (it failed), the
+    gate stays open.
+    """
+
+    def __init__(self, mode: str = "clip", frame_threshold: float = 0.3, min_speech_seconds: float = 1.0,
+                 speech_classes: Sequence[int] = SPEECH_CLASS_INDICES):
+        """
+        Args:
+            mode: One of GATE_MODES
+            frame_threshold: Speech score at which a YAMNet frame counts as speech
+            min_speech_seconds: Speech needed for HuBERT to run
+            speech_classes: YAMNet class indices treated as speech
+        """
+        if mode not in GATE_MODES:
+            raise ValueError(f"Speech gate mode must be one of {', '.join(GATE_MODES)}, got {mode!r}")
+
+        self.mode = mode
+        self.frame_threshold = frame_threshold
+        self.min_speech_seconds = min_speech_seconds
+        self.speech_classes = list(speech_classes)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def frame_speech_scores(self, scores) -> np.ndarray:
+        """
+        Per-frame speech score from YAMNet's (frames, 521) score matrix.
+
+        Returns:
+            Highest speech-class score of each frame
+        """
+        return np.asarray(scores)[:, self.speech_classes].max(axis=1)
+
+    def decide(self, speech_scores: Optional[np.ndarray], duration: float) -> GateDecision:
+        """
+        Gate a clip on its per-frame speech scores.
+
+        Args:
+            speech_scores: Output of frame_speech_scores(), or None if YAMNet failed
+            duration: Seconds of audio YAMNet scored
+
+        Returns:
+            GateDecision with whether to run HuBERT and where the speech is
+        """
+        if not self.enabled or speech_scores is None or len(speech_scores) == 0:
+            return GateDecision(True, duration, [(0.0, duration)])
+
+        speech = speech_scores >= self.frame_threshold
+        # Frames overlap by half a window, so each contributes one hop of new audio
+        speech_seconds = min(float(speech.sum()) * YAMNET_HOP_SECONDS, duration)
+
+        # Runs of speech frames; a run ends a full window after its last frame starts
+        edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+        segments = [
+            (float(start) * YAMNET_HOP_SECONDS, min(float(end - 1) * YAMNET_HOP_SECONDS + YAMNET_WINDOW_SECONDS, duration))
+            for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+        ]
+
+        return GateDecision(speech_seconds >= self.min_speech_seconds, speech_seconds, segments)
+
+    def emotion_input(self, audio_data: np.ndarray, sample_rate: int, decision: GateDecision) -> np.ndarray:
+        """
+        Audio to run HuBERT on: the whole clip, or only its speech segments in 'segments' mode.
+
+        Args:
+            audio_data: The waveform YAMNet scored
+            sample_rate: Sample rate of the waveform
+            decision: decide() result for the clip
+        """
+        if self.mode != "segments" or not decision.segments:
+            return audio_data
+
+        regions = [(int(start * sample_rate), int(end * sample_rate)) for start, end in decision.segments]
+        if len(regions) == 1:
+            start, end = regions[0]
+            return audio_data[start:end]
+        return np.concatenate([audio_data[start:end] for start, end in regions])
@@ -0,0 +1,143 @@
+"""
+Multi-process supervisor: loads HuBERT once, then forks worker processes
+that share its weights copy-on-write.
+"""
+
+import gc
+import os
+import signal
+import time
+from typing import Any, Callable, Dict
+
+import tensorflow as tf
+import torch
+
+# Seconds to wait before re-forking a worker that crashed
+RESTART_DELAY = 5.0
+
+
+def limit_threads(num_threads: int):
+    """
+    Cap TensorFlow, PyTorch and OpenMP/BLAS thread pools for this process.
+
+    Must run before TensorFlow's runtime is initialized (i.e. before YAMNet
+    is loaded) for the TensorFlow limits to apply.
+
+    Args:
+        num_threads: Intra-op threads allowed per pool
+    """
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(num_threads)
+
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Already set, or inter-op work already ran in this process
+        pass
+
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError as e:
+        print(f"Warning: Could not limit TensorFlow threads: {e}")
+
+
+def run_supervisor(num_workers: int, threads_per_worker: int,
+                   load_shared_classifier: Callable[[], Any],
+                   start_worker: Callable[[int, Any], None]):
+    """
+    Load the emotion classifier once and fork num_workers workers that share it.
+
+    Forked children share the parent's HuBERT weights copy-on-write, so N
+    workers cost roughly one copy of the model. Each child loads its own
+    YAMNet after the fork, because TensorFlow's runtime is not fork-safe
+    (YAMNet is small). Children claim jobs independently; the claim_jobs RPC
+    keeps them from processing the same job. Crashed children are re-forked.
+
+    The classifier is loaded on CPU with a single torch thread so no OpenMP
+    pool exists in the parent at fork time; each child then raises its own
+    limit to threads_per_worker, so num_workers * threads_per_worker should
+    not exceed the available cores.
+
+    Args:
+        num_workers: Number of worker processes
+        threads_per_worker: Intra-op threads per worker for TF/torch
+        load_shared_classifier: Loads the classifier in the parent
+        start_worker: Runs a worker given (worker_index, shared classifier)
+    """
+    torch.set_num_threads(1)
+    shared_classifier = load_shared_classifier()
+
+    # Move everything loaded so far out of the GC's reach so collections in
+    # the children don't touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def fork_worker(worker_index: int):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                # SIGTERM drains like Ctrl-C instead of killing mid-job
+                signal.signal(signal.SIGTERM, signal.default_int_handler)
+                limit_threads(threads_per_worker)
+                start_worker(worker_index, shared_classifier)
+            except KeyboardInterrupt:
+                pass
+            except Exception as e:
+                print(f"Worker {worker_index} crashed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        children[pid] = worker_index
+        print(f"Started worker {worker_index} (pid {pid}, {threads_per_worker} thread(s))")
+
+    def forward_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward_signal)
+
+    for worker_index in range(num_workers):
+        fork_worker(worker_index)
+
+    print(f"Supervisor running {num_workers} workers sharing one HuBERT model")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except KeyboardInterrupt:
+            # Children got the same SIGINT from the terminal and are draining
+            stopping = True
+            continue
+        except ChildProcessError:
+            break
+
+        worker_index = children.pop(pid, None)
+        if worker_index is None:
+            continue
+
+        exit_code = os.waitstatus_to_exitcode(status)
+        if stopping:
+            print(f"Worker {worker_index} (pid {pid}) stopped")
+        else:
+            print(f"Worker {worker_index} (pid {pid}) exited with code {exit_code}, restarting in {RESTART_DELAY}s")
+            try:
+                time.sleep(RESTART_DELAY)
+            except KeyboardInterrupt:
+                stopping = True
+                continue
+            if not stopping:
+                fork_worker(worker_index)
+
+    print("Supervisor stopped")
@@ -0,0 +1,61 @@
+"""
+Monotonic per-stage timing for the worker pipeline.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock seconds per named pipeline stage for one job.
+
+    Uses time.perf_counter(), which is monotonic and high resolution, so
+    timings are unaffected by system clock adjustments.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time the enclosed block and add it to the named stage.
+
+        Args:
+            name: Stage name, e.g. 'download'
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        """
+        Add seconds to a stage, e.g. a job's share of a batched stage.
+
+        Args:
+            name: Stage name
+            seconds: Elapsed seconds
+        """
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def get(self, name: str) -> float:
+        """Return the seconds recorded for a stage (0.0 if never timed)."""
+        return self.timings.get(name, 0.0)
+
+    def as_dict(self, digits: int = 4) -> Dict[str, float]:
+        """
+        Return stage timings in seconds plus their total, rounded for storage.
+
+        Args:
+            digits: Decimal places to keep
+
+        Returns:
+            Dictionary of stage name -> seconds, including 'total'
+        """
+        result = {name: round(seconds, digits) for name, seconds in self.timings.items()}
+        result["total"] = round(sum(self.timings.values()), digits)
+        return result
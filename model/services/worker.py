@@ -1,25 +1,119 @@
 import os
+import socket
+import asyncio
 import time
-import tempfile
-import requests
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import librosa
-from typing import Dict, Any, Optional, Tuple
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
 from supabase import create_client, Client
 import tensorflow as tf
 import tensorflow_hub as hub
 import torch
-from .emotion_classifier import create_emotion_classifier
+from .emotion_classifier import CustomEmotionClassifier, create_emotion_classifier
+from .http_pool import create_http_session
+from .signed_urls import SignedUrlCache
+from .timing import StageTimer
+from .metrics import WorkerMetrics, start_metrics_server
+from .job_notify import AdaptiveBackoff, JobNotifier, create_job_notifier
+from .pipeline import PipelinedWorker
+from .async_worker import AsyncAudioMoodWorker
+from .supervisor import run_supervisor
+from .bulk_writer import BulkResultWriter
+from .leases import DEFAULT_REAP_INTERVAL, LeaseKeeper
+from .retry_policy import PermanentJobError, RetryPolicy, is_client_error
+from .prediction_cache import PredictionCache, content_hash, waveform_fingerprint
+from .audio_cache import DecodedAudioCache
+from .audio_io import DOWNLOAD_CHUNK_SIZE, DownloadBuffer, audio_format_from_path, decode_audio, ffmpeg_available
+from .ffmpeg_pool import FfmpegDecoderPool
+from .vad import SilenceTrimmer, VadResult
+from .speech_gate import SpeechGate
+from .wav_range import WavRangePlanner, format_range
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 tf.get_logger().setLevel('ERROR')
 
+# How often to re-poll the queue while waiting for a partial batch to fill
+BATCH_FILL_POLL_INTERVAL = 0.1
+
+# Stored with every prediction; cached predictions only match the same version
+MODEL_VERSION = "1.0.0"
+MODEL_NAME = "yamnet-wav2vec2-emotion"
+
+
+def load_emotion_classifier(device: Optional[str] = None) -> CustomEmotionClassifier:
+    """
+    Load the fine-tuned HuBERT emotion classifier.
+    
+    Args:
+        device: Device to run on ('cuda', 'cpu', or None for auto)
+        
+    Returns:
+        CustomEmotionClassifier instance
+    """
+    print("Loading fine-tuned HuBERT emotion classifier...")
+    try:
+        if device is None:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        hf_token = os.getenv("HF_ACCESS_TOKEN")
+        
+        if not hf_token:
+            raise ValueError(
+                "HF_ACCESS_TOKEN must be set in model/.env.local. "
+                "Get your token from https://huggingface.co/settings/tokens"
+            )
+        
+        emotion_classifier = create_emotion_classifier(
+            model_name="BerkayPolat/hubert_ravdess_emotion",
+            hf_token=hf_token,
+            device=device
+        )
+        print("Fine-tuned emotion classifier loaded successfully")
+        return emotion_classifier
+    except Exception as e:
+        print(f"Error: Could not load fine-tuned emotion classifier: {e}")
+        print("Worker cannot proceed without emotion classifier")
+        raise
+
 
 class AudioMoodWorker:
     
-    def __init__(self):
-        """Initialize the worker with Supabase client and ML models."""
+    def __init__(self, http_pool_size: int = 10, http_max_retries: int = 3, http_backoff_factor: float = 0.5,
+                 signed_url_ttl: int = 3600, emotion_classifier: Optional[CustomEmotionClassifier] = None,
+                 write_batch_rows: int = 1, write_flush_interval: float = 0.5,
+                 worker_id: Optional[str] = None, lease_seconds: int = 300,
+                 reap_interval: float = DEFAULT_REAP_INTERVAL, retry_policy: Optional[RetryPolicy] = None,
+                 prediction_cache_size: int = 1024, prediction_cache_db: bool = True,
+                 audio_cache: Optional[DecodedAudioCache] = None, ranged_downloads: bool = True,
+                 ffmpeg_pool_size: int = 2, yamnet_vad: str = "off", hubert_vad: str = "off",
+                 speech_gate: Optional[SpeechGate] = None):
+        """
+        Initialize the worker with Supabase client, HTTP pool and ML models.
+        
+        Args:
+            emotion_classifier: Already loaded HuBERT classifier to share (loaded here if None)
+            http_pool_size: Keep-alive connections per host for storage/metadata fetches
+            http_max_retries: Retries for idempotent HTTP requests
+            http_backoff_factor: Base delay in seconds for retry backoff
+            signed_url_ttl: Lifetime in seconds of signed storage URLs (cached until shortly before expiry)
+            write_batch_rows: Job results to buffer per bulk write (1 writes each job immediately)
+            write_flush_interval: Maximum seconds a buffered result waits before being written
+            worker_id: Owner id for job leases (defaults to hostname:pid)
+            lease_seconds: Lease length on claimed jobs, renewed by a heartbeat while they run
+            reap_interval: Seconds between sweeps requeuing jobs with expired leases (0 disables)
+            retry_policy: Decides whether failed jobs are retried (defaults to RetryPolicy())
+            prediction_cache_size: Analyses kept in the in-process prediction cache (0 disables it)
+            prediction_cache_db: Whether to share cached analyses through the prediction_cache table
+            audio_cache: On-disk cache of decoded waveforms to reuse for unchanged objects
+            ranged_downloads: Fetch only the analysed window of WAV uploads with Range requests
+            ffmpeg_pool_size: Warm ffmpeg processes kept ready for WebM/M4A/MP3 decodes (0 disables)
+            yamnet_vad: Silence trimming before YAMNet ('off', 'trim' or 'compact')
+            hubert_vad: Silence trimming before HuBERT ('off', 'trim' or 'compact')
+            speech_gate: Decides which clips HuBERT runs on (defaults to no gating: HuBERT runs on every clip)
+        """
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
         
@@ -29,41 +123,80 @@ class AudioMoodWorker:
             )
         
         self.supabase: Client = create_client(supabase_url, supabase_key)
+        self._thread_state = threading.local()
+        self.http = create_http_session(
+            pool_size=http_pool_size,
+            max_retries=http_max_retries,
+            backoff_factor=http_backoff_factor
+        )
+        self.metrics = WorkerMetrics()
+        self.metrics.track_http_pool(self.http_pool_stats)
+        self.signed_urls = SignedUrlCache(expires_in=signed_url_ttl, refresh_margin=min(300, signed_url_ttl // 2))
+        self.ranged_downloads = ranged_downloads
+        self.audio_cache = audio_cache
+        if audio_cache is not None:
+            self.metrics.audio_cache_bytes.set_function(audio_cache.total_bytes)
+        self.ffmpeg_pool: Optional[FfmpegDecoderPool] = None
+        if ffmpeg_pool_size > 0 and ffmpeg_available():
+            self.ffmpeg_pool = FfmpegDecoderPool(size=ffmpeg_pool_size, on_cold_start=self.metrics.ffmpeg_cold_starts.inc)
+        self.trimmers = {"yamnet": SilenceTrimmer(yamnet_vad), "hubert": SilenceTrimmer(hubert_vad)}
+        self.speech_gate = speech_gate or SpeechGate(mode="off")
+        self.prediction_cache: Optional[PredictionCache] = None
+        if prediction_cache_size > 0 or prediction_cache_db:
+            self.prediction_cache = PredictionCache(
+                self.supabase,
+                self._analysis_version(),
+                max_entries=prediction_cache_size,
+                persistent=prediction_cache_db,
+                on_lookup=lambda outcome: self.metrics.prediction_cache_lookups.inc(result=outcome)
+            )
         
         print("Loading YAMNet model...")
         self.yamnet_model = hub.load('https://tfhub.dev/google/yamnet/1')
         self.yamnet_class_names = self._load_yamnet_class_names()
         
-        print("Loading fine-tuned HuBERT emotion classifier...")
-        try:
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            hf_token = os.getenv("HF_ACCESS_TOKEN")
-            
-            if not hf_token:
-                raise ValueError(
-                    "HF_ACCESS_TOKEN must be set in model/.env.local. "
-                    "Get your token from https://huggingface.co/settings/tokens"
-                )
-            
-            self.emotion_classifier = create_emotion_classifier(
-                model_name="BerkayPolat/hubert_ravdess_emotion",
-                hf_token=hf_token,
-                device=device
+        if emotion_classifier is None:
+            emotion_classifier = load_emotion_classifier()
+        self.emotion_classifier = emotion_classifier
+        
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.result_writer: Optional[BulkResultWriter] = None
+        if write_batch_rows > 1:
+            self.result_writer = BulkResultWriter(
+                self.supabase,
+                flush_rows=write_batch_rows,
+                flush_interval=write_flush_interval,
+                worker_id=self.worker_id,
+                on_completed=self._on_prediction_written,
+                on_failed=self._on_prediction_write_failed,
+                on_discarded=self._on_prediction_discarded,
+                on_flushed=self.metrics.write_batch_size.observe
             )
-            print("Fine-tuned emotion classifier loaded successfully")
-        except Exception as e:
-            print(f"Error: Could not load fine-tuned emotion classifier: {e}")
-            print("Worker cannot proceed without emotion classifier")
-            raise
         
-        print("Worker initialized successfully")
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.lease_seconds = lease_seconds
+        # Jobs whose lease the heartbeat found lost; their results are dropped
+        self._lost_leases = set()
+        self._lost_leases_lock = threading.Lock()
+        self.leases = LeaseKeeper(
+            self.supabase,
+            self.worker_id,
+            lease_seconds=lease_seconds,
+            reap_interval=reap_interval,
+            max_attempts=self.retry_policy.max_attempts,
+            on_reaped=self.metrics.jobs_reaped.inc,
+            on_lost=self._on_leases_lost
+        )
+        self.metrics.jobs_in_flight.set_function(self.leases.in_flight)
+        
+        print(f"Worker {self.worker_id} initialized successfully")
     
     def _load_yamnet_class_names(self) -> list:
         """Load YAMNet class names from GitHub (official source)."""
         try:
             yamnet_class_map_url = "https://raw.githubusercontent.com/tensorflow/models/master/research/audioset/yamnet/yamnet_class_map.csv"
             
-            response = requests.get(yamnet_class_map_url, timeout=10)
+            response = self.http.get(yamnet_class_map_url, timeout=10)
             response.raise_for_status()
             
             class_names = []
@@ -84,9 +217,37 @@ class AudioMoodWorker:
             print("Using fallback: numbered class names")
             return [f"Class_{i}" for i in range(521)]
     
+    def _claim_jobs(self, limit: int = 1) -> List[Dict[str, Any]]:
+        """
+        Atomically claim up to `limit` queued jobs.
+        
+        Uses the claim_jobs database function (see infra/schema.sql), which locks
+        rows with FOR UPDATE SKIP LOCKED so concurrent workers never claim the
+        same job. Claimed jobs are already marked 'processing' and leased to
+        this worker; the lease heartbeat keeps them leased until they finish.
+        
+        Args:
+            limit: Maximum number of jobs to claim
+            
+        Returns:
+            List of job rows, each with its upload row under the 'uploads' key
+        """
+        poll_start = time.perf_counter()
+        response = self.supabase.rpc("claim_jobs", {
+            "p_limit": limit,
+            "p_worker_id": self.worker_id,
+            "p_lease_seconds": self.lease_seconds
+        }).execute()
+        self.metrics.queue_poll_seconds.observe(time.perf_counter() - poll_start)
+        
+        jobs = [row["job"] for row in (response.data or [])]
+        self.metrics.jobs_claimed.inc(len(jobs))
+        self.leases.track(job["id"] for job in jobs)
+        return jobs
+    
     def process_job(self, job_id: str) -> Dict[str, Any]:
         """
-        Process a single job.
+        Process a single job by ID.
         
         Args:
             job_id: UUID of the job to process
@@ -94,131 +255,928 @@ class AudioMoodWorker:
         Returns:
             Dictionary with processing results
         """
+        job_fetch_start = time.perf_counter()
         try:
-            # Fetch job details
-            job_response = self.supabase.table("jobs").select("*, uploads(*)").eq("id", job_id).single().execute()
+            # Mark the job processing and fetch it with its upload in one round trip
+            job_response = self.supabase.rpc("claim_job", {
+                "p_job_id": job_id,
+                "p_worker_id": self.worker_id,
+                "p_lease_seconds": self.lease_seconds
+            }).execute()
             
             if not job_response.data:
                 return {"success": False, "error": "Job not found"}
             
-            job = job_response.data
-            upload = job.get("uploads")
+            job = job_response.data[0]["job"]
+            self.leases.track([job_id])
+            
+        except Exception as e:
+            return self._fail_job({"id": job_id}, e)
+        
+        return self._process_claimed_job(job, job_fetch_time=time.perf_counter() - job_fetch_start)
+    
+    def _process_claimed_job(self, job: Dict[str, Any], job_fetch_time: float = 0.0) -> Dict[str, Any]:
+        """
+        Process a job that is already marked 'processing'.
+        
+        Args:
+            job: Job row with its upload row under the 'uploads' key
+            job_fetch_time: Seconds spent claiming/fetching the job
+            
+        Returns:
+            Dictionary with processing results
+        """
+        return self._process_batch([job], job_fetch_time=job_fetch_time)[0]
+    
+    def _process_batch(self, jobs: List[Dict[str, Any]], job_fetch_time: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Process several claimed jobs with batched model inference.
+        
+        Audio for every job is downloaded and decoded first, then the clips go
+        through the models together and results are fanned back out to one
+        prediction row per job. A job that fails to load is marked failed on its
+        own without affecting the rest of the batch.
+        
+        Each job gets its own StageTimer. Stages that run once per batch (job
+        fetch, signing, HuBERT) are split evenly across the jobs in the batch.
+        
+        Args:
+            jobs: Job rows with their upload rows under the 'uploads' key
+            job_fetch_time: Seconds spent claiming/fetching the whole batch
             
-            if not upload:
-                return {"success": False, "error": "Upload not found"}
+        Returns:
+            List of processing results, in the same order as jobs
+        """
+        results = {}
+        loaded = []
+        timers = self._start_timers(jobs, job_fetch_time)
+        self.metrics.batch_size.observe(len(jobs))
+        
+        for job in jobs:
+            try:
+                audio_data, sample_rate = self._load_job_audio(job, timers[job["id"]])
+                loaded.append((job, audio_data, sample_rate))
+            except Exception as e:
+                results[job["id"]] = self._fail_job(job, e)
+        
+        results.update(self._finish_batch(loaded, timers))
+        
+        return [results[job["id"]] for job in jobs]
+    
+    def _start_timers(self, jobs: List[Dict[str, Any]], job_fetch_time: float) -> Dict[str, StageTimer]:
+        """
+        Sign a claimed batch's storage paths and start a StageTimer per job.
+        
+        The claim and signing round trips are shared by the batch, so each
+        job is charged an equal share of them.
+        
+        Args:
+            jobs: Job rows with their upload rows under the 'uploads' key
+            job_fetch_time: Seconds spent claiming the batch
             
-            self.supabase.table("jobs").update({
-                "status": "processing",
-                "started_at": datetime.utcnow().isoformat()
-            }).eq("id", job_id).execute()
+        Returns:
+            Dictionary mapping job id to its StageTimer
+        """
+        presign_start = time.perf_counter()
+        self._presign_jobs(jobs)
+        presign_time = time.perf_counter() - presign_start
+        
+        timers = {}
+        for job in jobs:
+            timer = StageTimer()
+            timer.add("job_fetch", job_fetch_time / len(jobs))
+            timer.add("signed_url", presign_time / len(jobs))
+            timers[job["id"]] = timer
+        return timers
+    
+    def _finish_batch(self, loaded: List[Tuple[Dict[str, Any], np.ndarray, int]],
+                      timers: Dict[str, StageTimer]) -> Dict[str, Dict[str, Any]]:
+        """
+        Run the models over decoded clips and store one prediction per job.
+        
+        Args:
+            loaded: (job, audio waveform, sample rate) for each clip
+            timers: StageTimer per job id
             
-            stored_path = upload["audio_file_path"]
-            print(f"Downloading audio from path: {stored_path}")
+        Returns:
+            Dictionary mapping job id to its processing result
+        """
+        results = {}
+        
+        if not loaded:
+            return results
+        
+        try:
+            analyses = self._run_models(loaded, timers)
+        except Exception as e:
+            for job, _, _ in loaded:
+                results[job["id"]] = self._fail_job(job, e)
+            return results
+        
+        for (job, _, _), mood_analysis in zip(loaded, analyses):
+            try:
+                results[job["id"]] = self._store_prediction(job, mood_analysis, timers[job["id"]])
+            except Exception as e:
+                results[job["id"]] = self._fail_job(job, e)
+        
+        return results
+    
+    def _run_models(self, loaded: List[Tuple[Dict[str, Any], np.ndarray, int]],
+                    timers: Dict[str, StageTimer]) -> List[Dict[str, Any]]:
+        """
+        Produce a mood analysis per decoded clip, from the prediction cache
+        where possible and from YAMNet + batched HuBERT otherwise.
+        
+        Clips are looked up by the hash of their downloaded bytes and by a
+        fingerprint of the decoded waveform. Cached analyses are returned with
+        cache_hit set; the rest go through the models and are cached, unless
+        a model failed on the clip.
+        
+        Clips already looked up by _lookup_cached_analysis are not looked up
+        again, and their new analyses are left for _cache_analysis to store:
+        the pipeline and async modes do both from their I/O stages, so cache
+        queries never hold up the inference thread.
+        
+        Args:
+            loaded: (job, audio waveform, sample rate) for each clip
+            timers: StageTimer per job id; receives the prediction_cache/yamnet/hubert stages
             
-            if '/storage/v1/object/public/' in stored_path:
-                parts = stored_path.split('/storage/v1/object/public/')
-                if len(parts) == 2:
-                    bucket_and_path = parts[1]
-                    file_path = '/'.join(bucket_and_path.split('/')[1:])
+        Returns:
+            Combined mood analysis per clip, in input order
+        """
+        if self.prediction_cache is None:
+            return self._infer_clips(loaded, timers)[0]
+        
+        analyses = [job["prediction_cache"]["analysis"] if "prediction_cache" in job else None
+                    for job, _, _ in loaded]
+        unchecked = [i for i, (job, _, _) in enumerate(loaded) if "prediction_cache" not in job]
+        clip_keys = {}
+        if unchecked:
+            lookup_start = time.perf_counter()
+            for i in unchecked:
+                job, audio_data, sample_rate = loaded[i]
+                clip_keys[i] = self._prediction_cache_keys(job, audio_data, sample_rate)
+            for i, analysis in zip(unchecked, self.prediction_cache.lookup([clip_keys[i] for i in unchecked])):
+                analyses[i] = analysis
+            lookup_time = time.perf_counter() - lookup_start
+            for i in unchecked:
+                timers[loaded[i][0]["id"]].add("prediction_cache", lookup_time / len(unchecked))
+        
+        misses = [i for i, analysis in enumerate(analyses) if analysis is None]
+        if len(misses) < len(loaded):
+            print(f"Prediction cache hit for {len(loaded) - len(misses)} of {len(loaded)} clip(s)")
+        
+        if misses:
+            computed, failed = self._infer_clips([loaded[i] for i in misses], timers)
+            for n, (i, mood_analysis) in enumerate(zip(misses, computed)):
+                analyses[i] = mood_analysis
+                if n in failed:
+                    continue
+                if i in clip_keys:
+                    self.prediction_cache.store(clip_keys[i], mood_analysis)
                 else:
-                    raise Exception(f"Could not extract file path from URL: {stored_path}")
-            else:
-                file_path = stored_path
-            
-            audio_data, sample_rate = self._download_audio_with_signed_url(file_path)
+                    loaded[i][0]["prediction_cache"]["store"] = mood_analysis
+        
+        missed = set(misses)
+        return [
+            analysis if i in missed else {**analysis, "cache_hit": True}
+            for i, analysis in enumerate(analyses)
+        ]
+    
+    def _lookup_cached_analysis(self, job: Dict[str, Any], audio_data: np.ndarray, sample_rate: int,
+                                timer: Optional[StageTimer] = None):
+        """
+        Look a decoded clip up in the prediction cache ahead of inference.
+        
+        The result is kept on the job for _run_models, which then skips its
+        own lookup for the clip and leaves storing a new analysis to
+        _cache_analysis.
+        
+        Args:
+            job: Job row; receives the lookup under 'prediction_cache'
+            audio_data: Decoded waveform
+            sample_rate: Sample rate of the waveform
+            timer: Optional StageTimer for the prediction_cache stage
+        """
+        if self.prediction_cache is None:
+            return
+        
+        if timer is None:
+            timer = StageTimer()
+        
+        with timer.stage("prediction_cache"):
+            keys = self._prediction_cache_keys(job, audio_data, sample_rate)
+            job["prediction_cache"] = {"keys": keys, "analysis": self.prediction_cache.lookup([keys])[0]}
+    
+    def _cache_analysis(self, job: Dict[str, Any]):
+        """Store the analysis _run_models left on a job looked up by _lookup_cached_analysis, if any."""
+        entry = job.get("prediction_cache")
+        if entry is not None and "store" in entry:
+            self.prediction_cache.store(entry["keys"], entry.pop("store"))
+    
+    def _infer_clips(self, loaded: List[Tuple[Dict[str, Any], np.ndarray, int]],
+                     timers: Dict[str, StageTimer]) -> Tuple[List[Dict[str, Any]], Set[int]]:
+        """
+        Run YAMNet and batched HuBERT over decoded clips.
+        
+        Each model sees the clip after its own silence trimming (see
+        SilenceTrimmer); the kept regions are recorded under 'vad'. HuBERT
+        then only runs on clips the speech gate lets through; the others get
+        a null emotion and emotion_skipped, with YAMNet's speech findings
+        recorded under 'speech'.
+        
+        Args:
+            loaded: (job, audio waveform, sample rate) for each clip
+            timers: StageTimer per job id; receives the vad/yamnet/hubert stages
             
-            if audio_data is None:
-                raise Exception("Failed to download or load audio file")
+        Returns:
+            Tuple of (combined mood analysis per clip in input order, indices
+            of the clips whose YAMNet run failed and fell back to 'Unknown')
+        """
+        print(f"Running YAMNet inference on {len(loaded)} clip(s)...")
+        vad_results = []
+        yamnet_batch = []
+        for job, audio_data, sample_rate in loaded:
+            timer = timers[job["id"]]
+            yamnet_vad = self._trim_silence("yamnet", audio_data, sample_rate, timer)
+            with timer.stage("yamnet"):
+                yamnet_batch.append(self._run_yamnet(yamnet_vad.audio, sample_rate))
+            vad_results.append({"yamnet": yamnet_vad})
+        
+        decisions = []
+        emotion_inputs = {}
+        for (job, audio_data, sample_rate), yamnet_results, vad in zip(loaded, yamnet_batch, vad_results):
+            yamnet_audio = vad["yamnet"].audio
+            decision = self.speech_gate.decide(yamnet_results.get("speech_scores"), len(yamnet_audio) / sample_rate)
+            decisions.append(decision)
+            if not decision.run_emotion:
+                continue
+            if self.speech_gate.mode == "segments":
+                # The speech segments already leave out the silence
+                emotion_inputs[job["id"]] = self.speech_gate.emotion_input(yamnet_audio, sample_rate, decision)
+            else:
+                vad["hubert"] = self._trim_silence("hubert", audio_data, sample_rate, timers[job["id"]])
+                emotion_inputs[job["id"]] = vad["hubert"].audio
+        
+        emotion_batch = {}
+        if emotion_inputs:
+            print(f"Running emotion detection on {len(emotion_inputs)} of {len(loaded)} clip(s)...")
+            hubert_start = time.perf_counter()
+            emotion_results = self._run_emotion_detection_batch(list(emotion_inputs.values()), loaded[0][2])
+            hubert_time = time.perf_counter() - hubert_start
+            emotion_batch = dict(zip(emotion_inputs, emotion_results))
+            for job_id in emotion_inputs:
+                timers[job_id].add("hubert", hubert_time / len(emotion_inputs))
+        
+        results = []
+        for i, (job, audio_data, sample_rate) in enumerate(loaded):
+            yamnet_results, vad, decision = yamnet_batch[i], vad_results[i], decisions[i]
+            self.metrics.audio_seconds.inc(len(audio_data) / sample_rate)
             
-            print("Running YAMNet inference...")
-            yamnet_results = self._run_yamnet(audio_data, sample_rate)
+            emotion_results = emotion_batch.get(job["id"])
+            mood_analysis = self._combine_results(yamnet_results, emotion_results or {})
+            if emotion_results is None:
+                self.metrics.emotion_skipped.inc()
+                mood_analysis.update(emotion=None, emotion_score=None, emotion_skipped=True)
+            if self.speech_gate.enabled:
+                mood_analysis["speech"] = decision.as_dict()
             
-            print("Running emotion detection...")
-            emotion_results = self._run_emotion_detection(audio_data, sample_rate)
+            applied = {model: result.as_dict(self.trimmers[model].mode)
+                       for model, result in vad.items() if self.trimmers[model].enabled}
+            if applied:
+                mood_analysis["vad"] = applied
+            results.append(mood_analysis)
+        
+        failed = {i for i, yamnet_results in enumerate(yamnet_batch) if "error" in yamnet_results}
+        return results, failed
+    
+    def _trim_silence(self, model: str, audio_data: np.ndarray, sample_rate: int, timer: StageTimer) -> VadResult:
+        """
+        Apply a model's silence trimming to a clip.
+        
+        Args:
+            model: 'yamnet' or 'hubert'
+            audio_data: Decoded waveform
+            sample_rate: Sample rate of the waveform
+            timer: The job's StageTimer; receives the vad stage
+        """
+        with timer.stage("vad"):
+            result = self.trimmers[model](audio_data, sample_rate)
+        
+        removed = result.original_seconds - len(result.audio) / sample_rate
+        if removed > 0:
+            self.metrics.vad_trimmed_seconds.inc(removed, model=model)
+        return result
+    
+    def _analysis_version(self) -> str:
+        """
+        Version of the analyses this worker produces, for the prediction cache.
+        
+        Silence trimming and speech gating change what the models see, so
+        analyses made with different settings never satisfy each other.
+        """
+        settings = []
+        if any(trimmer.enabled for trimmer in self.trimmers.values()):
+            settings.append("vad:" + ",".join(f"{model}={trimmer.mode}" for model, trimmer in self.trimmers.items()))
+        gate = self.speech_gate
+        if gate.enabled:
+            settings.append(f"gate:{gate.mode},{gate.frame_threshold},{gate.min_speech_seconds}")
+        if not settings:
+            return MODEL_VERSION
+        return "+".join([MODEL_VERSION, *settings])
+    
+    def _prediction_cache_keys(self, job: Dict[str, Any], audio_data: np.ndarray, sample_rate: int) -> List[str]:
+        """Prediction cache keys for a clip: its downloaded bytes' hash (if recorded) and waveform fingerprint."""
+        keys = [waveform_fingerprint(audio_data, sample_rate)]
+        if job.get("content_hash"):
+            keys.insert(0, job["content_hash"])
+        return keys
+    
+    def _record_content_hash(self, job: Dict[str, Any], audio_bytes):
+        """Remember the hash of a job's downloaded bytes for the prediction cache."""
+        if self.prediction_cache is not None:
+            job["content_hash"] = content_hash(audio_bytes)
+    
+    def _load_job_audio(self, job: Dict[str, Any], timer: Optional[StageTimer] = None) -> Tuple[np.ndarray, int]:
+        """
+        Resolve a job's storage path, then download and decode its audio.
+        
+        With an audio cache, an object that has not changed since it was last
+        decoded is answered 304 by storage and mapped from the cache instead.
+        
+        Args:
+            job: Job row with its upload row under the 'uploads' key
+            timer: Optional StageTimer for the signed_url/download/decode stages
             
-            mood_analysis = self._combine_results(
-                yamnet_results, emotion_results
-            )
+        Returns:
+            Tuple of (audio waveform, sample rate)
+        """
+        file_path = self._storage_path(job)
+        print(f"Downloading audio from path: {file_path}")
+        
+        if timer is None:
+            timer = StageTimer()
+        
+        audio_bytes, etag = self._download_audio_bytes(file_path, timer, if_none_match=self._cached_etag(file_path))
+        
+        if audio_bytes is None:
+            cached = self._load_cached_audio(file_path, etag)
+            if cached is not None:
+                return cached
+            audio_bytes, etag = self._download_audio_bytes(file_path, timer)
+        
+        self._record_content_hash(job, audio_bytes)
+        
+        with timer.stage("decode"):
+            audio_data, sample_rate = self._decode_audio(audio_bytes, audio_format_from_path(file_path))
+        
+        self._cache_decoded_audio(file_path, etag, audio_data)
+        return audio_data, sample_rate
+    
+    def _decode_audio(self, audio_bytes, file_ext: str) -> Tuple[np.ndarray, int]:
+        """Decode downloaded bytes, through the warm ffmpeg pool where it applies."""
+        return decode_audio(memoryview(audio_bytes), file_ext, ffmpeg_pool=self.ffmpeg_pool)
+    
+    def _cached_etag(self, file_path: str) -> Optional[str]:
+        """ETag of the cached waveform for a path, to download it conditionally."""
+        if self.audio_cache is None:
+            return None
+        return self.audio_cache.etag(file_path)
+    
+    def _load_cached_audio(self, file_path: str, etag: Optional[str]) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Map a cached waveform after storage answered 304 Not Modified.
+        
+        Returns:
+            Tuple of (audio waveform, sample rate), or None if the cache entry is
+            gone (e.g. evicted by another process) and the object must be downloaded
+        """
+        audio_data = self.audio_cache.load(file_path, etag) if etag else None
+        if audio_data is None:
+            return None
+        self.metrics.audio_cache_lookups.inc(result="hit")
+        return audio_data, self.audio_cache.sample_rate
+    
+    def _cache_decoded_audio(self, file_path: str, etag: Optional[str], audio_data: np.ndarray):
+        """Store a freshly downloaded and decoded waveform in the audio cache, if there is one."""
+        if self.audio_cache is None:
+            return
+        self.metrics.audio_cache_lookups.inc(result="miss")
+        self.audio_cache.store(file_path, etag, audio_data)
+    
+    def _storage_path(self, job: Dict[str, Any]) -> str:
+        """
+        Resolve the path of a job's audio inside the audio_files bucket.
+        
+        Args:
+            job: Job row with its upload row under the 'uploads' key
             
-            ## In the future, add the inference time to the prediction data.
-            inference_time = 2.0  # Placeholder
+        Returns:
+            Storage path relative to the bucket
+        """
+        upload = job.get("uploads")
+        
+        if not upload:
+            raise PermanentJobError("Upload not found")
+        
+        stored_path = upload["audio_file_path"]
+        
+        if '/storage/v1/object/public/' in stored_path:
+            parts = stored_path.split('/storage/v1/object/public/')
+            if len(parts) == 2:
+                bucket_and_path = parts[1]
+                return '/'.join(bucket_and_path.split('/')[1:])
+            else:
+                raise PermanentJobError(f"Could not extract file path from URL: {stored_path}")
+        
+        return stored_path
+    
+    def _sign_storage_paths(self, file_paths: List[str]) -> Dict[str, str]:
+        """
+        Get signed download URLs for several storage paths.
+        
+        Cached URLs are reused; all remaining paths are signed with a single
+        create_signed_urls call and added to the cache.
+        
+        Args:
+            file_paths: Storage paths relative to the audio_files bucket
             
-            prediction_data = {
-                "user_id_sha256": job["user_id_sha256"],
-                "upload_id": upload["id"],
-                "scores": mood_analysis,
-                "model_version": "1.0.0",
-                "inference_time": inference_time,
-                "model_name": "yamnet-wav2vec2-emotion"
-            }
+        Returns:
+            Dictionary mapping each successfully signed path to its URL
+        """
+        signed, missing = self.signed_urls.lookup(file_paths)
+        
+        if not missing:
+            return signed
+        
+        signed_at = time.monotonic()
+        signed_urls_response = self.supabase.storage.from_("audio_files").create_signed_urls(
+            missing, expires_in=self.signed_urls.expires_in
+        )
+        
+        signed.update(self._cache_signed_urls(missing, signed_urls_response, signed_at))
+        print(f"Signed {len(missing)} storage path(s) in one request ({len(file_paths) - len(missing)} cached)")
+        
+        return signed
+    
+    def _cache_signed_urls(self, requested_paths: List[str], signed_urls_response: Optional[List[Dict[str, Any]]],
+                           signed_at: float) -> Dict[str, str]:
+        """
+        Parse a create_signed_urls response and add its URLs to the cache.
+        
+        Args:
+            requested_paths: Paths passed to create_signed_urls, in order
+            signed_urls_response: The storage API response
+            signed_at: time.monotonic() when the request was sent
             
-            prediction_response = self.supabase.table("predictions").insert(
-                prediction_data
-            ).execute()
+        Returns:
+            Dictionary mapping each successfully signed path to its URL
+        """
+        signed = {}
+        
+        for requested_path, signed_url_data in zip(requested_paths, signed_urls_response or []):
+            path = signed_url_data.get('path') or requested_path
+            signed_url = signed_url_data.get('signedURL') or signed_url_data.get('signed_url') or signed_url_data.get('signedUrl')
             
-            self.supabase.table("jobs").update({"status": "completed", "finished_at": datetime.utcnow().isoformat()}).eq("id", job_id).execute()
+            if not signed_url:
+                print(f"No signed URL in response: {signed_url_data}")
+                continue
             
-            print(f"Job {job_id} completed successfully")
+            self.signed_urls.put(path, signed_url, signed_at=signed_at)
+            signed[path] = signed_url
+        
+        return signed
+    
+    def _presign_jobs(self, jobs: List[Dict[str, Any]]):
+        """
+        Sign the audio paths of a whole batch of jobs in one storage request.
+        
+        Failures are only logged: each job retries signing its own path when
+        it downloads, and reports the error there.
+        
+        Args:
+            jobs: Job rows with their upload rows under the 'uploads' key
+        """
+        file_paths = []
+        for job in jobs:
+            try:
+                file_paths.append(self._storage_path(job))
+            except Exception:
+                pass
+        
+        if not file_paths:
+            return
+        
+        try:
+            self._sign_storage_paths(file_paths)
+        except Exception as e:
+            print(f"Error generating signed URLs for batch: {str(e)}")
+    
+    def _store_prediction(self, job: Dict[str, Any], mood_analysis: Dict[str, Any],
+                          timer: Optional[StageTimer] = None) -> Dict[str, Any]:
+        """
+        Insert the prediction row for a job and mark the job completed.
+        
+        Both happen in one transaction through the complete_job RPC. With a
+        result writer the row is buffered instead and written in bulk later;
+        the returned result is then marked 'queued' and the job only counts
+        as completed once the write has committed.
+        
+        Nothing is written if this worker no longer holds the job's lease
+        (the job was reaped and may already be running elsewhere): the
+        result is dropped, see _discard_result.
+        
+        The job's stage timings are stored under scores["timings"] and the
+        time spent in the models (YAMNet + HuBERT) as inference_time. The DB
+        write cannot be timed inside the row it writes, so it is only logged.
+        
+        Args:
+            job: Job row with its upload row under the 'uploads' key
+            mood_analysis: Combined model outputs
+            timer: StageTimer holding this job's stage timings
             
+        Returns:
+            Dictionary with processing results
+        """
+        job_id = job["id"]
+        
+        if self._lease_lost(job_id):
+            return self._discard_result(job)
+        
+        if timer is None:
+            timer = StageTimer()
+        
+        prediction_data = self._prediction_row(job, mood_analysis, timer)
+        
+        if self.result_writer is not None:
+            self.result_writer.add_completed(job_id, prediction_data, (job, mood_analysis, timer))
             return {
                 "success": True,
+                "queued": True,
                 "job_id": job_id,
-                "prediction": mood_analysis
+                "prediction": mood_analysis,
+                "timings": timer.as_dict()
             }
+        
+        with timer.stage("db_write"):
+            response = self.supabase.rpc("complete_job", {
+                "p_job_id": job_id,
+                "p_prediction": prediction_data,
+                "p_worker_id": self.worker_id
+            }).execute()
+        
+        if response.data is None:
+            # complete_job found the job no longer leased to this worker
+            return self._discard_result(job)
+        
+        return self._record_completion(job, mood_analysis, timer)
+    
+    def _prediction_row(self, job: Dict[str, Any], mood_analysis: Dict[str, Any], timer: StageTimer) -> Dict[str, Any]:
+        """
+        Build the predictions row for a finished job.
+        
+        Args:
+            job: Job row with its upload row under the 'uploads' key
+            mood_analysis: Combined model outputs
+            timer: StageTimer holding this job's stage timings
             
-        except Exception as e:
-            print(f"Error processing job {job_id}: {str(e)}")
-            
-            # Update job status to failed
-            self.supabase.table("jobs").update({"status": "failed","error": str(e), "finished_at": datetime.utcnow().isoformat()}).eq("id", job_id).execute()
+        Returns:
+            Row ready to insert into predictions
+        """
+        inference_time = timer.get("yamnet") + timer.get("hubert")
+        
+        return {
+            "user_id_sha256": job["user_id_sha256"],
+            "upload_id": job["uploads"]["id"],
+            "scores": {**mood_analysis, "timings": timer.as_dict()},
+            "model_version": MODEL_VERSION,
+            "inference_time": round(inference_time, 4),
+            "model_name": MODEL_NAME
+        }
+    
+    def _on_prediction_written(self, context: Tuple[Dict[str, Any], Dict[str, Any], StageTimer], write_time: float):
+        """Result writer callback: a buffered prediction has been stored."""
+        job, mood_analysis, timer = context
+        timer.add("db_write", write_time)
+        self._record_completion(job, mood_analysis, timer)
+    
+    def _on_prediction_write_failed(self, job_id: str, error: Exception, context: Any):
+        """Result writer callback: a buffered prediction could not be stored."""
+        self._fail_job(context[0], error)
+    
+    def _on_prediction_discarded(self, context: Any):
+        """Result writer callback: finish_jobs skipped a prediction whose lease was lost."""
+        self._discard_result(context[0])
+    
+    def _on_leases_lost(self, job_ids: List[str]):
+        """LeaseKeeper callback: these in-flight jobs' leases expired before they finished."""
+        self.metrics.leases_lost.inc(len(job_ids))
+        with self._lost_leases_lock:
+            self._lost_leases.update(job_ids)
+    
+    def _lease_lost(self, job_id: str) -> bool:
+        """Whether the heartbeat has reported this job's lease lost."""
+        with self._lost_leases_lock:
+            return job_id in self._lost_leases
+    
+    def _release_lease(self, job_id: str):
+        """Stop extending a finished job's lease."""
+        self.leases.release(job_id)
+        with self._lost_leases_lock:
+            self._lost_leases.discard(job_id)
+    
+    def _discard_result(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Drop the outcome of a job whose lease this worker lost.
+        
+        The job was reaped (requeued or dead-lettered) and may already have
+        been claimed by another worker, so neither its prediction nor its
+        failure is written: that worker, or the reaper, owns the job now.
+        
+        Returns:
+            Dictionary with processing results
+        """
+        job_id = job["id"]
+        self._release_lease(job_id)
+        self.metrics.results_discarded.inc()
+        print(f"Lease on job {job_id} was lost, discarding its result")
+        return {
+            "success": False,
+            "job_id": job_id,
+            "error": "Lease lost before the result was written",
+            "status": "lease_lost"
+        }
+    
+    def _failed_job_update(self, error: str, status: str = "failed",
+                           retry_delay: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Column updates for a job whose attempt failed.
+        
+        Args:
+            error: Error message stored on the job
+            status: 'queued' to retry, or the terminal 'failed' / 'dead_letter'
+            retry_delay: Seconds until a requeued job may be claimed again
+        """
+        update = {"status": status, "error": error, "lease_owner": None, "lease_expires_at": None}
+        
+        if status == "queued":
+            update["started_at"] = None
+            update["next_attempt_at"] = (datetime.utcnow() + timedelta(seconds=retry_delay or 0)).isoformat()
+        else:
+            update["finished_at"] = datetime.utcnow().isoformat()
+        
+        return update
+    
+    def _job_failure_update(self, job: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        """
+        Apply the retry policy to a failed attempt, logging and counting the outcome.
+        
+        Args:
+            job: Job row (its 'attempts' count comes from claim_jobs)
+            error: Exception that failed the attempt
             
-            return {
-                "success": False,
-                "error": str(e)
-            }
+        Returns:
+            Column updates for the job, from _failed_job_update
+        """
+        job_id = job["id"]
+        attempts = job.get("attempts") or 1
+        status, retry_delay = self.retry_policy.decide(error, attempts)
+        
+        if status == "queued":
+            print(f"Job {job_id} attempt {attempts} failed, retrying in {retry_delay:.0f}s: {str(error)}")
+            self.metrics.jobs_retried.inc()
+        elif status == "dead_letter":
+            print(f"Job {job_id} failed {attempts} attempts, moving to dead letter: {str(error)}")
+            self.metrics.jobs_dead_lettered.inc()
+        else:
+            print(f"Error processing job {job_id}: {str(error)}")
+            self.metrics.jobs_failed.inc()
+        
+        return self._failed_job_update(str(error), status, retry_delay)
     
-    def _download_audio_with_signed_url(self, file_path: str) -> Tuple[Optional[np.ndarray], Optional[int]]:
-        try:
-            try:
-                signed_urls_response = self.supabase.storage.from_("audio_files").create_signed_urls([file_path], expires_in=3600)
-                
-                if not signed_urls_response or len(signed_urls_response) == 0:
-                    print(f"Failed to generate signed URL for: {file_path}")
-                    return None, None
-                
-                signed_url_data = signed_urls_response[0]
-                signed_url = signed_url_data.get('signedURL') or signed_url_data.get('signed_url')
-                
-                if not signed_url:
-                    print(f"No signed URL in response: {signed_url_data}")
-                    return None, None
-                
-                print(f"Generated signed URL (expires in 1 hour)")
-                
-            except Exception as e:
-                print(f"Error generating signed URL: {str(e)}")
+    def _record_completion(self, job: Dict[str, Any], mood_analysis: Dict[str, Any], timer: StageTimer) -> Dict[str, Any]:
+        """
+        Update metrics and logs for a job whose prediction has been stored.
+        
+        Returns:
+            Dictionary with processing results
+        """
+        job_id = job["id"]
+        
+        self._release_lease(job_id)
+        self.metrics.jobs_completed.inc()
+        self.metrics.observe_timings(timer.timings)
+        
+        print(f"Job {job_id} completed successfully (timings: {timer.as_dict()})")
+        
+        return {
+            "success": True,
+            "job_id": job_id,
+            "prediction": mood_analysis,
+            "timings": timer.as_dict()
+        }
+    
+    def _fail_job(self, job: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        """
+        Handle a failed attempt: requeue the job for a retry, or mark it failed
+        or dead-lettered, as the retry policy decides. A job whose lease was
+        lost is left to the reaper instead.
+        
+        The lease is released even if the status update cannot be written, so
+        the heartbeat stops renewing it and the reaper requeues the job once
+        the lease runs out. This is also the error path of a failed
+        complete_job call.
+        
+        Args:
+            job: Job row of the failed job
+            error: Exception that caused the failure
             
-            response = requests.get(signed_url, timeout=30)
-            response.raise_for_status()
+        Returns:
+            Dictionary with processing results
+        """
+        job_id = job["id"]
+        if self._lease_lost(job_id):
+            return self._discard_result(job)
+        
+        update = self._job_failure_update(job, error)
+        try:
+            self._mark_job_failed(job_id, update)
+        except Exception as update_error:
+            print(f"Error updating failed job {job_id}, leaving it to the reaper: {str(update_error)}")
+        finally:
+            self._release_lease(job_id)
+        return {
+            "success": False,
+            "error": str(error),
+            "status": update["status"]
+        }
+    
+    def _mark_job_failed(self, job_id: str, update: Dict[str, Any]):
+        """Write a failed job's column updates (buffered when a result writer is in use)."""
+        query = self._failed_job_write(self.supabase, job_id, update)
+        if query is not None:
+            query.execute()
+    
+    def _failed_job_write(self, client, job_id: str, update: Dict[str, Any]):
+        """
+        Hand a failed job's column updates to the result writer, or build the query that writes them.
+        
+        The query only applies while the job is still processing under this
+        worker's lease, like complete_job and finish_jobs. Shared by the sync
+        and async workers, which execute it on their own client.
+        
+        Args:
+            client: Supabase client (sync or async) to build the query on
+            job_id: UUID of the failed job
+            update: Column updates from _job_failure_update
             
-            file_ext = file_path.split('.')[-1].lower() if '.' in file_path else 'wav'
-            if file_ext not in ['wav', 'mp3', 'm4a', 'ogg', 'webm']:
-                file_ext = 'wav'
+        Returns:
+            Query to execute, or None if the result writer took the update
+        """
+        if self.result_writer is not None:
+            self.result_writer.add_failed(job_id, update)
+            return None
+        return client.table("jobs").update(update).eq("id", job_id).eq("status", "processing").eq(
+            "lease_owner", self.worker_id
+        )
+    
+    def close(self):
+        """Write any buffered job results, stop the lease heartbeat and the ffmpeg pool. Call once the worker loop has stopped."""
+        if self.result_writer is not None:
+            self.result_writer.close()
+        self.leases.close()
+        if self.ffmpeg_pool is not None:
+            self.ffmpeg_pool.close()
+    
+    def http_pool_stats(self) -> Dict[str, int]:
+        """
+        Connection pool counters for storage and metadata fetches.
+        
+        Returns:
+            Dictionary with 'requests', 'hits' (reused connections) and 'misses' (new connections)
+        """
+        return self.http.pool_stats.snapshot()
+    
+    def _download_buffer(self) -> DownloadBuffer:
+        """Return this thread's reusable download buffer."""
+        buffer = getattr(self._thread_state, "download_buffer", None)
+        if buffer is None:
+            buffer = DownloadBuffer()
+            self._thread_state.download_buffer = buffer
+        return buffer
+    
+    def _download_audio_bytes(self, file_path: str, timer: Optional[StageTimer] = None,
+                              if_none_match: Optional[str] = None) -> Tuple[Optional[memoryview], Optional[str]]:
+        """
+        Sign a storage path and stream the object into this thread's download buffer.
+        
+        WAV objects are fetched with Range requests covering only the analysis
+        window (see _download_wav_prefix). The returned view is only valid
+        until this thread's next download.
+        
+        If storage rejects a cached signed URL with a 4xx (e.g. it was revoked
+        before its TTL ran out), the URL is dropped from the cache and the
+        path signed and downloaded once more before the error is raised.
+        
+        Args:
+            file_path: Storage path relative to the audio_files bucket
+            timer: Optional StageTimer for the signed_url/download stages
+            if_none_match: ETag of a cached copy; storage answers 304 if it is still current
             
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_ext}') as tmp_file:
-                tmp_file.write(response.content)
-                tmp_path = tmp_file.name
+        Returns:
+            Tuple of (encoded audio bytes, ETag); the bytes are None on a 304
+        """
+        if timer is None:
+            timer = StageTimer()
+        
+        while True:
+            with timer.stage("signed_url"):
+                cached_url = self.signed_urls.get(file_path)
+                signed_url = cached_url or self._sign_storage_paths([file_path]).get(file_path)
             
-            audio_data, sample_rate = librosa.load(tmp_path, sr=16000, duration=30)
+            if not signed_url:
+                # Storage returned an error for this path (e.g. the object is missing)
+                raise PermanentJobError(f"Failed to generate signed URL for: {file_path}")
             
-            os.unlink(tmp_path)
+            try:
+                with timer.stage("download"):
+                    return self._download_signed_url(file_path, signed_url, if_none_match)
+            except Exception as e:
+                if cached_url is None or not is_client_error(e):
+                    raise
+                print(f"Cached signed URL for {file_path} rejected ({str(e)}), re-signing")
+                self.signed_urls.invalidate(file_path, cached_url)
+    
+    def _download_signed_url(self, file_path: str, signed_url: str,
+                             if_none_match: Optional[str] = None) -> Tuple[Optional[memoryview], Optional[str]]:
+        """Download an object from its signed URL; see _download_audio_bytes."""
+        if self.ranged_downloads and audio_format_from_path(file_path) == "wav":
+            return self._download_wav_prefix(signed_url, if_none_match)
+        
+        headers = {"If-None-Match": if_none_match} if if_none_match else None
+        
+        with self.http.get(signed_url, timeout=30, stream=True, headers=headers) as response:
+            if response.status_code == 304:
+                return None, if_none_match
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
+            audio_bytes = self._download_buffer().fill(response.iter_content(DOWNLOAD_CHUNK_SIZE))
+        
+        self.metrics.download_bytes.inc(len(audio_bytes), mode="full")
+        return audio_bytes, etag
+    
+    def _download_wav_prefix(self, signed_url: str,
+                             if_none_match: Optional[str] = None) -> Tuple[Optional[memoryview], Optional[str]]:
+        """
+        Download only the bytes of a WAV that the analysis window needs.
+        
+        A WAV's frames have a fixed size, so once the header is in, the bytes
+        for MAX_DURATION_SECONDS can be requested exactly (see WavRangePlanner).
+        Follow-up ranges carry If-Range, so if the object changes between
+        requests, or storage ignores Range, the 200 response's full body is used.
+        
+        Args:
+            signed_url: Signed URL of the object
+            if_none_match: ETag of a cached copy; storage answers 304 if it is still current
             
-            return audio_data, sample_rate
+        Returns:
+            Tuple of (encoded audio bytes, ETag); the bytes are None on a 304
+        """
+        buffer = self._download_buffer()
+        planner = WavRangePlanner()
+        headers = {"If-None-Match": if_none_match} if if_none_match else {}
+        byte_range = planner.first_range()
+        etag = None
+        buffer.fill([])
+        
+        while byte_range is not None:
+            headers["Range"] = format_range(byte_range)
+            with self.http.get(signed_url, timeout=30, stream=True, headers=headers) as response:
+                if response.status_code == 304:
+                    return None, if_none_match
+                response.raise_for_status()
+                
+                if response.status_code != 206:
+                    # Range ignored, or the object changed since the first range
+                    audio_bytes = buffer.fill(response.iter_content(DOWNLOAD_CHUNK_SIZE))
+                    self.metrics.download_bytes.inc(len(audio_bytes), mode="full")
+                    return audio_bytes, response.headers.get("ETag")
+                
+                etag = etag or response.headers.get("ETag")
+                buffer.extend(response.iter_content(DOWNLOAD_CHUNK_SIZE))
+                planner.received(response.headers.get("Content-Range"), buffer.size)
             
-        except Exception as e:
-            print(f"Error downloading with signed URL: {str(e)}")
-            return None, None
+            headers = {"If-Range": etag} if etag else {}
+            # Release the view before the next range grows the buffer
+            with buffer.view() as received:
+                byte_range = planner.next_range(received)
+        
+        for offset, patch in planner.header_patches(buffer.size):
+            buffer.write_at(offset, patch)
         
+        self.metrics.download_bytes.inc(buffer.size, mode="ranged")
+        return buffer.view(), etag
+    
     def _run_yamnet(self, audio_data: np.ndarray, sample_rate: int) -> Dict[str, Any]:
         """
         Run YAMNet inference for sound classification.
@@ -228,7 +1186,9 @@ class AudioMoodWorker:
             sample_rate: Sample rate of the audio
             
         Returns:
-            Dictionary with classification results
+            Dictionary with classification results, plus the per-frame
+            'speech_scores' the speech gate reads (not stored). If YAMNet
+            fails, an 'Unknown' classification with the 'error' (not stored)
         """
         try:
             # YAMNet expects 16kHz audio
@@ -256,7 +1216,8 @@ class AudioMoodWorker:
             return {
                 "sound_classification": primary_class,
                 "top_classes": top_classes,
-                "confidence": float(top_classes[0]["score"]) if top_classes else 0.0
+                "confidence": float(top_classes[0]["score"]) if top_classes else 0.0,
+                "speech_scores": self.speech_gate.frame_speech_scores(scores)
             }
             
         except Exception as e:
@@ -264,7 +1225,8 @@ class AudioMoodWorker:
             return {
                 "sound_classification": "Unknown",
                 "top_classes": [],
-                "confidence": 0.0
+                "confidence": 0.0,
+                "error": str(e)
             }
     
     def _run_emotion_detection(self, audio_data: np.ndarray, sample_rate: int) -> Dict[str, Any]:
@@ -295,6 +1257,40 @@ class AudioMoodWorker:
             raise
     
     
+    def _run_emotion_detection_batch(self, audio_batch: List[np.ndarray], sample_rate: int) -> List[Dict[str, Any]]:
+        """
+        Run emotion detection on several clips in one forward pass.
+        
+        Falls back to clip-by-clip inference if the batched pass fails, so a
+        single bad clip cannot fail the whole batch.
+        
+        Args:
+            audio_batch: Audio waveforms sharing one sample rate
+            sample_rate: Sample rate of the audio
+            
+        Returns:
+            List of emotion detection results, in input order
+        """
+        if self.emotion_classifier is None:
+            raise Exception("Emotion classifier not initialized")
+        
+        if len(audio_batch) == 1:
+            return [self._run_emotion_detection(audio_batch[0], sample_rate)]
+        
+        try:
+            batch_results = self.emotion_classifier.predict_batch(audio_batch, sample_rate)
+        except Exception as e:
+            print(f"Batched emotion detection failed, falling back to per-clip: {str(e)}")
+            return [self._run_emotion_detection(audio_data, sample_rate) for audio_data in audio_batch]
+        
+        return [
+            {
+                "emotion": result.get("emotion", "neutral"),
+                "emotion_score": float(result.get("emotion_score", 0.5))
+            }
+            for result in batch_results
+        ]
+    
     def _combine_results(self, yamnet_results: Dict[str, Any], emotion_results: Dict[str, Any]) -> Dict[str, Any]:
         """
         Combine YAMNet and emotion results - returns raw model outputs.
@@ -315,42 +1311,324 @@ class AudioMoodWorker:
             "emotion_score": emotion_results.get("emotion_score", 0.0)
         }
     
-    def run(self, poll_interval: int = 5):
+    def _collect_batch(self, batch_size: int, max_batch_wait: float) -> List[Dict[str, Any]]:
         """
-        Main worker loop that polls for queued jobs.
+        Claim up to batch_size jobs, waiting briefly for a batch to fill.
+        
+        Args:
+            batch_size: Maximum number of jobs to claim
+            max_batch_wait: Seconds to keep claiming after the first job arrives
+            
+        Returns:
+            Claimed jobs (empty if the queue is empty)
+        """
+        jobs = self._claim_jobs(batch_size)
+        
+        if not jobs:
+            return jobs
+        
+        deadline = time.monotonic() + max_batch_wait
+        while len(jobs) < batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(BATCH_FILL_POLL_INTERVAL, remaining))
+            jobs.extend(self._claim_jobs(batch_size - len(jobs)))
+        
+        return jobs
+    
+    def run(self, poll_interval: float = 5, batch_size: int = 1, max_batch_wait: float = 0.0,
+            min_poll_interval: float = 0.25, notifier: Optional[JobNotifier] = None, prefetch_depth: int = 0):
+        """
+        Main worker loop that claims and processes queued jobs.
+        
+        Safe to run in any number of processes against the same database.
+        Jobs are claimed atomically, and delivery is at-least-once: a job
+        whose lease expires (its worker stalled or died) is requeued and may
+        be processed again elsewhere. Its result is still written only once,
+        because complete_job/finish_jobs only accept it from the worker that
+        holds the job's current lease.
+        With batch_size > 1 the worker claims several jobs and runs them
+        through the models together, trading per-job latency for throughput.
+        
+        When the queue is empty the worker waits on the notifier, which wakes
+        it as soon as a job is queued (e.g. Postgres NOTIFY). Without a
+        notification it re-polls with exponential backoff from
+        min_poll_interval up to poll_interval.
+        
+        With prefetch_depth > 0, up to that many upcoming jobs are claimed and
+        downloaded/decoded in background threads while the current batch is
+        in inference, hiding network latency behind model time. Batches then
+        take whatever jobs have been prefetched and max_batch_wait does not
+        apply. On shutdown, prefetched jobs that were never processed are
+        handed back to the queue with their attempt refunded.
         
         Args:
-            poll_interval: Seconds to wait between polls
+            poll_interval: Maximum seconds between polls when the queue is empty
+            batch_size: Maximum number of jobs to claim and infer together
+            max_batch_wait: Seconds to wait for a partial batch to fill (ignored with prefetch_depth > 0)
+            min_poll_interval: First backoff delay after the queue drains
+            notifier: Source of new-job wake-ups (defaults to polling only)
+            prefetch_depth: Jobs to download and decode ahead of inference
         """
-        print("Worker started. Polling for queued jobs...")
+        if notifier is None:
+            notifier = JobNotifier()
+        backoff = AdaptiveBackoff(min_interval=min(min_poll_interval, poll_interval), max_interval=poll_interval)
+        
+        print(
+            f"Worker started (batch_size={batch_size}, max_batch_wait={max_batch_wait}s, "
+            f"prefetch_depth={prefetch_depth}). Polling for queued jobs..."
+        )
+        
+        prefetcher = ThreadPoolExecutor(max_workers=prefetch_depth, thread_name_prefix="prefetch") if prefetch_depth > 0 else None
+        prefetched = deque()
         
         while True:
             try:
-                # Fetch queued jobs
-                jobs_response = self.supabase.table("jobs").select(
-                    "id"
-                ).eq("status", "queued").limit(1).execute()
-                
-                if jobs_response.data and len(jobs_response.data) > 0:
-                    job = jobs_response.data[0]
-                    job_id = job["id"]
-                    
-                    print(f"Processing job: {job_id}")
-                    result = self.process_job(job_id)
-                    
-                    if result["success"]:
-                        print(f"✓ Job {job_id} completed successfully")
-                    else:
-                        print(f"✗ Job {job_id} failed: {result.get('error')}")
+                if prefetcher is not None:
+                    processed = self._run_prefetched_batch(prefetcher, prefetched, batch_size, prefetch_depth)
                 else:
-                    time.sleep(poll_interval)
+                    processed = self._run_next_batch(batch_size, max_batch_wait)
+                
+                if processed:
+                    backoff.reset()
+                elif notifier.wait(backoff.next_delay()):
+                    backoff.reset()
                     
             except KeyboardInterrupt:
                 print("\nWorker stopped by user")
+                print(f"HTTP pool stats: {self.http_pool_stats()}")
+                notifier.close()
+                if prefetcher is not None:
+                    self._requeue_prefetched(prefetcher, prefetched)
                 break
             except Exception as e:
                 print(f"Error in worker loop: {str(e)}")
-                time.sleep(poll_interval)
+                time.sleep(backoff.next_delay())
+    
+    def _run_next_batch(self, batch_size: int, max_batch_wait: float) -> bool:
+        """
+        Claim, process and report one batch.
+        
+        Returns:
+            False if the queue was empty
+        """
+        claim_start = time.perf_counter()
+        jobs = self._collect_batch(batch_size, max_batch_wait)
+        claim_time = time.perf_counter() - claim_start
+        
+        if not jobs:
+            return False
+        
+        print(f"Processing {len(jobs)} job(s): {', '.join(job['id'] for job in jobs)}")
+        results = self._process_batch(jobs, job_fetch_time=claim_time)
+        self._report_results(jobs, results)
+        return True
+    
+    def _run_prefetched_batch(self, prefetcher: ThreadPoolExecutor, prefetched: deque,
+                              batch_size: int, prefetch_depth: int) -> bool:
+        """
+        Process the next batch of prefetched jobs, topping up the prefetch window first.
+        
+        The window is refilled after the batch is taken and before inference
+        starts, so the following jobs download while this batch is in the models.
+        
+        Args:
+            prefetcher: Executor running background loads
+            prefetched: FIFO of (job, StageTimer, Future) for claimed jobs
+            batch_size: Maximum jobs per inference batch
+            prefetch_depth: Jobs to keep loading beyond the current batch
+            
+        Returns:
+            False if there was nothing to process
+        """
+        self._top_up_prefetch(prefetcher, prefetched, batch_size)
+        
+        if not prefetched:
+            return False
+        
+        batch = [prefetched.popleft() for _ in range(min(batch_size, len(prefetched)))]
+        self._top_up_prefetch(prefetcher, prefetched, prefetch_depth)
+        
+        jobs = [job for job, _, _ in batch]
+        timers = {job["id"]: timer for job, timer, _ in batch}
+        results = {}
+        loaded = []
+        
+        print(f"Processing {len(jobs)} job(s): {', '.join(job['id'] for job in jobs)}")
+        self.metrics.batch_size.observe(len(jobs))
+        
+        for job, _, future in batch:
+            try:
+                audio_data, sample_rate = future.result()
+                loaded.append((job, audio_data, sample_rate))
+            except Exception as e:
+                results[job["id"]] = self._fail_job(job, e)
+        
+        results.update(self._finish_batch(loaded, timers))
+        self._report_results(jobs, [results[job["id"]] for job in jobs])
+        return True
+    
+    def _top_up_prefetch(self, prefetcher: ThreadPoolExecutor, prefetched: deque, target: int):
+        """
+        Claim jobs until prefetched holds target entries, and start loading them.
+        
+        Args:
+            prefetcher: Executor running background loads
+            prefetched: FIFO of (job, StageTimer, Future) for claimed jobs
+            target: Desired number of claimed, unprocessed jobs
+        """
+        missing = target - len(prefetched)
+        if missing <= 0:
+            return
+        
+        claim_start = time.perf_counter()
+        jobs = self._claim_jobs(missing)
+        claim_time = time.perf_counter() - claim_start
+        
+        if not jobs:
+            return
+        
+        timers = self._start_timers(jobs, claim_time)
+        for job in jobs:
+            timer = timers[job["id"]]
+            prefetched.append((job, timer, prefetcher.submit(self._load_job_audio, job, timer)))
+    
+    def _requeue_prefetched(self, prefetcher: ThreadPoolExecutor, prefetched: deque):
+        """
+        Stop prefetching and return the claimed, unprocessed jobs to the queue.
+        
+        Args:
+            prefetcher: Executor running background loads
+            prefetched: FIFO of (job, StageTimer, Future) for claimed jobs
+        """
+        for _, _, future in prefetched:
+            future.cancel()
+        prefetcher.shutdown(wait=True)
+        
+        job_ids = [job["id"] for job, _, _ in prefetched]
+        prefetched.clear()
+        if not job_ids:
+            return
+        
+        try:
+            requeued = self.leases.requeue(job_ids)
+            print(f"Requeued {requeued} prefetched job(s)")
+        except Exception as e:
+            print(f"Error requeuing prefetched jobs, leaving them to the reaper: {str(e)}")
+    
+    def _report_results(self, jobs: List[Dict[str, Any]], results: List[Dict[str, Any]]):
+        """Log the outcome of each job in a processed batch."""
+        for job, result in zip(jobs, results):
+            job_id = job["id"]
+            if result.get("queued"):
+                print(f"✓ Job {job_id} processed, result queued for writing")
+            elif result["success"]:
+                print(f"✓ Job {job_id} completed successfully")
+            elif result.get("status") == "queued":
+                print(f"↻ Job {job_id} requeued for retry: {result.get('error')}")
+            elif result.get("status") == "lease_lost":
+                print(f"⊘ Job {job_id} result discarded: {result.get('error')}")
+            else:
+                print(f"✗ Job {job_id} failed: {result.get('error')}")
+
+
+def start_worker_from_env(worker_index: int = 0, emotion_classifier: Optional[CustomEmotionClassifier] = None):
+    """
+    Build a worker from WORKER_* environment variables and run it until interrupted.
+    
+    Args:
+        worker_index: Index of this worker under a supervisor (offsets the metrics
+            port and is appended to WORKER_ID)
+        emotion_classifier: Already loaded HuBERT classifier to share, if any
+    """
+    worker_id = os.getenv("WORKER_ID")
+    if worker_id and (worker_index or int(os.getenv("WORKER_PROCESSES", "1")) > 1):
+        # Supervised workers share one environment but must not share a lease owner id
+        worker_id = f"{worker_id}:{worker_index}"
+    
+    audio_cache = None
+    audio_cache_dir = os.getenv("WORKER_AUDIO_CACHE_DIR")
+    if audio_cache_dir:
+        audio_cache = DecodedAudioCache(
+            audio_cache_dir,
+            max_bytes=int(float(os.getenv("WORKER_AUDIO_CACHE_MAX_MB", "2048")) * 1024 ** 2)
+        )
+    
+    worker = AudioMoodWorker(
+        http_pool_size=int(os.getenv("WORKER_HTTP_POOL_SIZE", "10")),
+        http_max_retries=int(os.getenv("WORKER_HTTP_MAX_RETRIES", "3")),
+        http_backoff_factor=float(os.getenv("WORKER_HTTP_BACKOFF_FACTOR", "0.5")),
+        signed_url_ttl=int(os.getenv("WORKER_SIGNED_URL_TTL", "3600")),
+        emotion_classifier=emotion_classifier,
+        write_batch_rows=int(os.getenv("WORKER_WRITE_BATCH_ROWS", "1")),
+        write_flush_interval=float(os.getenv("WORKER_WRITE_FLUSH_MS", "500")) / 1000,
+        worker_id=worker_id,
+        lease_seconds=int(os.getenv("WORKER_LEASE_SECONDS", "300")),
+        reap_interval=float(os.getenv("WORKER_REAP_INTERVAL", str(DEFAULT_REAP_INTERVAL))),
+        retry_policy=RetryPolicy(
+            max_attempts=int(os.getenv("WORKER_MAX_ATTEMPTS", "5")),
+            base_delay=float(os.getenv("WORKER_RETRY_BASE_DELAY", "30")),
+            max_delay=float(os.getenv("WORKER_RETRY_MAX_DELAY", "3600"))
+        ),
+        prediction_cache_size=int(os.getenv("WORKER_PREDICTION_CACHE_SIZE", "1024")),
+        prediction_cache_db=os.getenv("WORKER_PREDICTION_CACHE_DB", "true").lower() in ("1", "true", "yes"),
+        audio_cache=audio_cache,
+        ranged_downloads=os.getenv("WORKER_RANGED_DOWNLOADS", "true").lower() in ("1", "true", "yes"),
+        ffmpeg_pool_size=int(os.getenv("WORKER_FFMPEG_POOL_SIZE", "2")),
+        yamnet_vad=os.getenv("WORKER_VAD_YAMNET", "off"),
+        hubert_vad=os.getenv("WORKER_VAD_HUBERT", "off"),
+        speech_gate=SpeechGate(
+            mode=os.getenv("WORKER_SPEECH_GATE", "off"),
+            frame_threshold=float(os.getenv("WORKER_SPEECH_FRAME_THRESHOLD", "0.3")),
+            min_speech_seconds=float(os.getenv("WORKER_MIN_SPEECH_SECONDS", "1.0"))
+        )
+    )
+    
+    metrics_port = os.getenv("WORKER_METRICS_PORT")
+    if metrics_port:
+        start_metrics_server(worker.metrics.registry, port=int(metrics_port) + worker_index)
+    
+    poll_interval = float(os.getenv("WORKER_POLL_INTERVAL", "5"))
+    min_poll_interval = float(os.getenv("WORKER_MIN_POLL_INTERVAL", "0.25"))
+    batch_size = int(os.getenv("WORKER_BATCH_SIZE", "1"))
+    notifier = create_job_notifier(os.getenv("WORKER_DATABASE_URL"))
+    
+    mode = os.getenv("WORKER_MODE", "batch")
+    
+    try:
+        if mode == "async":
+            async_worker = AsyncAudioMoodWorker(
+                worker,
+                max_in_flight=int(os.getenv("WORKER_MAX_IN_FLIGHT", "200")),
+                batch_size=batch_size,
+                decode_threads=int(os.getenv("WORKER_DECODE_THREADS", "2")),
+                http_pool_size=int(os.getenv("WORKER_HTTP_POOL_SIZE", "10"))
+            )
+            try:
+                asyncio.run(async_worker.run(poll_interval=poll_interval, min_poll_interval=min_poll_interval, notifier=notifier))
+            except KeyboardInterrupt:
+                print("\nWorker stopped by user")
+        elif mode == "pipeline":
+            PipelinedWorker(
+                worker,
+                batch_size=batch_size,
+                fetch_threads=int(os.getenv("WORKER_FETCH_THREADS", "4")),
+                decode_threads=int(os.getenv("WORKER_DECODE_THREADS", "2")),
+                write_threads=int(os.getenv("WORKER_WRITE_THREADS", "2")),
+                queue_size=int(os.getenv("WORKER_QUEUE_SIZE", "8"))
+            ).run(poll_interval=poll_interval, min_poll_interval=min_poll_interval, notifier=notifier)
+        else:
+            worker.run(
+                poll_interval=poll_interval,
+                batch_size=batch_size,
+                max_batch_wait=float(os.getenv("WORKER_MAX_BATCH_WAIT", "0")),
+                min_poll_interval=min_poll_interval,
+                notifier=notifier,
+                prefetch_depth=int(os.getenv("WORKER_PREFETCH_DEPTH", "0"))
+            )
+    finally:
+        worker.close()
 
 
 if __name__ == "__main__":
@@ -363,6 +1641,14 @@ if __name__ == "__main__":
     load_dotenv(env_path)
     print(f"Loaded environment from: {env_path}")
     
-    worker = AudioMoodWorker()
-    worker.run(poll_interval=5)
-
+    num_processes = int(os.getenv("WORKER_PROCESSES", "1"))
+    
+    if num_processes > 1:
+        run_supervisor(
+            num_workers=num_processes,
+            threads_per_worker=int(os.getenv("WORKER_THREADS_PER_PROCESS", "1")),
+            load_shared_classifier=lambda: load_emotion_classifier(device="cpu"),
+            start_worker=start_worker_from_env
+        )
+    else:
+        start_worker_from_env()
@@ -0,0 +1,33 @@
+import pytest
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeCall:
+    def __init__(self, supabase, name, params):
+        self.supabase = supabase
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        self.supabase.calls.append((self.name, self.params))
+        return FakeResponse(self.supabase.handlers[self.name](self.params))
+
+
+class FakeSupabase:
+    """Records RPC calls and answers them with per-function handlers."""
+
+    def __init__(self):
+        self.handlers = {}
+        self.calls = []
+
+    def rpc(self, name, params):
+        return FakeCall(self, name, params)
+
+
+@pytest.fixture
+def supabase():
+    return FakeSupabase()
@@ -0,0 +1,85 @@
+from services.bulk_writer import BulkResultWriter
+
+
+def make_writer(supabase, events):
+    return BulkResultWriter(
+        supabase,
+        flush_rows=100,
+        flush_interval=60,
+        worker_id="worker-1",
+        on_completed=lambda context, write_time: events.append(("completed", context)),
+        on_failed=lambda job_id, error, context: events.append(("failed", context)),
+        on_discarded=lambda context: events.append(("discarded", context)),
+        on_flushed=lambda rows: events.append(("flushed", rows))
+    )
+
+
+def completed_ids(params):
+    return [row["job_id"] for row in params["p_completed"]]
+
+
+def test_close_writes_buffer_in_one_call(supabase):
+    supabase.handlers["finish_jobs"] = lambda params: [{"completed_job_id": job_id} for job_id in completed_ids(params)]
+    events = []
+    writer = make_writer(supabase, events)
+
+    writer.add_completed("a", {"scores": {}}, "ctx-a")
+    writer.add_completed("b", {"scores": {}}, "ctx-b")
+    writer.add_failed("c", {"status": "failed", "error": "boom"})
+    assert writer.pending() == 3
+    writer.close()
+
+    assert len(supabase.calls) == 1
+    _, params = supabase.calls[0]
+    assert params["p_worker_id"] == "worker-1"
+    assert completed_ids(params) == ["a", "b"]
+    assert params["p_failed"] == [{"status": "failed", "error": "boom", "job_id": "c"}]
+    assert events == [("flushed", 3), ("completed", "ctx-a"), ("completed", "ctx-b")]
+
+
+def test_failed_bulk_write_falls_back_to_one_row_at_a_time(supabase):
+    def finish_jobs(params):
+        ids = completed_ids(params)
+        if len(ids) + len(params["p_failed"]) > 1 or "bad" in ids:
+            raise RuntimeError("invalid row")
+        return [{"completed_job_id": job_id} for job_id in ids]
+
+    supabase.handlers["finish_jobs"] = finish_jobs
+    events = []
+    writer = make_writer(supabase, events)
+
+    writer.add_completed("good", {"scores": {}}, "ctx-good")
+    writer.add_completed("bad", {"scores": {}}, "ctx-bad")
+    writer.add_failed("other", {"status": "queued", "error": "timeout"})
+    writer.close()
+
+    # One bulk attempt, then one call per job
+    assert len(supabase.calls) == 4
+    assert ("completed", "ctx-good") in events
+    assert ("failed", "ctx-bad") in events
+    assert events.count(("flushed", 1)) == 2
+
+
+def test_completions_without_a_lease_are_discarded(supabase):
+    # finish_jobs skips jobs no longer leased to this worker
+    supabase.handlers["finish_jobs"] = lambda params: [{"completed_job_id": "kept"}]
+    events = []
+    writer = make_writer(supabase, events)
+
+    writer.add_completed("kept", {"scores": {}}, "ctx-kept")
+    writer.add_completed("reaped", {"scores": {}}, "ctx-reaped")
+    writer.close()
+
+    assert events == [("flushed", 2), ("completed", "ctx-kept"), ("discarded", "ctx-reaped")]
+
+
+def test_rows_added_after_close_are_written_directly(supabase):
+    supabase.handlers["finish_jobs"] = lambda params: [{"completed_job_id": job_id} for job_id in completed_ids(params)]
+    events = []
+    writer = make_writer(supabase, events)
+    writer.close()
+
+    writer.add_completed("late", {"scores": {}}, "ctx-late")
+
+    assert len(supabase.calls) == 1
+    assert events == [("flushed", 1), ("completed", "ctx-late")]
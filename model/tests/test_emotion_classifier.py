@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from services.emotion_classifier import CustomEmotionClassifier
+
+SAMPLE_RATE = 16000
+
+
+def make_classifier(feat_extract_norm: str) -> CustomEmotionClassifier:
+    """A tiny randomly initialised HuBERT classifier, skipping the Hub download."""
+    torch.manual_seed(0)
+    config = transformers.HubertConfig(
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        conv_dim=(16, 16, 16),
+        conv_stride=(5, 4, 2),
+        conv_kernel=(10, 8, 4),
+        num_conv_pos_embeddings=16,
+        num_conv_pos_embedding_groups=4,
+        feat_extract_norm=feat_extract_norm,
+        do_stable_layer_norm=feat_extract_norm == "layer",
+        num_labels=8
+    )
+
+    classifier = CustomEmotionClassifier.__new__(CustomEmotionClassifier)
+    classifier.model_name = "test"
+    classifier.device = "cpu"
+    classifier.config = config
+    classifier.num_emotions = 8
+    classifier.feature_extractor = transformers.Wav2Vec2FeatureExtractor(
+        sampling_rate=SAMPLE_RATE, do_normalize=True, return_attention_mask=feat_extract_norm == "layer"
+    )
+    classifier.model = transformers.HubertForSequenceClassification(config).eval()
+    return classifier
+
+
+def clips():
+    rng = np.random.default_rng(0)
+    # Lengths within the default padding ratio of each other, plus a duplicate length
+    lengths = [16000, 17000, 19000, 16000, 24000]
+    return [(rng.standard_normal(length) * 0.1).astype(np.float32) for length in lengths]
+
+
+@pytest.mark.parametrize("feat_extract_norm", ["group", "layer"])
+def test_predict_batch_matches_predict(feat_extract_norm):
+    classifier = make_classifier(feat_extract_norm)
+    audio_batch = clips()
+
+    batched = classifier.predict_batch(audio_batch, SAMPLE_RATE)
+    single = [classifier.predict(audio, SAMPLE_RATE) for audio in audio_batch]
+
+    for batch_result, single_result in zip(batched, single):
+        assert batch_result["emotion"] == single_result["emotion"]
+        assert batch_result["emotion_score"] == pytest.approx(single_result["emotion_score"], abs=1e-6)
+
+
+def test_group_norm_models_only_batch_equal_lengths():
+    classifier = make_classifier("group")
+    audio_batch = clips()
+
+    assert not classifier.supports_padded_batches
+    buckets = classifier._length_buckets(audio_batch, 1.0, 8)
+    for bucket in buckets:
+        assert len({len(audio_batch[i]) for i in bucket}) == 1
+    assert sorted(len(bucket) for bucket in buckets) == [1, 1, 1, 2]
@@ -0,0 +1,32 @@
+import threading
+
+from services.job_notify import AdaptiveBackoff, LocalJobNotifier
+
+
+def test_backoff_doubles_up_to_the_maximum_and_resets():
+    backoff = AdaptiveBackoff(min_interval=0.25, max_interval=1.0)
+
+    assert [backoff.next_delay() for _ in range(5)] == [0.25, 0.5, 1.0, 1.0, 1.0]
+    backoff.reset()
+    assert backoff.next_delay() == 0.25
+
+
+def test_local_notifier_wakes_the_waiting_worker():
+    notifier = LocalJobNotifier()
+
+    assert not notifier.wait(0.01)
+
+    timer = threading.Timer(0.05, notifier.notify)
+    timer.start()
+    assert notifier.wait(5.0)
+    timer.join()
+
+    # Each notification wakes one wait
+    assert not notifier.wait(0.01)
+
+
+def test_local_notifier_close_unblocks_wait():
+    notifier = LocalJobNotifier()
+    threading.Timer(0.05, notifier.close).start()
+
+    assert notifier.wait(5.0)
@@ -0,0 +1,53 @@
+from services.leases import LeaseKeeper
+
+
+def make_keeper(supabase, lost):
+    # A long heartbeat so the test drives renewals itself
+    return LeaseKeeper(supabase, "worker-1", lease_seconds=300, reap_interval=0, on_lost=lost.extend)
+
+
+def test_jobs_whose_lease_was_not_renewed_are_reported_lost(supabase):
+    supabase.handlers["extend_leases"] = lambda params: [{"job_id": "a"}]
+    lost = []
+    keeper = make_keeper(supabase, lost)
+
+    keeper.track(["a", "b", "c"])
+    keeper._extend_leases()
+    keeper.close()
+
+    assert sorted(lost) == ["b", "c"]
+    assert keeper.in_flight() == 1
+    name, params = supabase.calls[-1]
+    assert name == "extend_leases"
+    assert params["p_worker_id"] == "worker-1"
+
+
+def test_jobs_released_during_a_renewal_are_not_lost(supabase):
+    lost = []
+    keeper = make_keeper(supabase, lost)
+
+    def extend_leases(params):
+        # "b" finishes while the heartbeat call is in flight
+        keeper.release("b")
+        return [{"job_id": "a"}]
+
+    supabase.handlers["extend_leases"] = extend_leases
+    keeper.track(["a", "b"])
+    keeper._extend_leases()
+    keeper.close()
+
+    assert lost == []
+    assert keeper.in_flight() == 1
+
+
+def test_requeue_stops_tracking_and_releases_jobs(supabase):
+    supabase.handlers["extend_leases"] = lambda params: [{"job_id": job_id} for job_id in params["p_job_ids"]]
+    supabase.handlers["release_jobs"] = lambda params: len(params["p_job_ids"])
+    keeper = make_keeper(supabase, [])
+
+    keeper.track(["a", "b", "c"])
+    assert keeper.requeue(["b", "c"]) == 2
+    keeper.close()
+
+    assert keeper.in_flight() == 1
+    assert ("release_jobs", {"p_worker_id": "worker-1", "p_job_ids": ["b", "c"]}) in supabase.calls
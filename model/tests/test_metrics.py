@@ -0,0 +1,58 @@
+import urllib.request
+
+import pytest
+
+from services.metrics import Counter, WorkerMetrics, start_metrics_server
+
+
+@pytest.fixture
+def metrics():
+    metrics = WorkerMetrics()
+    stats = {"hits": 0, "misses": 0}
+    metrics.track_http_pool(lambda: dict(stats))
+    metrics.pool_stats = stats
+    return metrics
+
+
+def test_http_pool_stats_are_registered_as_counters(metrics):
+    metrics.pool_stats.update(hits=7, misses=2)
+
+    hits = metrics.registry._metrics["mood_worker_http_pool_hits_total"]
+    misses = metrics.registry._metrics["mood_worker_http_pool_misses_total"]
+    assert isinstance(hits, Counter) and isinstance(misses, Counter)
+    assert hits.value() == 7
+    assert misses.value() == 2
+    assert "mood_worker_http_pool_hits" not in metrics.registry._metrics
+
+
+def test_http_pool_counters_render_as_counters(metrics):
+    metrics.pool_stats.update(hits=7, misses=2)
+
+    text = metrics.registry.render()
+    assert "# TYPE mood_worker_http_pool_hits_total counter\nmood_worker_http_pool_hits_total 7\n" in text
+    assert "# TYPE mood_worker_http_pool_misses_total counter\nmood_worker_http_pool_misses_total 2\n" in text
+
+
+def test_metrics_server_exposes_http_pool_counters(metrics):
+    server = start_metrics_server(metrics.registry, port=0, host="127.0.0.1")
+    try:
+        metrics.pool_stats.update(hits=3, misses=1)
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.status == 200
+            text = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert "# TYPE mood_worker_http_pool_hits_total counter" in text
+    assert "mood_worker_http_pool_hits_total 3\n" in text
+    assert "mood_worker_http_pool_misses_total 1\n" in text
+
+
+def test_callback_counters_cannot_be_incremented():
+    counter = Counter("reads_total", "Reads", callback=lambda: 4)
+
+    with pytest.raises(ValueError):
+        counter.inc()
+    assert counter.samples() == ["reads_total 4"]
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from services.audio_io import AudioDecodeError
+from services.retry_policy import PermanentJobError, RetryPolicy, is_client_error, is_transient_error
+
+
+class FakeHttpError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+@pytest.mark.parametrize("error, transient", [
+    (ConnectionError("reset"), True),
+    (RuntimeError("unexpected"), True),
+    (FakeHttpError(503), True),
+    (FakeHttpError(429), True),
+    (FakeHttpError(404), False),
+    (PermanentJobError("upload missing"), False),
+    (AudioDecodeError("not audio"), False),
+])
+def test_is_transient_error(error, transient):
+    assert is_transient_error(error) is transient
+
+
+@pytest.mark.parametrize("error, client_error", [
+    (FakeHttpError(403), True),
+    (FakeHttpError(404), True),
+    (FakeHttpError(503), False),
+    (ConnectionError("reset"), False),
+])
+def test_is_client_error(error, client_error):
+    assert is_client_error(error) is client_error
+
+
+def test_retry_delay_backs_off_exponentially_with_equal_jitter():
+    random.seed(0)
+    policy = RetryPolicy(base_delay=10, max_delay=60)
+
+    for attempts, backoff in [(1, 10), (2, 20), (3, 40), (4, 60), (10, 60)]:
+        for _ in range(20):
+            assert backoff / 2 <= policy.retry_delay(attempts) <= backoff
+
+
+def test_decide_requeues_transient_errors_until_max_attempts():
+    policy = RetryPolicy(max_attempts=3, base_delay=10, max_delay=60)
+
+    status, delay = policy.decide(ConnectionError("reset"), attempts=2)
+    assert status == "queued"
+    assert 10 <= delay <= 20
+
+    assert policy.decide(ConnectionError("reset"), attempts=3) == ("dead_letter", None)
+
+
+def test_decide_fails_permanent_errors_on_first_attempt():
+    policy = RetryPolicy(max_attempts=3)
+
+    assert policy.decide(PermanentJobError("upload missing"), attempts=1) == ("failed", None)
+    assert policy.decide(FakeHttpError(403), attempts=1) == ("failed", None)
+
+
+@pytest.mark.parametrize("kwargs", [{"max_attempts": 0}, {"base_delay": 0}, {"base_delay": 10, "max_delay": 5}])
+def test_rejects_invalid_settings(kwargs):
+    with pytest.raises(ValueError):
+        RetryPolicy(**kwargs)
@@ -0,0 +1,22 @@
+from services.signed_urls import SignedUrlCache
+
+
+def test_invalidate_drops_a_rejected_url():
+    cache = SignedUrlCache(expires_in=3600, refresh_margin=300)
+    cache.put("a.wav", "https://storage/a?token=1")
+
+    cache.invalidate("a.wav", "https://storage/a?token=1")
+
+    assert cache.get("a.wav") is None
+    assert cache.lookup(["a.wav"]) == ({}, ["a.wav"])
+
+
+def test_invalidate_keeps_a_url_signed_since():
+    cache = SignedUrlCache(expires_in=3600, refresh_margin=300)
+    cache.put("a.wav", "https://storage/a?token=1")
+    cache.put("a.wav", "https://storage/a?token=2")
+
+    cache.invalidate("a.wav", "https://storage/a?token=1")
+    cache.invalidate("missing.wav", "https://storage/missing?token=1")
+
+    assert cache.get("a.wav") == "https://storage/a?token=2"
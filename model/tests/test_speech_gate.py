@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from services.speech_gate import SPEECH_CLASS_INDICES, SpeechGate, YAMNET_HOP_SECONDS
+
+
+def test_frame_speech_scores_take_the_best_speech_class():
+    scores = np.zeros((3, 521))
+    scores[0, 0] = 0.9
+    scores[1, SPEECH_CLASS_INDICES[-1]] = 0.4
+    scores[2, 137] = 0.8  # music
+
+    assert SpeechGate().frame_speech_scores(scores).tolist() == pytest.approx([0.9, 0.4, 0.0])
+
+
+def test_clip_with_enough_speech_runs_emotion_detection():
+    speech_scores = np.array([0.0, 0.1, 0.8, 0.9, 0.7, 0.0, 0.0])
+
+    decision = SpeechGate(min_speech_seconds=1.0).decide(speech_scores, duration=3.84)
+
+    assert decision.run_emotion
+    assert decision.speech_seconds == pytest.approx(3 * YAMNET_HOP_SECONDS)
+    # Frames 2-4: from the start of frame 2 to the end of frame 4's window
+    assert decision.segments == pytest.approx([(0.96, 2.88)])
+    assert decision.as_dict() == {"speech_seconds": 1.44, "segments": [[0.96, 2.88]]}
+
+
+def test_clip_without_enough_speech_skips_emotion_detection():
+    speech_scores = np.array([0.0, 0.8, 0.0, 0.0])
+
+    decision = SpeechGate(min_speech_seconds=1.0).decide(speech_scores, duration=2.4)
+
+    assert not decision.run_emotion
+    assert decision.speech_seconds == pytest.approx(YAMNET_HOP_SECONDS)
+
+
+@pytest.mark.parametrize("gate, speech_scores", [
+    (SpeechGate("clip"), None),
+    (SpeechGate("clip"), np.array([])),
+    (SpeechGate("off"), np.zeros(10)),
+])
+def test_gate_stays_open_when_off_or_without_scores(gate, speech_scores):
+    decision = gate.decide(speech_scores, duration=5.0)
+
+    assert decision.run_emotion
+    assert decision.segments == [(0.0, 5.0)]
+
+
+def test_segments_mode_feeds_only_speech_to_the_emotion_model():
+    sample_rate = 100
+    audio = np.arange(500, dtype=np.float32)
+    gate = SpeechGate("segments")
+    decision = gate.decide(np.array([1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0]), duration=5.0)
+
+    emotion_input = gate.emotion_input(audio, sample_rate, decision)
+
+    assert decision.segments == pytest.approx([(0.0, 0.96), (2.4, 3.84)])
+    assert np.array_equal(emotion_input, np.concatenate([audio[0:96], audio[240:384]]))
+    assert SpeechGate("clip").emotion_input(audio, sample_rate, decision) is audio
+
+
+def test_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        SpeechGate("strict")
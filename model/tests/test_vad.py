@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from services.vad import SilenceTrimmer
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_trim_cuts_leading_and_trailing_silence():
+    audio = np.concatenate([silence(2), tone(1), silence(1), tone(1), silence(2)])
+
+    result = SilenceTrimmer("trim", pad_ms=100)(audio, SAMPLE_RATE)
+
+    assert result.original_seconds == pytest.approx(7.0)
+    assert len(result.segments) == 1
+    start, end = result.segments[0]
+    assert start == pytest.approx(1.9, abs=0.05)
+    assert end == pytest.approx(5.1, abs=0.05)
+    assert len(result.audio) == pytest.approx((end - start) * SAMPLE_RATE, abs=1)
+
+
+def test_compact_also_drops_long_inner_pauses():
+    audio = np.concatenate([silence(1), tone(1), silence(2), tone(1), silence(0.1), tone(1), silence(1)])
+
+    result = SilenceTrimmer("compact", pad_ms=100, min_gap_ms=300)(audio, SAMPLE_RATE)
+
+    # The 2 s pause is removed, the 0.1 s one bridged
+    assert len(result.segments) == 2
+    assert sum(end - start for start, end in result.segments) == pytest.approx(3.5, abs=0.1)
+    assert result.as_dict("compact")["original_seconds"] == pytest.approx(7.1)
+
+
+@pytest.mark.parametrize("audio", [silence(3), tone(3)])
+def test_silent_or_fully_voiced_clips_are_returned_unchanged(audio):
+    result = SilenceTrimmer("trim")(audio, SAMPLE_RATE)
+
+    assert result.audio is audio
+    assert result.segments == [(0.0, 3.0)]
+
+
+def test_too_little_voiced_audio_keeps_the_clip():
+    audio = np.concatenate([silence(2), tone(0.1), silence(2)])
+
+    result = SilenceTrimmer("trim", pad_ms=0, min_keep_seconds=0.5)(audio, SAMPLE_RATE)
+
+    assert result.audio is audio
+
+
+def test_off_passes_clips_through():
+    audio = np.concatenate([silence(1), tone(1)])
+    assert SilenceTrimmer("off")(audio, SAMPLE_RATE).audio is audio
+
+
+def test_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        SilenceTrimmer("aggressive")
@@ -0,0 +1,150 @@
+import io
+import struct
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from services.audio_io import DownloadBuffer
+from services.wav_range import WavRangePlanner, format_range, parse_wav_header
+
+SAMPLE_RATE = 16000
+
+
+def wav_bytes(seconds: float, extra_chunk_bytes: int = 0, audio_format: int = 1) -> bytes:
+    """Mono 16-bit WAV, optionally with a LIST chunk between fmt and data."""
+    frames = int(seconds * SAMPLE_RATE)
+    samples = (np.arange(frames) % 100).astype("<i2").tobytes()
+    fmt = struct.pack("<HHIIHH", audio_format, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16)
+    chunks = b"fmt " + struct.pack("<I", len(fmt)) + fmt
+    if extra_chunk_bytes:
+        chunks += b"LIST" + struct.pack("<I", extra_chunk_bytes) + bytes(extra_chunk_bytes)
+    chunks += b"data" + struct.pack("<I", len(samples)) + samples
+    return b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WAVE" + chunks
+
+
+def download(planner: WavRangePlanner, data: bytes) -> bytearray:
+    """Serve the planner's ranges from data, the way the worker's ranged download does."""
+    received = bytearray()
+    byte_range = planner.first_range()
+    while byte_range is not None:
+        start, end = byte_range
+        chunk = data[start:len(data) if end is None else end + 1]
+        received += chunk
+        planner.received(f"bytes {start}-{start + len(chunk) - 1}/{len(data)}", len(received))
+        byte_range = planner.next_range(received)
+    for offset, patch in planner.header_patches(len(received)):
+        received[offset:offset + len(patch)] = patch
+    return received
+
+
+def test_parse_wav_header():
+    data = wav_bytes(1.0)
+
+    assert parse_wav_header(data[:10]) is None
+    assert parse_wav_header(data[:30]) is None
+    layout = parse_wav_header(data)
+    assert layout.data_offset == 44
+    assert layout.data_size == SAMPLE_RATE * 2
+    assert layout.byte_rate == SAMPLE_RATE * 2
+    assert layout.block_align == 2
+
+    with pytest.raises(ValueError):
+        parse_wav_header(b"RIFF\x00\x00\x00\x00AVI LIST")
+
+
+def test_downloads_only_the_analysis_window_and_patches_the_header():
+    data = wav_bytes(60.0)
+    planner = WavRangePlanner(duration=30.0, probe_bytes=64 * 1024)
+
+    received = download(planner, data)
+
+    assert len(received) == 44 + 30 * SAMPLE_RATE * 2
+    audio, sample_rate = sf.read(io.BytesIO(bytes(received)), dtype="int16")
+    assert sample_rate == SAMPLE_RATE
+    assert len(audio) == 30 * SAMPLE_RATE
+    assert np.array_equal(audio, np.frombuffer(data[44:len(received)], dtype="<i2"))
+
+
+def test_short_files_are_fetched_whole_without_patches():
+    data = wav_bytes(2.0)
+    planner = WavRangePlanner(duration=30.0)
+
+    received = download(planner, data)
+
+    assert bytes(received) == data
+    assert planner.header_patches(len(received)) == []
+
+
+def test_range_grows_geometrically_until_the_data_chunk_is_found():
+    data = wav_bytes(60.0, extra_chunk_bytes=300 * 1024)
+    planner = WavRangePlanner(duration=10.0, probe_bytes=64 * 1024)
+
+    prefix = data[:64 * 1024]
+    planner.received(f"bytes 0-{len(prefix) - 1}/{len(data)}", len(prefix))
+    assert planner.next_range(prefix) == (64 * 1024, 128 * 1024 - 1)
+
+    received = download(WavRangePlanner(duration=10.0, probe_bytes=64 * 1024), data)
+    data_offset = parse_wav_header(data).data_offset
+    assert len(received) == data_offset + 10 * SAMPLE_RATE * 2
+
+
+def test_unsupported_wavs_fall_back_to_the_rest_of_the_object():
+    # 0x0055 is MP3-in-WAV: frames have no fixed size
+    data = wav_bytes(60.0, audio_format=0x0055)
+    planner = WavRangePlanner(duration=10.0, probe_bytes=1024)
+
+    prefix = data[:1024]
+    planner.received(f"bytes 0-1023/{len(data)}", 1024)
+    assert planner.next_range(prefix) == (1024, None)
+
+    assert bytes(download(WavRangePlanner(duration=10.0, probe_bytes=1024), data)) == data
+
+
+def test_rejects_a_response_that_does_not_continue_the_download():
+    planner = WavRangePlanner()
+    with pytest.raises(ValueError):
+        planner.received("bytes 100-199/1000", 100)
+
+
+def test_format_range():
+    assert format_range((0, 1023)) == "bytes=0-1023"
+    assert format_range((1024, None)) == "bytes=1024-"
+
+
+def test_multi_range_downloads_grow_the_download_buffer():
+    # 40 s of 44.1 kHz stereo behind a 300 KB metadata chunk: the probe, a
+    # doubled range to reach the data chunk, then the analysis window
+    frames = 40 * 44100
+    samples = (np.arange(frames * 2) % 1000).astype("<i2").tobytes()
+    fmt = struct.pack("<HHIIHH", 1, 2, 44100, 44100 * 4, 4, 16)
+    metadata = b"LIST" + struct.pack("<I", 300 * 1024) + bytes(300 * 1024)
+    body = (b"fmt " + struct.pack("<I", len(fmt)) + fmt + metadata
+            + b"data" + struct.pack("<I", len(samples)) + samples)
+    data = b"RIFF" + struct.pack("<I", 4 + len(body)) + b"WAVE" + body
+
+    buffer = DownloadBuffer(initial_size=64 * 1024)
+    # A view of the previous job's download is still alive
+    previous = buffer.fill([b"x" * 1024])
+    planner = WavRangePlanner(duration=30.0)
+    byte_range = planner.first_range()
+    requests = 0
+    buffer.fill([])
+    while byte_range is not None:
+        start, end = byte_range
+        chunk = data[start:end + 1]
+        # Held across iterations, as the worker does
+        audio_bytes = buffer.extend([chunk[i:i + 65536] for i in range(0, len(chunk), 65536)])
+        planner.received(f"bytes {start}-{start + len(chunk) - 1}/{len(data)}", buffer.size)
+        byte_range = planner.next_range(audio_bytes)
+        requests += 1
+    for offset, patch in planner.header_patches(buffer.size):
+        buffer.write_at(offset, patch)
+
+    assert requests == 3
+    # The old view survived the buffer growing under it
+    assert len(previous) == 1024
+    audio, sample_rate = sf.read(buffer.reader(), dtype="int16")
+    assert sample_rate == 44100
+    assert len(audio) == 30 * 44100
+    assert np.array_equal(audio.reshape(-1), np.frombuffer(samples[:30 * 44100 * 4], dtype="<i2"))